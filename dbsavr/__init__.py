@@ -1,21 +1,39 @@
-# /dbsavr/__init__.py
 # dbsavr: An open source tool for easily creating database backups and storing them in S3-compatible object storage
 
+import importlib
+
 from .version import __version__
 
 from .config import Config, DatabaseConfig, S3Config, BackupSchedule, load_config
-from .backup_engine import BackupEngine
-from .storage import S3Storage
-from .notifications import EmailNotifier
-from .backup_service import BackupService
-from .scheduler_service import SchedulerService
-from .api import (
-    create_backup,
-    start_scheduler,
-    list_databases,
-    cleanup_backups,
-    generate_celery_config,
-)
+
+# Modules that pull in boto3/celery are only imported when one of their
+# names is first accessed (PEP 562), so e.g. the CLI starts faster
+_LAZY_ATTRIBUTES = {
+    "BackupEngine": ".backup_engine",
+    "S3Storage": ".storage",
+    "EmailNotifier": ".notifications",
+    "BackupService": ".backup_service",
+    "SchedulerService": ".scheduler_service",
+    # API functions
+    "create_backup": ".api",
+    "create_backups": ".api",
+    "start_scheduler": ".api",
+    "list_databases": ".api",
+    "cleanup_backups": ".api",
+    "generate_celery_config": ".api",
+}
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value  # Cache so __getattr__ isn't hit again
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
 
 __all__ = [
     "__version__",
@@ -31,8 +49,9 @@ __all__ = [
     "SchedulerService",
     # API functions
     "create_backup",
+    "create_backups",
     "start_scheduler",
     "list_databases",
     "cleanup_backups",
     "generate_celery_config",
-]
\ No newline at end of file
+]
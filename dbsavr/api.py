@@ -6,9 +6,12 @@ These functions provide a simple interface to the core functionality
 for use in external applications or scripts.
 """
 
+from typing import List, Optional
+
 from .config import load_config
-from .backup_service import BackupService
-from .scheduler_service import SchedulerService
+
+# BackupService and SchedulerService are imported inside the functions that use
+# them, so importing this module doesn't load boto3 or celery
 
 def create_backup(config_path: str, db_name: str):
     """
@@ -21,10 +24,30 @@ def create_backup(config_path: str, db_name: str):
     Returns:
         Dictionary with backup results
     """
+    from .backup_service import BackupService
+    
     config = load_config(config_path)
     service = BackupService(config)
     return service.perform_backup(db_name)
 
+def create_backups(config_path: str, db_names: List[str], max_workers: Optional[int] = None):
+    """
+    Create backups for several databases in parallel
+    
+    Args:
+        config_path: Path to the configuration file
+        db_names: Names of the databases to back up
+        max_workers: Optional number of worker processes
+        
+    Returns:
+        Dictionary mapping each database name to its backup results
+    """
+    from .backup_service import BackupService
+    
+    config = load_config(config_path)
+    service = BackupService(config)
+    return service.perform_backups(db_names, max_workers=max_workers)
+
 def start_scheduler(config_path: str, daemon: bool = False):
     """
     Start the backup scheduler
@@ -36,6 +59,8 @@ def start_scheduler(config_path: str, daemon: bool = False):
     Returns:
         Scheduler service instance
     """
+    from .scheduler_service import SchedulerService
+    
     config = load_config(config_path)
     service = SchedulerService(config)
     service.start_scheduler(daemon=daemon)
@@ -51,6 +76,8 @@ def list_databases(config_path: str):
     Returns:
         List of database names
     """
+    from .backup_service import BackupService
+    
     config = load_config(config_path)
     service = BackupService(config)
     return service.list_available_databases()
@@ -67,6 +94,8 @@ def cleanup_backups(config_path: str, db_name: str, days: int = None):
     Returns:
         List of deleted S3 keys
     """
+    from .backup_service import BackupService
+    
     config = load_config(config_path)
     service = BackupService(config)
     return service.cleanup_old_backups(db_name, days)
@@ -83,6 +112,8 @@ def generate_celery_config(config_path: str, broker_url: str, result_backend: st
     Returns:
         Celery configuration as a string
     """
+    from .scheduler_service import SchedulerService
+    
     config = load_config(config_path)
     service = SchedulerService(config)
     return service.generate_celery_config(broker_url, result_backend)
\ No newline at end of file
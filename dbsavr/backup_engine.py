@@ -1,24 +1,218 @@
 # /dbsavr/backup_engine.py
 import os
+import gzip
+import functools
 import tempfile
 import subprocess
 import logging
+import shlex
 import shutil
+import zlib
 from datetime import datetime
 from typing import Tuple, Optional, Dict, Any, List
 
+import yaml
+
 from .config import DatabaseConfig
 
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 
+# Size of the reads from the dump process and of the pipe buffer
+COPY_BUFSIZE = 1024 * 1024
+
+# Options for every dump/compressor process: don't inherit the parent's other file
+# descriptors (e.g. pipes of concurrent backups or S3 connections) and run in a
+# separate session so terminal signals sent to the scheduler don't reach them
+POPEN_KWARGS = {
+    'close_fds': True,
+    'start_new_session': True,
+}
+
+# Linux fcntl command to resize a pipe (exposed by the fcntl module since Python 3.10)
+F_SETPIPE_SZ = getattr(fcntl, 'F_SETPIPE_SZ', 1031)
+
+# Format of the timestamp in backup filenames
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+# gzip level used for SQL dumps (same default as the gzip command line tool)
+GZIP_COMPRESSLEVEL = 6
+
+# Supported compression formats: name -> (compressor command, file extension)
+# A command of None means gzip: pigz on all cores when it's installed, otherwise
+# compressed in-process. An empty command stores the dump uncompressed.
+COMPRESSORS = {
+    'gzip': (None, '.gz'),
+    # -T0 uses all cores; the 128 MiB window of --long=27 finds repeats across
+    # large SQL dumps and still decompresses with zstd's default memory limit
+    'zstd': (['zstd', '-T0', '-3', '--long=27', '-q', '-c'], '.zst'),
+    'none': ([], ''),
+}
+
+# Compressor commands used with the 'rsyncable' option. They periodically reset
+# the compressor state so a small change in the dump only changes the nearby
+# compressed bytes, which keeps rsync/deduplicating storage efficient at the cost
+# of slightly larger output. zlib can't do this, so gzip needs the external tool.
+RSYNCABLE_COMPRESSORS = {
+    'gzip': ['gzip', '--rsyncable', f'-{GZIP_COMPRESSLEVEL}', '-c'],
+    'zstd': ['zstd', '-T0', '-3', '--rsyncable', '-q', '-c'],
+}
+
+# Database types whose dump can be streamed without a local staging file
+STREAMABLE_TYPES = ('mysql', 'mariadb', 'postgresql', 'mongodb')
+
+class BackupStream:
+    """
+    Readable stream of a compressed database dump
+    
+    Wraps a running dump process (and optional compressor process) so the
+    compressed output can be consumed directly, e.g. by a multipart upload,
+    without first writing it to local disk. Reading to the end waits for every
+    stage and raises if any of them failed, so a multipart upload is aborted
+    instead of completing a truncated object. Call close() once done reading.
+    """
+    
+    def __init__(self, dump_process: subprocess.Popen, tool_name: str,
+                 compressor_process: Optional[subprocess.Popen] = None,
+                 compressor_name: Optional[str] = None,
+                 temp_files: Optional[List[str]] = None,
+                 compress: bool = True):
+        self._dump_process = dump_process
+        self._temp_files = temp_files or []
+        self._tool_name = tool_name
+        self._compressor_process = compressor_process
+        self._compressor_name = compressor_name
+        
+        if compressor_process is None:
+            self._source = dump_process.stdout
+            # In-process gzip; wbits=31 writes a gzip header and trailer
+            self._compressobj = zlib.compressobj(GZIP_COMPRESSLEVEL, zlib.DEFLATED, 31) if compress else None
+        else:
+            self._source = compressor_process.stdout
+            self._compressobj = None
+        
+        self._buffer = bytearray()
+        self._eof = False
+        self._closed = False
+        self.bytes_read = 0
+    
+    def readable(self) -> bool:
+        return True
+    
+    def read(self, size: Optional[int] = -1) -> bytes:
+        """
+        Read up to size bytes of compressed output
+        
+        Args:
+            size: Maximum number of bytes to return (-1 or None reads everything)
+            
+        Returns:
+            Compressed bytes, or b'' once the dump is exhausted
+            
+        Raises:
+            Exception: If the dump command or the compressor failed (at the end of the stream)
+        """
+        while not self._eof and (size is None or size < 0 or len(self._buffer) < size):
+            chunk = self._source.read(COPY_BUFSIZE)
+            if not chunk:
+                self._eof = True
+                if self._compressobj is not None:
+                    self._buffer += self._compressobj.flush()
+                # Fail the read (and so the upload) before the last part is handed over
+                self.close()
+            elif self._compressobj is not None:
+                self._buffer += self._compressobj.compress(chunk)
+            else:
+                self._buffer += chunk
+        
+        if size is None or size < 0:
+            size = len(self._buffer)
+        
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        self.bytes_read += len(data)
+        return data
+    
+    def close(self) -> None:
+        """
+        Wait for every stage of the pipeline to finish
+        
+        Raises:
+            Exception: If the dump command or the compressor failed
+        """
+        if self._closed:
+            return
+        self._closed = True
+        
+        try:
+            try:
+                if self._compressor_process is not None:
+                    compressor_stdout, compressor_stderr = self._compressor_process.communicate()
+                
+                dump_stdout, dump_stderr = self._dump_process.communicate()
+            except BaseException:
+                # e.g. Ctrl+C, which doesn't reach the processes in their own session
+                self._kill()
+                raise
+        finally:
+            self._remove_temp_files()
+        
+        if self._dump_process.returncode != 0:
+            error_msg = f"{self._tool_name} failed: {dump_stderr.decode('utf-8')}"
+            logger.error(error_msg)
+            raise Exception(error_msg)
+        
+        if self._compressor_process is not None and self._compressor_process.returncode != 0:
+            error_msg = f"{self._compressor_name} failed: {compressor_stderr.decode('utf-8')}"
+            logger.error(error_msg)
+            raise Exception(error_msg)
+    
+    def abort(self) -> None:
+        """Kill every stage of the pipeline, e.g. after a failed upload"""
+        if self._closed:
+            return
+        self._closed = True
+        
+        try:
+            self._kill()
+        finally:
+            self._remove_temp_files()
+    
+    def _kill(self) -> None:
+        """Kill every stage of the pipeline and wait for them to exit"""
+        for process in (self._compressor_process, self._dump_process):
+            if process is not None:
+                process.kill()
+                process.communicate()
+    
+    def _remove_temp_files(self) -> None:
+        """Remove files that were only needed while the dump was running"""
+        for path in self._temp_files:
+            if os.path.exists(path):
+                os.unlink(path)
+    
+    def __enter__(self) -> 'BackupStream':
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
 class BackupEngine:
     @staticmethod
-    def backup_database(db_config: DatabaseConfig) -> Tuple[str, str]:
+    def backup_database(db_config: DatabaseConfig, timestamp: Optional[str] = None) -> Tuple[str, str]:
         """
         Backup the database and return the path to the backup file and filename
         
         Args:
             db_config: Configuration for the database to backup
+            timestamp: Optional timestamp string for the backup filename (defaults to now)
             
         Returns:
             Tuple containing (backup_path, filename)
@@ -27,7 +221,8 @@ class BackupEngine:
             ValueError: If the database type is unsupported
             Exception: If the backup process fails
         """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if timestamp is None:
+            timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
         db_type = db_config.type.lower()
         
         if db_type == "mysql" or db_type == "mariadb":
@@ -39,6 +234,149 @@ class BackupEngine:
         else:
             raise ValueError(f"Unsupported database type: {db_type}")
     
+    @staticmethod
+    def supports_streaming(db_config: DatabaseConfig) -> bool:
+        """
+        Check whether a database can be backed up with backup_database_stream
+        
+        Args:
+            db_config: Configuration for the database
+            
+        Returns:
+            True if the dump can be streamed without a local staging file
+        """
+        if db_config.type.lower() not in STREAMABLE_TYPES:
+            return False
+        # Parallel dumps write a directory of files, which has to be staged and tarred
+        return not BackupEngine._dumps_directory(db_config)
+    
+    @staticmethod
+    def _dumps_directory(db_config: DatabaseConfig) -> bool:
+        """
+        Check whether a database is dumped in parallel into a directory
+        
+        That's mydumper for MySQL/MariaDB with the 'use_mydumper' or 'chunk_rows' option and
+        pg_dump's directory format for PostgreSQL with the 'directory_format' option.
+        
+        Args:
+            db_config: Configuration for the database
+            
+        Returns:
+            True if the dump is a directory that gets tarred into the backup file
+        """
+        options = db_config.options or {}
+        db_type = db_config.type.lower()
+        if db_type == "mysql" or db_type == "mariadb":
+            # Chunked dumps are made by mydumper
+            return bool(options.get('use_mydumper') or options.get('chunk_rows'))
+        if db_type == "postgresql":
+            return bool(options.get('directory_format'))
+        return False
+    
+    @staticmethod
+    def backup_database_stream(db_config: DatabaseConfig, timestamp: Optional[str] = None) -> Tuple[BackupStream, str]:
+        """
+        Start a backup and return a readable stream of the compressed dump
+        
+        Nothing is written to local disk; the caller reads the stream (e.g. into
+        a multipart upload) and then calls close() to check the dump succeeded.
+        
+        Args:
+            db_config: Configuration for the database to backup
+            timestamp: Optional timestamp string for the backup filename (defaults to now)
+            
+        Returns:
+            Tuple containing (stream, filename)
+            
+        Raises:
+            ValueError: If the database type can't be streamed
+        """
+        if timestamp is None:
+            timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+        db_type = db_config.type.lower()
+        temp_files = []
+        
+        if BackupEngine._dumps_directory(db_config):
+            raise ValueError(f"Streaming backups are not supported for directory dumps of: {db_config.database}")
+        elif db_type == "mysql" or db_type == "mariadb":
+            cmd, env = BackupEngine._mysql_command(db_config)
+            tool_name = "mysqldump"
+        elif db_type == "postgresql":
+            cmd, env = BackupEngine._postgresql_command(db_config)
+            tool_name = "pg_dump"
+        elif db_type == "mongodb":
+            config_path = BackupEngine._write_mongodb_config(db_config)
+            temp_files.append(config_path)
+            cmd, env = BackupEngine._mongodb_command(db_config, config_path)
+            tool_name = "mongodump"
+        else:
+            raise ValueError(f"Streaming backups are not supported for database type: {db_type}")
+        
+        compressor_cmd, extension = BackupEngine._get_compression(db_config)
+        if db_type == "mongodb":
+            filename = f"{db_config.database}_{timestamp}.archive{extension}"
+        else:
+            filename = f"{db_config.database}_{timestamp}.sql{extension}"
+        
+        try:
+            stream = BackupEngine._start_stream(cmd, env, tool_name, compressor_cmd, temp_files)
+        except BaseException:
+            for path in temp_files:
+                os.unlink(path)
+            raise
+        logger.info(f"Started streaming {tool_name} backup: {filename}")
+        return stream, filename
+    
+    @staticmethod
+    def _start_stream(cmd: List[str], env: Optional[Dict[str, str]], tool_name: str,
+                      compressor_cmd: Optional[List[str]] = None,
+                      temp_files: Optional[List[str]] = None) -> BackupStream:
+        """
+        Start a dump command, piped into the compressor if one is given
+        
+        Args:
+            cmd: Dump command to execute
+            env: Environment for the dump process
+            tool_name: Name of the dump tool (used in error messages)
+            compressor_cmd: Optional external compressor command (empty for no compression)
+            temp_files: Optional files to delete once the pipeline has finished
+            
+        Returns:
+            BackupStream reading the compressed output
+        """
+        dump_process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=env,
+            bufsize=COPY_BUFSIZE,
+            **POPEN_KWARGS
+        )
+        BackupEngine._enlarge_pipe(dump_process.stdout)
+        
+        if not compressor_cmd:
+            # In-process gzip, or the raw dump for an empty command
+            return BackupStream(dump_process, tool_name, temp_files=temp_files, compress=compressor_cmd is None)
+        
+        try:
+            compressor_process = subprocess.Popen(
+                compressor_cmd,
+                stdin=dump_process.stdout,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                bufsize=COPY_BUFSIZE,
+                **POPEN_KWARGS
+            )
+        except BaseException:
+            dump_process.kill()
+            dump_process.communicate()
+            raise
+        
+        # Allow the dump process to receive a SIGPIPE if the compressor exits
+        dump_process.stdout.close()
+        
+        return BackupStream(dump_process, tool_name, compressor_process, compressor_cmd[0], temp_files)
+    
     @staticmethod
     def get_backup_details(backup_path: str) -> Dict[str, Any]:
         """
@@ -61,6 +399,492 @@ class BackupEngine:
             'full_path': os.path.abspath(backup_path)
         }
     
+    @staticmethod
+    def _get_compression(db_config: DatabaseConfig) -> Tuple[Optional[List[str]], str]:
+        """
+        Get the compressor for a database from its compression options
+        
+        The 'compression' option picks the format, 'rsyncable' switches to the
+        rsync-friendly variant of its compressor and 'compress_command' replaces
+        the compressor command entirely (the file extension still follows the format).
+        Plain gzip uses pigz on all cores when it is installed.
+        
+        Args:
+            db_config: Configuration for the database
+            
+        Returns:
+            Tuple containing (compressor command, None for in-process gzip or
+            an empty list for no compression, file extension)
+            
+        Raises:
+            ValueError: If the compression format is unsupported
+        """
+        options = db_config.options or {}
+        compression = options.get('compression', 'gzip')
+        if compression not in COMPRESSORS:
+            raise ValueError(f"Unsupported compression: {compression}")
+        
+        compressor_cmd, extension = COMPRESSORS[compression]
+        
+        compress_command = options.get('compress_command')
+        if compress_command:
+            if isinstance(compress_command, str):
+                compressor_cmd = shlex.split(compress_command)
+            else:
+                compressor_cmd = list(compress_command)
+        elif options.get('rsyncable') and compression in RSYNCABLE_COMPRESSORS:
+            compressor_cmd = RSYNCABLE_COMPRESSORS[compression]
+        elif compressor_cmd is None and shutil.which('pigz'):
+            # pigz compresses blocks on all cores and writes a standard gzip stream
+            compressor_cmd = ['pigz', '-p', str(os.cpu_count() or 1), f'-{GZIP_COMPRESSLEVEL}', '-c']
+        
+        return compressor_cmd, extension
+    
+    @staticmethod
+    def _dump_compressed(cmd: List[str], env: Dict[str, str], backup_path: str, tool_name: str,
+                         compressor_cmd: Optional[List[str]] = None) -> None:
+        """
+        Run a dump command and write its output to a compressed file
+        
+        Without a compressor command (None) the dump output is gzip-compressed
+        in-process, which avoids spawning a separate process and the extra pipe
+        between the two. An empty command writes the dump output as is. Otherwise
+        the dump output is piped into the compressor process.
+        
+        The output is written to backup_path + '.part' and only renamed to
+        backup_path once the dump succeeded and the data is on disk, so a
+        crash never leaves a truncated file under the final name.
+        
+        Args:
+            cmd: Dump command to execute
+            env: Environment for the dump process
+            backup_path: Path of the compressed output file
+            tool_name: Name of the dump tool (used in error messages)
+            compressor_cmd: Optional external compressor command (empty for no compression)
+            
+        Raises:
+            Exception: If the dump command or the compressor fails
+        """
+        part_path = backup_path + '.part'
+        
+        dump_process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=env,
+            bufsize=COPY_BUFSIZE,
+            **POPEN_KWARGS
+        )
+        BackupEngine._enlarge_pipe(dump_process.stdout)
+        
+        compressor_process = None
+        try:
+            try:
+                with open(part_path, 'wb') as f:
+                    if compressor_cmd is None:
+                        # Name the header after the final file, not the .part file
+                        with gzip.GzipFile(filename=os.path.basename(backup_path), fileobj=f,
+                                           mode='wb', compresslevel=GZIP_COMPRESSLEVEL) as gz:
+                            shutil.copyfileobj(dump_process.stdout, gz, COPY_BUFSIZE)
+                    elif not compressor_cmd:
+                        BackupEngine._copy_pipe_to_file(dump_process.stdout, f)
+                    else:
+                        compressor_process = subprocess.Popen(
+                            compressor_cmd,
+                            stdin=dump_process.stdout,
+                            stdout=f,
+                            stderr=subprocess.PIPE,
+                            **POPEN_KWARGS
+                        )
+                        
+                        # Allow the dump process to receive a SIGPIPE if the compressor exits
+                        dump_process.stdout.close()
+                        
+                        # Wait for the compressor to complete
+                        compressor_stdout, compressor_stderr = compressor_process.communicate()
+                    
+                    BackupEngine._sync_and_drop_cache(f)
+            except BaseException:
+                # Don't leave the dump process blocked on a pipe nobody reads, nor
+                # the processes running after Ctrl+C (their own session doesn't get it)
+                for process in (compressor_process, dump_process):
+                    if process is not None:
+                        process.kill()
+                        process.communicate()
+                raise
+            
+            # Wait for the dump to complete and collect its error output
+            dump_stdout, dump_stderr = dump_process.communicate()
+            
+            if dump_process.returncode != 0:
+                error_msg = f"{tool_name} failed: {dump_stderr.decode('utf-8')}"
+                logger.error(error_msg)
+                raise Exception(error_msg)
+            
+            if compressor_process is not None and compressor_process.returncode != 0:
+                error_msg = f"{compressor_cmd[0]} failed: {compressor_stderr.decode('utf-8')}"
+                logger.error(error_msg)
+                raise Exception(error_msg)
+        except BaseException:
+            if os.path.exists(part_path):
+                os.unlink(part_path)
+            raise
+        
+        os.replace(part_path, backup_path)
+    
+    @staticmethod
+    def _run_dump(cmd: List[str], env: Optional[Dict[str, str]], tool_name: str) -> None:
+        """
+        Run a dump command that writes its files itself and wait for it
+        
+        Args:
+            cmd: Dump command to execute
+            env: Environment for the dump process
+            tool_name: Name of the dump tool (used in error messages)
+            
+        Raises:
+            Exception: If the dump command fails
+        """
+        result = subprocess.run(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            env=env,
+            **POPEN_KWARGS
+        )
+        if result.returncode != 0:
+            error_msg = f"{tool_name} failed: {result.stderr.decode('utf-8')}"
+            logger.error(error_msg)
+            raise Exception(error_msg)
+    
+    @staticmethod
+    def _copy_pipe_to_file(pipe, f) -> None:
+        """
+        Copy everything from a pipe into a file
+        
+        Where available (Linux, Python 3.10+) the data is moved inside the kernel
+        with splice(2), so it's never copied into and back out of Python buffers.
+        
+        Args:
+            pipe: Pipe file object to read until EOF (e.g. a Popen stdout)
+            f: File object to write to
+        """
+        splice = getattr(os, 'splice', None)
+        if splice is not None:
+            f.flush()
+            try:
+                while splice(pipe.fileno(), f.fileno(), COPY_BUFSIZE):
+                    pass
+                return
+            except OSError as e:
+                # e.g. EINVAL for files on filesystems without splice support
+                logger.debug(f"Could not splice dump output, copying it instead: {str(e)}")
+        
+        shutil.copyfileobj(pipe, f, COPY_BUFSIZE)
+    
+    @staticmethod
+    def _enlarge_pipe(pipe) -> None:
+        """
+        Grow a pipe's kernel buffer to COPY_BUFSIZE
+        
+        The default 64 KiB pipe makes the dump process block on the reader very
+        often. This is best effort: it only works on Linux, and the size can be
+        capped by /proc/sys/fs/pipe-max-size.
+        
+        Args:
+            pipe: Pipe file object (e.g. a Popen stdout)
+        """
+        if fcntl is None:
+            return
+        
+        try:
+            fcntl.fcntl(pipe.fileno(), F_SETPIPE_SZ, COPY_BUFSIZE)
+        except (OSError, ValueError) as e:
+            logger.debug(f"Could not resize pipe buffer: {str(e)}")
+    
+    @staticmethod
+    def _sync_and_drop_cache(f) -> None:
+        """
+        Flush a finished backup file to disk and drop it from the page cache
+        
+        The file is only read once more (by the upload), so keeping it cached
+        would just evict pages other processes still need.
+        
+        Args:
+            f: Open file object of the backup
+        """
+        f.flush()
+        os.fsync(f.fileno())
+        
+        # posix_fadvise isn't available on every platform (e.g. macOS)
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+    
+    @staticmethod
+    def _extra_args(db_config: DatabaseConfig) -> Tuple[str, ...]:
+        """Get the 'extra_args' option as a tuple, so it can be part of a cache key"""
+        if db_config.options and 'extra_args' in db_config.options:
+            return tuple(db_config.options['extra_args'])
+        return ()
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _mysql_base_command(host: str, port: int, username: str, database: str,
+                            extra_args: Tuple[str, ...]) -> Tuple[str, ...]:
+        """Build (and memoize) the mysqldump command for a database"""
+        return (
+            "mysqldump",
+            f"--host={host}",
+            f"--port={port}",
+            f"--user={username}",
+            "--single-transaction",  # Consistent backup without locking tables
+            "--routines",  # Include stored procedures
+            "--triggers",  # Include triggers
+            "--events",    # Include events
+            database
+        ) + extra_args
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _mydumper_base_command(host: str, port: int, username: str, database: str,
+                               threads: int, chunk_rows: Optional[int],
+                               extra_args: Tuple[str, ...]) -> Tuple[str, ...]:
+        """Build (and memoize) the mydumper command for a database, without the output directory"""
+        if chunk_rows:
+            # Split large tables into primary key ranges of this many rows, so the
+            # threads also share the work within a table
+            extra_args = (f"--rows={chunk_rows}",) + extra_args
+        
+        return (
+            "mydumper",
+            "-h", host,
+            "-u", username,
+            "-P", str(port),
+            "-B", database,
+            "-t", str(threads),          # Dump tables in parallel
+            "--trx-consistency-only",    # Consistent snapshot, only locking tables while it starts
+            "--routines",  # Include stored procedures
+            "--triggers",  # Include triggers
+            "--events",    # Include events
+        ) + extra_args
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _postgresql_base_command(host: str, port: int, username: str, database: str,
+                                 extra_args: Tuple[str, ...]) -> Tuple[str, ...]:
+        """Build (and memoize) the pg_dump command for a database"""
+        return (
+            "pg_dump",
+            f"--host={host}",
+            f"--port={port}",
+            f"--username={username}",
+            "--format=plain",  # Plain SQL output
+            "--no-owner",      # Skip ownership commands
+            "--no-acl",        # Skip access privilege commands
+            database
+        ) + extra_args
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _postgresql_directory_base_command(host: str, port: int, username: str, database: str,
+                                           jobs: int, extra_args: Tuple[str, ...]) -> Tuple[str, ...]:
+        """Build (and memoize) the parallel pg_dump command for a database, without the output directory"""
+        return (
+            "pg_dump",
+            f"--host={host}",
+            f"--port={port}",
+            f"--username={username}",
+            "--format=directory",  # One file per table, required for --jobs
+            f"--jobs={jobs}",      # Dump tables in parallel worker processes
+            "--compress=9",        # Each table file is compressed by pg_dump
+            "--no-owner",          # Skip ownership commands
+            "--no-acl",            # Skip access privilege commands
+            database
+        ) + extra_args
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _mongodb_base_command(host: str, port: int, username: str, database: str,
+                              auth_db: Optional[str], extra_args: Tuple[str, ...]) -> Tuple[str, ...]:
+        """Build (and memoize) the mongodump command for a database, without the per-run options"""
+        cmd = (
+            "mongodump",
+            f"--host={host}",
+            f"--port={port}",
+            f"--username={username}",
+            f"--db={database}"
+        )
+        
+        # Add authentication database if provided in options
+        if auth_db:
+            cmd += (f"--authenticationDatabase={auth_db}",)
+        
+        # Add read preference for non-blocking backups (similar to MySQL's single-transaction)
+        cmd += ("--readPreference=secondary",)
+        
+        return cmd + extra_args
+    
+    @staticmethod
+    def _mysql_command(db_config: DatabaseConfig) -> Tuple[List[str], Dict[str, str]]:
+        """
+        Build the mysqldump command and its environment
+        
+        Args:
+            db_config: MySQL/MariaDB configuration
+            
+        Returns:
+            Tuple containing (command, environment)
+        """
+        cmd = list(BackupEngine._mysql_base_command(
+            db_config.host,
+            db_config.port,
+            db_config.username,
+            db_config.database,
+            BackupEngine._extra_args(db_config)
+        ))
+        
+        # Set up environment with password for security
+        env = os.environ.copy()
+        env['MYSQL_PWD'] = db_config.password
+        
+        return cmd, env
+    
+    @staticmethod
+    def _mydumper_command(db_config: DatabaseConfig, output_dir: str) -> Tuple[List[str], Dict[str, str]]:
+        """
+        Build the mydumper command and its environment
+        
+        Args:
+            db_config: MySQL/MariaDB configuration
+            output_dir: Directory mydumper writes the dump files to
+            
+        Returns:
+            Tuple containing (command, environment)
+        """
+        cmd = list(BackupEngine._mydumper_base_command(
+            db_config.host,
+            db_config.port,
+            db_config.username,
+            db_config.database,
+            os.cpu_count() or 1,
+            (db_config.options or {}).get('chunk_rows'),
+            BackupEngine._extra_args(db_config)
+        ))
+        cmd += ["-o", output_dir]
+        
+        # Like mysqldump, mydumper reads the password from the environment
+        env = os.environ.copy()
+        env['MYSQL_PWD'] = db_config.password
+        
+        return cmd, env
+    
+    @staticmethod
+    def _postgresql_command(db_config: DatabaseConfig) -> Tuple[List[str], Dict[str, str]]:
+        """
+        Build the pg_dump command and its environment
+        
+        Args:
+            db_config: PostgreSQL configuration
+            
+        Returns:
+            Tuple containing (command, environment)
+        """
+        # Set environment variables for authentication
+        env = os.environ.copy()
+        
+        # Always set PGPASSWORD as a string, even if it's empty
+        env['PGPASSWORD'] = str(db_config.password) if db_config.password is not None else ""
+        
+        cmd = list(BackupEngine._postgresql_base_command(
+            db_config.host,
+            db_config.port,
+            db_config.username,
+            db_config.database,
+            BackupEngine._extra_args(db_config)
+        ))
+        
+        return cmd, env
+    
+    @staticmethod
+    def _postgresql_directory_command(db_config: DatabaseConfig, output_dir: str) -> Tuple[List[str], Dict[str, str]]:
+        """
+        Build the parallel directory-format pg_dump command and its environment
+        
+        Args:
+            db_config: PostgreSQL configuration
+            output_dir: Directory pg_dump creates for the dump files
+            
+        Returns:
+            Tuple containing (command, environment)
+        """
+        env = os.environ.copy()
+        env['PGPASSWORD'] = str(db_config.password) if db_config.password is not None else ""
+        
+        cmd = list(BackupEngine._postgresql_directory_base_command(
+            db_config.host,
+            db_config.port,
+            db_config.username,
+            db_config.database,
+            os.cpu_count() or 1,
+            BackupEngine._extra_args(db_config)
+        ))
+        cmd.append(f"--file={output_dir}")
+        
+        return cmd, env
+    
+    @staticmethod
+    def _write_mongodb_config(db_config: DatabaseConfig) -> str:
+        """
+        Write the MongoDB password to a private mongodump config file
+        
+        Passing the password via --config keeps it out of the process list.
+        The caller must delete the file once mongodump has finished.
+        
+        Args:
+            db_config: MongoDB configuration
+            
+        Returns:
+            Path of the config file
+        """
+        # mkstemp creates the file readable and writable by the owner only (0600)
+        fd, config_path = tempfile.mkstemp(prefix="mongodump_", suffix=".yaml")
+        with os.fdopen(fd, 'w') as f:
+            password = str(db_config.password) if db_config.password is not None else ""
+            yaml.safe_dump({'password': password}, f)
+        
+        return config_path
+    
+    @staticmethod
+    def _mongodb_command(db_config: DatabaseConfig, config_path: str) -> Tuple[List[str], Optional[Dict[str, str]]]:
+        """
+        Build the mongodump command and its environment
+        
+        Args:
+            db_config: MongoDB configuration
+            config_path: Path of the config file holding the password
+            
+        Returns:
+            Tuple containing (command, environment or None to inherit it)
+        """
+        cmd = list(BackupEngine._mongodb_base_command(
+            db_config.host,
+            db_config.port,
+            db_config.username,
+            db_config.database,
+            (db_config.options or {}).get('auth_db'),
+            BackupEngine._extra_args(db_config)
+        ))
+        
+        cmd.append(f"--config={config_path}")
+        
+        # Dump one collection per core at the same time (interleaved in the archive)
+        cmd.append(f"--numParallelCollections={os.cpu_count() or 1}")
+        
+        # Write a single archive to stdout instead of a directory tree
+        cmd.append("--archive")
+        
+        return cmd, None
+    
     @staticmethod
     def _backup_mysql(db_config: DatabaseConfig, timestamp: str) -> Tuple[str, str]:
         """
@@ -76,69 +900,19 @@ class BackupEngine:
         Returns:
             Tuple containing (backup_path, filename)
         """
+        if BackupEngine._dumps_directory(db_config):
+            return BackupEngine._backup_mydumper(db_config, timestamp)
+        
+        compressor_cmd, extension = BackupEngine._get_compression(db_config)
         temp_dir = tempfile.gettempdir()
-        filename = f"{db_config.database}_{timestamp}.sql.gz"
+        filename = f"{db_config.database}_{timestamp}.sql{extension}"
         backup_path = os.path.join(temp_dir, filename)
-        temp_files = []
         
         try:
-            # Build mysqldump command
-            cmd = [
-                "mysqldump",
-                f"--host={db_config.host}",
-                f"--port={db_config.port}",
-                f"--user={db_config.username}",
-                "--single-transaction",  # Consistent backup without locking tables
-                "--routines",  # Include stored procedures
-                "--triggers",  # Include triggers
-                "--events",    # Include events
-                db_config.database
-            ]
-            
-            # Add any additional options
-            if db_config.options and 'extra_args' in db_config.options:
-                cmd.extend(db_config.options['extra_args'])
-            
-            # Set up environment with password for security
-            env = os.environ.copy()
-            env['MYSQL_PWD'] = db_config.password
-            
-            # Pipe to gzip for compression
-            with open(backup_path, 'wb') as f:
-                mysqldump_process = subprocess.Popen(
-                    cmd, 
-                    stdout=subprocess.PIPE, 
-                    stderr=subprocess.PIPE,
-                    env=env
-                )
-                gzip_process = subprocess.Popen(
-                    ['gzip'], 
-                    stdin=mysqldump_process.stdout, 
-                    stdout=f, 
-                    stderr=subprocess.PIPE
-                )
-                
-                # Allow mysqldump to receive a SIGPIPE if gzip exits
-                if mysqldump_process.stdout:
-                    mysqldump_process.stdout.close()
-                
-                # Wait for gzip to complete
-                gzip_stdout, gzip_stderr = gzip_process.communicate()
-                gzip_returncode = gzip_process.returncode
-                
-                # Wait for mysqldump to complete
-                mysqldump_stdout, mysqldump_stderr = mysqldump_process.communicate()
-                mysqldump_returncode = mysqldump_process.returncode
-                
-                if mysqldump_returncode != 0:
-                    error_msg = f"mysqldump failed: {mysqldump_stderr.decode('utf-8')}"
-                    logger.error(error_msg)
-                    raise Exception(error_msg)
-                
-                if gzip_returncode != 0:
-                    error_msg = f"gzip failed: {gzip_stderr.decode('utf-8')}"
-                    logger.error(error_msg)
-                    raise Exception(error_msg)
+            cmd, env = BackupEngine._mysql_command(db_config)
+            
+            # Stream mysqldump output through compression
+            BackupEngine._dump_compressed(cmd, env, backup_path, "mysqldump", compressor_cmd)
             
             logger.info(f"Created MySQL backup: {backup_path}")
             return backup_path, filename
@@ -150,6 +924,49 @@ class BackupEngine:
             logger.error(f"MySQL backup failed: {str(e)}")
             raise
     
+    @staticmethod
+    def _backup_mydumper(db_config: DatabaseConfig, timestamp: str) -> Tuple[str, str]:
+        """
+        Create a MySQL/MariaDB backup with mydumper
+        
+        mydumper dumps the tables in parallel threads into a temporary directory,
+        which is then tarred through the compressor into a single backup file.
+        The dump directory is always removed afterwards.
+        
+        Args:
+            db_config: MySQL/MariaDB configuration
+            timestamp: Timestamp string for the backup filename
+            
+        Returns:
+            Tuple containing (backup_path, filename)
+        """
+        compressor_cmd, extension = BackupEngine._get_compression(db_config)
+        temp_dir = tempfile.gettempdir()
+        filename = f"{db_config.database}_{timestamp}.tar{extension}"
+        backup_path = os.path.join(temp_dir, filename)
+        dump_dir = tempfile.mkdtemp(prefix="mydumper_", dir=temp_dir)
+        
+        try:
+            cmd, env = BackupEngine._mydumper_command(db_config, dump_dir)
+            
+            BackupEngine._run_dump(cmd, env, "mydumper")
+            
+            # Stream a tar of the dump directory through compression
+            tar_cmd = ["tar", "-C", dump_dir, "-cf", "-", "."]
+            BackupEngine._dump_compressed(tar_cmd, None, backup_path, "tar", compressor_cmd)
+            
+            logger.info(f"Created MySQL backup with mydumper: {backup_path}")
+            return backup_path, filename
+            
+        except Exception as e:
+            # Clean up any partial or failed backup file
+            if os.path.exists(backup_path):
+                os.unlink(backup_path)
+            logger.error(f"MySQL backup failed: {str(e)}")
+            raise
+        finally:
+            shutil.rmtree(dump_dir, ignore_errors=True)
+    
     @staticmethod
     def _backup_postgresql(db_config: DatabaseConfig, timestamp: str) -> Tuple[str, str]:
         """
@@ -164,69 +981,19 @@ class BackupEngine:
         Returns:
             Tuple containing (backup_path, filename)
         """
+        if BackupEngine._dumps_directory(db_config):
+            return BackupEngine._backup_postgresql_directory(db_config, timestamp)
+        
+        compressor_cmd, extension = BackupEngine._get_compression(db_config)
         temp_dir = tempfile.gettempdir()
-        filename = f"{db_config.database}_{timestamp}.sql.gz"
+        filename = f"{db_config.database}_{timestamp}.sql{extension}"
         backup_path = os.path.join(temp_dir, filename)
         
         try:
-            # Set environment variables for authentication
-            env = os.environ.copy()
-            
-            # Always set PGPASSWORD as a string, even if it's empty
-            env['PGPASSWORD'] = str(db_config.password) if db_config.password is not None else ""
-            
-            # Build pg_dump command
-            cmd = [
-                "pg_dump",
-                f"--host={db_config.host}",
-                f"--port={db_config.port}",
-                f"--username={db_config.username}",
-                "--format=plain",  # Plain SQL output
-                "--no-owner",      # Skip ownership commands
-                "--no-acl",        # Skip access privilege commands
-                db_config.database
-            ]
-            
-            # Add any additional options
-            if db_config.options and 'extra_args' in db_config.options:
-                cmd.extend(db_config.options['extra_args'])
-            
-            # Pipe to gzip for compression
-            with open(backup_path, 'wb') as f:
-                pg_dump_process = subprocess.Popen(
-                    cmd, 
-                    stdout=subprocess.PIPE, 
-                    stderr=subprocess.PIPE, 
-                    env=env
-                )
-                gzip_process = subprocess.Popen(
-                    ['gzip'], 
-                    stdin=pg_dump_process.stdout, 
-                    stdout=f, 
-                    stderr=subprocess.PIPE
-                )
-                
-                # Allow pg_dump to receive a SIGPIPE if gzip exits
-                if pg_dump_process.stdout:
-                    pg_dump_process.stdout.close()
-                
-                # Wait for gzip to complete
-                gzip_stdout, gzip_stderr = gzip_process.communicate()
-                gzip_returncode = gzip_process.returncode
-                
-                # Wait for pg_dump to complete
-                pg_dump_stdout, pg_dump_stderr = pg_dump_process.communicate()
-                pg_dump_returncode = pg_dump_process.returncode
-                
-                if pg_dump_returncode != 0:
-                    error_msg = f"pg_dump failed: {pg_dump_stderr.decode('utf-8')}"
-                    logger.error(error_msg)
-                    raise Exception(error_msg)
-                
-                if gzip_returncode != 0:
-                    error_msg = f"gzip failed: {gzip_stderr.decode('utf-8')}"
-                    logger.error(error_msg)
-                    raise Exception(error_msg)
+            cmd, env = BackupEngine._postgresql_command(db_config)
+            
+            # Stream pg_dump output through compression
+            BackupEngine._dump_compressed(cmd, env, backup_path, "pg_dump", compressor_cmd)
             
             logger.info(f"Created PostgreSQL backup: {backup_path}")
             return backup_path, filename
@@ -239,95 +1006,91 @@ class BackupEngine:
             raise
         
     @staticmethod
-    def _backup_mongodb(db_config: DatabaseConfig, timestamp: str) -> Tuple[str, str]:
+    def _backup_postgresql_directory(db_config: DatabaseConfig, timestamp: str) -> Tuple[str, str]:
         """
-        Create a MongoDB backup
+        Create a PostgreSQL backup with parallel directory-format pg_dump
         
-        Adds support for authentication database and read preference options to ensure
-        consistent backups without locking. Properly cleans up temporary files on error.
+        pg_dump dumps the tables in one worker process per core into a temporary
+        directory of compressed files, which is then tarred as is into the backup
+        file (restore it with pg_restore). The dump directory is always removed afterwards.
         
         Args:
-            db_config: MongoDB configuration
+            db_config: PostgreSQL configuration
             timestamp: Timestamp string for the backup filename
             
         Returns:
             Tuple containing (backup_path, filename)
         """
         temp_dir = tempfile.gettempdir()
-        backup_dir = os.path.join(temp_dir, f"mongodb_backup_{timestamp}")
+        filename = f"{db_config.database}_{timestamp}.tar"
+        backup_path = os.path.join(temp_dir, filename)
+        part_path = backup_path + '.part'
+        work_dir = tempfile.mkdtemp(prefix="pgdump_", dir=temp_dir)
         
         try:
-            os.makedirs(backup_dir, exist_ok=True)
-            
-            # Build mongodump command
-            cmd = [
-                "mongodump",
-                f"--host={db_config.host}",
-                f"--port={db_config.port}",
-                f"--username={db_config.username}",
-                f"--password={db_config.password}",
-                f"--db={db_config.database}",
-                f"--out={backup_dir}"
-            ]
-            
-            # Add authentication database if provided in options
-            auth_db = None
-            if db_config.options and 'auth_db' in db_config.options:
-                auth_db = db_config.options['auth_db']
-                cmd.append(f"--authenticationDatabase={auth_db}")
-            
-            # Add read preference for non-blocking backups (similar to MySQL's single-transaction)
-            cmd.append("--readPreference=secondary")
-            
-            # Add any additional options
-            if db_config.options and 'extra_args' in db_config.options:
-                cmd.extend(db_config.options['extra_args'])
-            
-            # Execute mongodump
-            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            stdout, stderr = process.communicate()
-            
-            if process.returncode != 0:
-                error_msg = f"mongodump failed: {stderr.decode('utf-8')}"
-                logger.error(error_msg)
-                raise Exception(error_msg)
+            # pg_dump refuses to write into an existing directory
+            dump_dir = os.path.join(work_dir, f"pgdump_{timestamp}")
+            cmd, env = BackupEngine._postgresql_directory_command(db_config, dump_dir)
+            BackupEngine._run_dump(cmd, env, "pg_dump")
             
-            # Create a tar.gz archive of the backup
-            filename = f"{db_config.database}_{timestamp}.tar.gz"
-            archive_path = os.path.join(temp_dir, filename)
+            # The table files are already compressed, so they are only archived
+            BackupEngine._run_dump(["tar", "-C", dump_dir, "-cf", part_path, "."], None, "tar")
+            os.replace(part_path, backup_path)
             
-            tar_cmd = [
-                "tar",
-                "-czf",
-                archive_path,
-                "-C",
-                temp_dir,
-                f"mongodb_backup_{timestamp}"
-            ]
+            logger.info(f"Created PostgreSQL backup with parallel pg_dump: {backup_path}")
+            return backup_path, filename
             
-            tar_process = subprocess.Popen(tar_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            tar_stdout, tar_stderr = tar_process.communicate()
+        except Exception as e:
+            # Clean up any failed backup file
+            if os.path.exists(backup_path):
+                os.unlink(backup_path)
+            logger.error(f"PostgreSQL backup failed: {str(e)}")
+            raise
+        finally:
+            # A partial archive is left behind if tar failed or was interrupted
+            if os.path.exists(part_path):
+                os.unlink(part_path)
+            shutil.rmtree(work_dir, ignore_errors=True)
+    
+    @staticmethod
+    def _backup_mongodb(db_config: DatabaseConfig, timestamp: str) -> Tuple[str, str]:
+        """
+        Create a MongoDB backup
+        
+        Adds support for authentication database and read preference options to ensure
+        consistent backups without locking. mongodump writes a single archive to stdout,
+        which is compressed on the fly, so no dump directory is staged on disk.
+        Properly cleans up temporary files on error.
+        
+        Args:
+            db_config: MongoDB configuration
+            timestamp: Timestamp string for the backup filename
             
-            if tar_process.returncode != 0:
-                error_msg = f"tar failed: {tar_stderr.decode('utf-8')}"
-                logger.error(error_msg)
-                raise Exception(error_msg)
+        Returns:
+            Tuple containing (backup_path, filename)
+        """
+        compressor_cmd, extension = BackupEngine._get_compression(db_config)
+        temp_dir = tempfile.gettempdir()
+        filename = f"{db_config.database}_{timestamp}.archive{extension}"
+        archive_path = os.path.join(temp_dir, filename)
+        
+        config_path = BackupEngine._write_mongodb_config(db_config)
+        
+        try:
+            cmd, env = BackupEngine._mongodb_command(db_config, config_path)
             
-            # Clean up temporary directory
-            shutil.rmtree(backup_dir, ignore_errors=True)
+            # Stream the mongodump archive through compression
+            BackupEngine._dump_compressed(cmd, env, archive_path, "mongodump", compressor_cmd)
             
             logger.info(f"Created MongoDB backup: {archive_path}")
             return archive_path, filename
             
         except Exception as e:
-            # Clean up all temporary files and directories
-            if os.path.exists(backup_dir):
-                shutil.rmtree(backup_dir, ignore_errors=True)
-                
             # Remove archive if it was partially created
-            archive_path = os.path.join(temp_dir, f"{db_config.database}_{timestamp}.tar.gz")
             if os.path.exists(archive_path):
                 os.unlink(archive_path)
                 
             logger.error(f"MongoDB backup failed: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+        finally:
+            os.unlink(config_path)
@@ -1,27 +1,256 @@
 # /dbsavr/backup_service.py
 import os
+import time
+import queue
+import atexit
 import logging
-from datetime import datetime
-from typing import Dict, List, Optional, Tuple, Any
+import threading
+import weakref
+import multiprocessing.util
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple, Any
 
-from .config import Config, DatabaseConfig
-from .backup_engine import BackupEngine
-from .storage import S3Storage
+from .config import Config, DatabaseConfig, BackupSchedule
+from .backup_engine import BackupEngine, TIMESTAMP_FORMAT
 from .notifications import EmailNotifier
 
+if TYPE_CHECKING:
+    # Imported lazily at runtime (see s3_storage) to keep boto3 out of startup
+    from .storage import S3Storage
+
 logger = logging.getLogger(__name__)
 
+# How long a notification thread waits for new work before exiting
+NOTIFY_IDLE_TIMEOUT = 60
+
+# How long to wait at exit for queued notifications to be sent
+NOTIFY_DRAIN_TIMEOUT = 30
+
+# Services that may have notifications queued, flushed when the process exits
+_notifying_services = weakref.WeakSet()
+
+def _flush_all_notifications() -> None:
+    """Send the queued notifications of every service before the process exits"""
+    for service in list(_notifying_services):
+        service.flush_notifications()
+
+atexit.register(_flush_all_notifications)
+
+def _remove_file(path: str) -> None:
+    """Remove a file, logging instead of raising if that fails"""
+    try:
+        os.unlink(path)
+    except OSError as e:
+        logger.warning("Failed to remove local backup file %s: %s", path, e)
+
+# Service shared by all backups run in a worker process of perform_backups
+_worker_service = None
+
+def _init_backup_worker(config: Config) -> None:
+    """Create the worker process's service so its S3 client and notifier are reused"""
+    global _worker_service
+    _worker_service = BackupService(config)
+    
+    # Pool workers leave through os._exit, which skips atexit handlers
+    multiprocessing.util.Finalize(None, _flush_all_notifications, exitpriority=10)
+
+def _perform_backup_worker(db_name: str) -> Dict[str, Any]:
+    """Run a single backup in a worker process (module level so it can be pickled)"""
+    return _worker_service.perform_backup(db_name)
+
 class BackupService:
     """Service for managing database backups without Celery dependency"""
     
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, max_workers: int = 8):
         """
         Initialize the backup service
         
         Args:
             config: Application configuration
+            max_workers: Default number of concurrent backups for perform_backups_bulk
         """
         self.config = config
+        self.max_workers = max_workers
+        self._s3_storage = None
+        self._s3_storage_lock = threading.Lock()
+        self._notifier = None
+        
+        # Staged backup files are removed off the critical path; see _remove_in_background
+        self._cleanup_pool = None
+        self._cleanup_pool_lock = threading.Lock()
+        
+        # Notifications are sent by a background thread, off the backup's critical path
+        self._notify_queue: queue.Queue = queue.Queue()
+        self._notify_lock = threading.Lock()
+        self._notify_thread = None
+        
+        # Schedule info dicts by index, by database and by (database, prefix); see _index_schedules
+        self._schedule_infos: List[Dict[str, Any]] = []
+        self._schedules_by_db: Dict[str, List[Dict[str, Any]]] = {}
+        self._schedules_by_db_prefix: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._schedules_version = None
+        self._index_schedules()
+        
+        # Cached result of list_available_databases
+        self._database_names: Tuple[str, ...] = ()
+        self._database_names_version = None
+    
+    @property
+    def s3_storage(self) -> 'S3Storage':
+        """S3 storage (and its boto3 client), created on first use and then reused"""
+        if self._s3_storage is None:
+            with self._s3_storage_lock:
+                # Another thread may have created it while we waited for the lock
+                if self._s3_storage is None:
+                    from .storage import S3Storage, TRANSFER_CONFIG
+                    
+                    # Every concurrent backup can have a full set of upload parts in flight
+                    self._s3_storage = S3Storage(
+                        self.config.s3,
+                        max_pool_connections=self.max_workers * TRANSFER_CONFIG.max_concurrency
+                    )
+        return self._s3_storage
+    
+    def _index_schedules(self) -> None:
+        """
+        Build the schedule lookup maps in a single pass over config.schedules
+        
+        The schedule info dicts are computed once here and shared by every
+        lookup, so they must not be modified. The maps are rebuilt whenever
+        the schedules list is replaced or changes length, so lookups stay
+        correct if the config is mutated.
+        """
+        schedules = self.config.schedules or []
+        version = (id(schedules), len(schedules))
+        if version == self._schedules_version:
+            return
+        
+        infos: List[Dict[str, Any]] = []
+        by_db: Dict[str, List[Dict[str, Any]]] = {}
+        by_db_prefix: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for idx, schedule in enumerate(schedules):
+            info = self._schedule_to_info(idx, schedule)
+            infos.append(info)
+            by_db.setdefault(schedule.database_name, []).append(info)
+            by_db_prefix.setdefault((schedule.database_name, schedule.prefix), info)
+        
+        self._schedule_infos = infos
+        self._schedules_by_db = by_db
+        self._schedules_by_db_prefix = by_db_prefix
+        self._schedules_version = version
+    
+    @staticmethod
+    def _schedule_to_info(idx: Optional[int], schedule: Optional[BackupSchedule]) -> Dict[str, Any]:
+        """Describe a schedule as returned by the _get_schedule* helpers (defaults when None)"""
+        if schedule is None:
+            return {
+                'index': None,
+                'retention_days': 30,
+                'prefix': None,
+                'cron_expression': None
+            }
+        
+        return {
+            'index': idx,
+            'retention_days': schedule.retention_days,
+            'prefix': schedule.prefix,
+            'cron_expression': schedule.cron_expression
+        }
+    
+    def _get_notifier(self) -> EmailNotifier:
+        """Get the email notifier, created on first use and then reused"""
+        if self._notifier is None:
+            self._notifier = EmailNotifier(self.config.notifications_email)
+        return self._notifier
+    
+    def _queue_notification(self, kind: str, **kwargs: Any) -> None:
+        """
+        Queue a notification for the background notification thread
+        
+        Args:
+            kind: Notification kind ('success' or 'failure')
+            **kwargs: Arguments for the matching EmailNotifier method
+        """
+        with self._notify_lock:
+            self._notify_queue.put((kind, kwargs))
+            
+            # Start a sender if there is none (or it exited after being idle)
+            if self._notify_thread is None or not self._notify_thread.is_alive():
+                self._notify_thread = threading.Thread(
+                    target=self._notify_worker,
+                    name='dbsavr-notifications',
+                    daemon=True
+                )
+                self._notify_thread.start()
+                _notifying_services.add(self)
+    
+    def _notify_worker(self) -> None:
+        """Send queued notifications until flushed or idle for NOTIFY_IDLE_TIMEOUT seconds"""
+        try:
+            self._send_queued_notifications()
+        finally:
+            with self._notify_lock:
+                if self._notify_thread is threading.current_thread():
+                    self._notify_thread = None
+                self._close_idle_notifier()
+    
+    def _close_idle_notifier(self) -> None:
+        """
+        Close the SMTP connection between bursts of notifications
+        
+        Call with _notify_lock held. The connection is left open if a newer
+        sender thread has started, since that thread is using it now.
+        """
+        if self._notify_thread is None and self._notifier is not None:
+            self._notifier.close()
+    
+    def _send_queued_notifications(self) -> None:
+        """Send queued notifications until a None sentinel or NOTIFY_IDLE_TIMEOUT seconds idle"""
+        while True:
+            try:
+                item = self._notify_queue.get(timeout=NOTIFY_IDLE_TIMEOUT)
+            except queue.Empty:
+                item = None
+            
+            if item is None:
+                with self._notify_lock:
+                    # Nothing can be queued while we hold the lock, so it's safe to
+                    # stop; notifications queued since a flush are still sent
+                    if self._notify_queue.empty():
+                        if self._notify_thread is threading.current_thread():
+                            self._notify_thread = None
+                        return
+                continue
+            
+            kind, kwargs = item
+            try:
+                notifier = self._get_notifier()
+                if kind == 'success':
+                    notifier.send_success_notification(**kwargs)
+                else:
+                    notifier.send_failure_notification(**kwargs)
+            except Exception as e:
+                logger.error("Failed to send %s notification: %s", kind, e)
+    
+    def flush_notifications(self, timeout: float = NOTIFY_DRAIN_TIMEOUT) -> None:
+        """
+        Wait for queued notifications to be sent and stop the notification thread
+        
+        Args:
+            timeout: Maximum number of seconds to wait
+        """
+        with self._notify_lock:
+            thread = self._notify_thread
+            if thread is None:
+                return
+            self._notify_queue.put(None)
+        
+        # The thread unregisters itself when it exits; until then it stays
+        # registered, so no second sender can start while it's still sending
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.warning("Timed out after %s seconds waiting for notifications to be sent", timeout)
     
     def perform_backup(self, db_name: str, schedule_index: Optional[int] = None) -> Dict[str, Any]:
         """
@@ -32,65 +261,70 @@ class BackupService:
             schedule_index: Optional index of the specific schedule to use (for databases with multiple schedules)
             
         Returns:
-            Dict with backup results (status, s3_key, duration, deleted_backups)
+            Dict with backup results (status, s3_key, duration, deleted_backups count)
             
         Raises:
             ValueError: If database configuration is not found
             Exception: If backup process fails
         """
+        # One wall-clock reading for the filename; durations use the monotonic clock
         start_time = datetime.now()
-        logger.info(f"Starting backup for database: {db_name} (schedule_index: {schedule_index})")
+        start = time.monotonic()
+        timestamp = start_time.strftime(TIMESTAMP_FORMAT)
+        logger.info("Starting backup for database: %s (schedule_index: %s)", db_name, schedule_index)
         
         try:
             # Get database configuration
-            if db_name not in self.config.databases:
+            db_config = self.config.databases.get(db_name)
+            if db_config is None:
                 raise ValueError(f"Database configuration not found for: {db_name}")
             
-            db_config = self.config.databases[db_name]
-            
             # Get schedule information for this database
             # If schedule_index is provided, use that specific schedule
             schedule_info = self._get_schedule_info(db_name, schedule_index)
             retention_days = schedule_info.get('retention_days', 30)
             schedule_prefix = schedule_info.get('prefix')
             
-            logger.info(f"Using schedule with prefix: {schedule_prefix}, retention: {retention_days} days")
-            
-            # Create the backup
-            backup_path, filename = BackupEngine.backup_database(db_config)
-            
-            # Get backup details
-            backup_details = BackupEngine.get_backup_details(backup_path)
-            backup_size = backup_details['size']
+            logger.info("Using schedule with prefix: %s, retention: %s days", schedule_prefix, retention_days)
             
             # Get database-specific bucket if configured
             custom_bucket = db_config.bucket_name
             
-            # Upload to S3
-            s3_storage = S3Storage(self.config.s3)
-            s3_key = s3_storage.upload_backup(
-                backup_path, 
-                db_name, 
-                filename, 
-                custom_bucket=custom_bucket,
-                custom_prefix=schedule_prefix
-            )
+            s3_storage = self.s3_storage
             
-            # Clean up the local backup file
-            os.remove(backup_path)
+            # List expired backups in the background while the new one is dumped and uploaded
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                expired_future = executor.submit(
+                    s3_storage.list_expired_backups,
+                    db_name,
+                    retention_days,
+                    custom_bucket=custom_bucket,
+                    custom_prefix=schedule_prefix
+                )
+                
+                s3_key, backup_size = self._create_and_upload_backup(
+                    s3_storage,
+                    db_config,
+                    db_name,
+                    timestamp,
+                    custom_bucket=custom_bucket,
+                    custom_prefix=schedule_prefix
+                )
+                
+                expired_keys = expired_future.result()
             
-            # Clean up old backups based on retention policy
-            deleted = self._cleanup_old_backups(
+            # Clean up old backups based on retention policy, now that the new one is stored
+            deleted_count = self._cleanup_old_backups(
                 s3_storage,
                 db_name,
                 retention_days,
                 custom_bucket=custom_bucket,
-                custom_prefix=schedule_prefix
+                custom_prefix=schedule_prefix,
+                expired_keys=expired_keys
             )
             
             # Calculate duration
-            end_time = datetime.now()
-            duration = (end_time - start_time).total_seconds()
+            duration = time.monotonic() - start
             
             # Send notification if configured
             self._send_success_notification(
@@ -98,10 +332,10 @@ class BackupService:
                 backup_size=backup_size,
                 s3_key=s3_key,
                 duration=duration,
-                deleted_backups=len(deleted)
+                deleted_backups=deleted_count
             )
             
-            logger.info(f"Backup completed successfully for {db_name} in {duration:.2f} seconds")
+            logger.info("Backup completed successfully for %s in %.2f seconds", db_name, duration)
             return {
                 'status': 'success',
                 'database': db_name,
@@ -109,15 +343,14 @@ class BackupService:
                 'size_bytes': backup_size,
                 'size_mb': round(backup_size / (1024 * 1024), 2),
                 'duration': duration,
-                'deleted_backups': len(deleted),
-                'deleted_keys': deleted,
-                'timestamp': datetime.now().isoformat(),
+                'deleted_backups': deleted_count,
+                'timestamp': (start_time + timedelta(seconds=duration)).isoformat(),
                 'schedule_prefix': schedule_prefix,
                 'retention_days': retention_days
             }
         
         except Exception as e:
-            logger.error(f"Backup failed for {db_name}: {str(e)}", exc_info=True)
+            logger.error("Backup failed for %s: %s", db_name, e, exc_info=True)
             
             # Send failure notification if configured
             self._send_failure_notification(
@@ -128,6 +361,224 @@ class BackupService:
             # Re-raise the exception for the caller to handle
             raise
     
+    def perform_backups(self, db_names: List[str], max_workers: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Back up several databases concurrently in a process pool
+        
+        A failing backup doesn't stop the others; its result has status 'failed'
+        and the error message instead of the backup details.
+        
+        Args:
+            db_names: Names of the databases to back up
+            max_workers: Number of worker processes (defaults to a quarter of the CPUs,
+                         so backups don't starve the rest of the host)
+            
+        Returns:
+            Dict mapping each database name to its backup result
+        """
+        if max_workers is None:
+            max_workers = max(1, (os.cpu_count() or 1) // 4)
+        
+        logger.info("Starting backups for %s databases with %s workers", len(db_names), max_workers)
+        
+        results = {}
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_backup_worker,
+            initargs=(self.config,)
+        ) as executor:
+            futures = {
+                executor.submit(_perform_backup_worker, db_name): db_name
+                for db_name in db_names
+            }
+            
+            for future in as_completed(futures):
+                db_name = futures[future]
+                try:
+                    results[db_name] = future.result()
+                except Exception as e:
+                    # perform_backup already logged and notified about the failure
+                    results[db_name] = {
+                        'status': 'failed',
+                        'database': db_name,
+                        'error': str(e)
+                    }
+        
+        failed = sum(1 for result in results.values() if result['status'] != 'success')
+        logger.info("Finished backups for %s databases (%s failed)", len(db_names), failed)
+        return results
+    
+    def perform_backups_bulk(self, targets: List[Tuple[str, Optional[int]]],
+                             max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Run several backups concurrently in a thread pool
+        
+        Backups are mostly waiting on the dump tools and the network, so threads
+        sharing this service's S3 client and notifier are enough to overlap them.
+        A failing backup doesn't stop the others; its result has status 'failed'
+        and the error message instead of the backup details.
+        
+        Args:
+            targets: (database name, schedule index or None) pairs to back up
+            max_workers: Maximum number of backups running at the same time
+                         (defaults to the service's max_workers, which also sizes
+                         the S3 connection pool)
+            
+        Returns:
+            List of backup results in the same order as targets
+        """
+        if max_workers is None:
+            max_workers = self.max_workers
+        
+        logger.info("Starting %s backups with up to %s threads", len(targets), max_workers)
+        
+        results = [None] * len(targets)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.perform_backup, db_name, schedule_index): position
+                for position, (db_name, schedule_index) in enumerate(targets)
+            }
+            
+            for future in as_completed(futures):
+                position = futures[future]
+                db_name, schedule_index = targets[position]
+                try:
+                    results[position] = future.result()
+                except Exception as e:
+                    # perform_backup already logged and notified about the failure
+                    results[position] = {
+                        'status': 'failed',
+                        'database': db_name,
+                        'schedule_index': schedule_index,
+                        'error': str(e)
+                    }
+        
+        failed = sum(1 for result in results if result['status'] != 'success')
+        logger.info("Finished %s backups (%s failed)", len(targets), failed)
+        return results
+    
+    def _create_and_upload_backup(self, s3_storage: 'S3Storage', db_config: DatabaseConfig, db_name: str,
+                                  timestamp: str,
+                                  custom_bucket: Optional[str] = None,
+                                  custom_prefix: Optional[str] = None) -> Tuple[str, int]:
+        """
+        Dump a database and store the backup in S3
+        
+        Streams the dump straight to S3 when possible, otherwise stages it in
+        a local file that is removed after the upload.
+        
+        Args:
+            s3_storage: S3 storage to upload to
+            db_config: Configuration for the database
+            db_name: Name of the database
+            timestamp: Timestamp string for the backup filename
+            custom_bucket: Optional override for the bucket name
+            custom_prefix: Optional override for the schedule-specific prefix
+            
+        Returns:
+            Tuple containing (s3_key, backup size in bytes)
+        """
+        if self.config.s3.stream_uploads and BackupEngine.supports_streaming(db_config):
+            # Stream the dump straight into a multipart upload
+            return self._stream_backup(
+                s3_storage,
+                db_config,
+                db_name,
+                timestamp,
+                custom_bucket=custom_bucket,
+                custom_prefix=custom_prefix
+            )
+        
+        # Create the backup
+        backup_path, filename = BackupEngine.backup_database(db_config, timestamp=timestamp)
+        
+        try:
+            # Only the size is needed, so skip the full get_backup_details
+            backup_size = os.path.getsize(backup_path)
+            
+            # Upload to S3
+            s3_key = s3_storage.upload_backup(
+                backup_path, 
+                db_name, 
+                filename, 
+                custom_bucket=custom_bucket,
+                custom_prefix=custom_prefix
+            )
+        finally:
+            # Clean up the local backup file without waiting for the unlink
+            self._remove_in_background(backup_path)
+        
+        return s3_key, backup_size
+    
+    def _remove_in_background(self, path: str) -> None:
+        """
+        Remove a local file on the service's cleanup thread
+        
+        Unlinking a multi-GB dump can stall on the filesystem, so it's kept out
+        of the reported duration. The thread finishes pending removals before
+        the interpreter exits.
+        
+        Args:
+            path: Path of the file to remove
+        """
+        if self._cleanup_pool is None:
+            with self._cleanup_pool_lock:
+                if self._cleanup_pool is None:
+                    self._cleanup_pool = ThreadPoolExecutor(
+                        max_workers=1,
+                        thread_name_prefix='dbsavr-cleanup'
+                    )
+        
+        self._cleanup_pool.submit(_remove_file, path)
+    
+    def _stream_backup(self, s3_storage: 'S3Storage', db_config: DatabaseConfig, db_name: str,
+                       timestamp: str,
+                       custom_bucket: Optional[str] = None,
+                       custom_prefix: Optional[str] = None) -> Tuple[str, int]:
+        """
+        Dump a database directly into S3 without a local staging file
+        
+        A dump failure is raised by the stream's final read, which aborts the
+        multipart upload. Should the upload still complete first, the (truncated)
+        object is deleted again so it can't be mistaken for a good backup.
+        
+        Args:
+            s3_storage: S3 storage to upload to
+            db_config: Configuration for the database
+            db_name: Name of the database
+            timestamp: Timestamp string for the backup filename
+            custom_bucket: Optional override for the bucket name
+            custom_prefix: Optional override for the schedule-specific prefix
+            
+        Returns:
+            Tuple containing (s3_key, backup size in bytes)
+            
+        Raises:
+            Exception: If the dump or the upload fails
+        """
+        stream, filename = BackupEngine.backup_database_stream(db_config, timestamp=timestamp)
+        
+        try:
+            s3_key = s3_storage.upload_backup_stream(
+                stream,
+                db_name,
+                filename,
+                custom_bucket=custom_bucket,
+                custom_prefix=custom_prefix
+            )
+        except BaseException:
+            stream.abort()
+            raise
+        
+        try:
+            # Wait for the dump and check every stage succeeded
+            stream.close()
+        except Exception:
+            s3_storage.delete_backup(s3_key, custom_bucket)
+            raise
+        
+        return s3_key, stream.bytes_read
+    
     def get_database_info(self, db_name: str) -> Dict[str, Any]:
         """
         Get information about a database configuration
@@ -141,11 +592,10 @@ class BackupService:
         Raises:
             ValueError: If database configuration is not found
         """
-        if db_name not in self.config.databases:
+        db_config = self.config.databases.get(db_name)
+        if db_config is None:
             raise ValueError(f"Database configuration not found for: {db_name}")
         
-        db_config = self.config.databases[db_name]
-        
         # Get all schedules for this database
         all_schedules = self._get_all_schedules_for_database(db_name)
         
@@ -156,17 +606,46 @@ class BackupService:
             'port': db_config.port,
             'database': db_config.database,
             'custom_bucket': db_config.bucket_name,
-            'schedules': all_schedules  # Return all schedules, not just the first one
+            # Return all schedules, not just the first one (copied, the cached dicts are shared)
+            'schedules': [dict(schedule) for schedule in all_schedules]
         }
     
+    def iter_database_info(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Iterate over the connection details of every configured database
+        
+        A single pass over the configured databases, for listings that would
+        otherwise call get_database_info once per name. Schedules aren't included.
+        
+        Yields:
+            Tuples of (database name, dict with database information)
+        """
+        for db_name, db_config in self.config.databases.items():
+            yield db_name, {
+                'name': db_name,
+                'type': db_config.type,
+                'host': db_config.host,
+                'port': db_config.port,
+                'database': db_config.database,
+                'custom_bucket': db_config.bucket_name
+            }
+    
     def list_available_databases(self) -> List[str]:
         """
-        Get list of all configured database names
+        Get all configured database names
+        
+        The names are cached until the configured databases change; each call
+        returns a new list that the caller is free to modify.
         
         Returns:
             List of database names
         """
-        return list(self.config.databases.keys())
+        databases = self.config.databases
+        version = (id(databases), len(databases))
+        if version != self._database_names_version:
+            self._database_names = tuple(databases)
+            self._database_names_version = version
+        return list(self._database_names)
     
     def cleanup_old_backups(self, db_name: str, days: Optional[int] = None, schedule_prefix: Optional[str] = None) -> List[str]:
         """
@@ -184,11 +663,10 @@ class BackupService:
             ValueError: If database configuration is not found
         """
         # Get database configuration
-        if db_name not in self.config.databases:
+        db_config = self.config.databases.get(db_name)
+        if db_config is None:
             raise ValueError(f"Database configuration not found for: {db_name}")
         
-        db_config = self.config.databases[db_name]
-        
         # If schedule_prefix is specified, find that specific schedule
         if schedule_prefix:
             schedule_info = self._get_schedule_by_prefix(db_name, schedule_prefix)
@@ -201,12 +679,12 @@ class BackupService:
         # Get custom bucket if configured
         custom_bucket = db_config.bucket_name
         
-        # Initialize S3 storage
-        s3_storage = S3Storage(self.config.s3)
+        s3_storage = self.s3_storage
         
-        # Clean up old backups
-        return self._cleanup_old_backups(
-            s3_storage,
+        logger.info("Cleaning up old backups for %s (retention: %s days, prefix: %s)", db_name, retention_days, prefix)
+        
+        # Clean up old backups, keeping the keys so they can be reported
+        return s3_storage.cleanup_old_backups(
             db_name,
             retention_days,
             custom_bucket=custom_bucket,
@@ -221,26 +699,14 @@ class BackupService:
             db_name: Name of the database
             
         Returns:
-            List of dicts with schedule information
-        """
-        schedules = []
-        for idx, schedule in enumerate(self.config.schedules):
-            if schedule.database_name == db_name:
-                schedules.append({
-                    'index': idx,
-                    'retention_days': schedule.retention_days,
-                    'prefix': schedule.prefix,
-                    'cron_expression': schedule.cron_expression
-                })
+            List of dicts with schedule information (shared, don't modify)
+        """
+        self._index_schedules()
+        schedules = self._schedules_by_db.get(db_name)
         
         if not schedules:
-            logger.warning(f"No schedules found for {db_name}, using default")
-            return [{
-                'index': None,
-                'retention_days': 30,
-                'prefix': None,
-                'cron_expression': None
-            }]
+            logger.warning("No schedules found for %s, using default", db_name)
+            return [self._schedule_to_info(None, None)]
         
         return schedules
     
@@ -253,24 +719,16 @@ class BackupService:
             prefix: Schedule prefix to look for
             
         Returns:
-            Dict with schedule information
-        """
-        for idx, schedule in enumerate(self.config.schedules):
-            if schedule.database_name == db_name and schedule.prefix == prefix:
-                return {
-                    'index': idx,
-                    'retention_days': schedule.retention_days,
-                    'prefix': schedule.prefix,
-                    'cron_expression': schedule.cron_expression
-                }
-        
-        logger.warning(f"No schedule found for {db_name} with prefix {prefix}, using default")
-        return {
-            'index': None,
-            'retention_days': 30,
-            'prefix': None,
-            'cron_expression': None
-        }
+            Dict with schedule information (shared, don't modify)
+        """
+        self._index_schedules()
+        info = self._schedules_by_db_prefix.get((db_name, prefix))
+        
+        if info is None:
+            logger.warning("No schedule found for %s with prefix %s, using default", db_name, prefix)
+            return self._schedule_to_info(None, None)
+        
+        return info
     
     def _get_schedule_info(self, db_name: str, schedule_index: Optional[int] = None) -> Dict[str, Any]:
         """
@@ -281,80 +739,73 @@ class BackupService:
             schedule_index: Optional specific schedule index to use
             
         Returns:
-            Dict with schedule information
+            Dict with schedule information (shared, don't modify)
         """
+        self._index_schedules()
+        
         if schedule_index is not None:
             # Use specific schedule by index
-            if 0 <= schedule_index < len(self.config.schedules):
-                schedule = self.config.schedules[schedule_index]
-                if schedule.database_name == db_name:
-                    return {
-                        'index': schedule_index,
-                        'retention_days': schedule.retention_days,
-                        'prefix': schedule.prefix,
-                        'cron_expression': schedule.cron_expression
-                    }
+            if 0 <= schedule_index < len(self._schedule_infos):
+                if self.config.schedules[schedule_index].database_name == db_name:
+                    return self._schedule_infos[schedule_index]
                 else:
-                    logger.warning(f"Schedule at index {schedule_index} is not for database {db_name}")
+                    logger.warning("Schedule at index %s is not for database %s", schedule_index, db_name)
         
         # Fall back to first matching schedule (original behavior for compatibility)
-        schedule = next((s for s in self.config.schedules if s.database_name == db_name), None)
+        schedules = self._schedules_by_db.get(db_name)
         
-        if not schedule:
-            logger.warning(f"No schedule found for {db_name}, using default retention of 30 days")
-            return {
-                'index': None,
-                'retention_days': 30,
-                'prefix': None,
-                'cron_expression': None
-            }
-        
-        # Find the index of this schedule
-        schedule_idx = None
-        for idx, s in enumerate(self.config.schedules):
-            if s == schedule:
-                schedule_idx = idx
-                break
+        if not schedules:
+            logger.warning("No schedule found for %s, using default retention of 30 days", db_name)
+            return self._schedule_to_info(None, None)
         
-        return {
-            'index': schedule_idx,
-            'retention_days': schedule.retention_days,
-            'prefix': schedule.prefix,
-            'cron_expression': schedule.cron_expression
-        }
+        return schedules[0]
     
     def _cleanup_old_backups(
         self,
-        s3_storage: S3Storage,
+        s3_storage: 'S3Storage',
         db_name: str,
         retention_days: int,
         custom_bucket: Optional[str] = None,
-        custom_prefix: Optional[str] = None
-    ) -> List[str]:
+        custom_prefix: Optional[str] = None,
+        expired_keys: Optional[List[str]] = None
+    ) -> int:
         """
         Clean up old backups using S3Storage
         
+        Only counts the deleted keys. Without expired_keys the listing is deleted
+        page by page, so memory use stays constant no matter how many backups
+        have expired.
+        
         Args:
             s3_storage: Initialized S3Storage instance
             db_name: Name of the database
             retention_days: Number of days to keep backups
             custom_bucket: Optional custom bucket name
             custom_prefix: Optional custom prefix
+            expired_keys: Optional expired keys listed in advance; if omitted they
+                          are listed (and deleted) page by page
             
         Returns:
-            List of deleted S3 keys
+            Number of deleted backups
         """
-        logger.info(f"Cleaning up old backups for {db_name} (retention: {retention_days} days, prefix: {custom_prefix})")
+        logger.info("Cleaning up old backups for %s (retention: %s days, prefix: %s)", db_name, retention_days, custom_prefix)
         
-        deleted = s3_storage.cleanup_old_backups(
-            db_name,
-            retention_days,
-            custom_bucket=custom_bucket,
-            custom_prefix=custom_prefix
-        )
+        if expired_keys is not None:
+            deleted = s3_storage.delete_backups(expired_keys, custom_bucket=custom_bucket)
+        else:
+            deleted = s3_storage.iter_cleanup_old_backups(
+                db_name,
+                retention_days,
+                custom_bucket=custom_bucket,
+                custom_prefix=custom_prefix
+            )
+        
+        deleted_count = 0
+        for _ in deleted:
+            deleted_count += 1
         
-        logger.info(f"Deleted {len(deleted)} old backups for {db_name}")
-        return deleted
+        logger.info("Deleted %s old backups for %s", deleted_count, db_name)
+        return deleted_count
     
     def _send_success_notification(
         self,
@@ -365,7 +816,7 @@ class BackupService:
         deleted_backups: int
     ) -> None:
         """
-        Send success notification if configured
+        Queue a success notification if configured
         
         Args:
             db_name: Database name
@@ -377,21 +828,18 @@ class BackupService:
         if not self.config.notifications_email:
             return
         
-        try:
-            notifier = EmailNotifier(self.config.notifications_email)
-            notifier.send_success_notification(
-                db_name=db_name,
-                backup_size=backup_size,
-                s3_key=s3_key,
-                duration=duration,
-                deleted_backups=deleted_backups
-            )
-        except Exception as e:
-            logger.error(f"Failed to send success notification: {str(e)}")
+        self._queue_notification(
+            'success',
+            db_name=db_name,
+            backup_size=backup_size,
+            s3_key=s3_key,
+            duration=duration,
+            deleted_backups=deleted_backups
+        )
     
     def _send_failure_notification(self, db_name: str, error: str) -> None:
         """
-        Send failure notification if configured
+        Queue a failure notification if configured
         
         Args:
             db_name: Database name
@@ -400,11 +848,8 @@ class BackupService:
         if not self.config.notifications_email:
             return
         
-        try:
-            notifier = EmailNotifier(self.config.notifications_email)
-            notifier.send_failure_notification(
-                db_name=db_name,
-                error=error
-            )
-        except Exception as e:
-            logger.error(f"Failed to send failure notification: {str(e)}")
\ No newline at end of file
+        self._queue_notification(
+            'failure',
+            db_name=db_name,
+            error=error
+        )
\ No newline at end of file
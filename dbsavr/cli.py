@@ -1,24 +1,289 @@
 # /dbsavr/cli.py
 import os
+import re
 import sys
+import json
 import logging
 import click
-import multiprocessing
 import signal
+import select
 import time
 import subprocess
-import tempfile
-from datetime import datetime
-from celery import Celery
-from celery.bin.worker import worker as celery_worker
-from celery.bin.beat import beat as celery_beat
-from celery.schedules import crontab
-import celery.exceptions
 
 from .config import load_config
 from .version import __version__
-from .backup_service import BackupService
-from .scheduler_service import SchedulerService
+
+# BackupService and SchedulerService are imported by the commands that use them,
+# and celery itself only once a crontab or worker is needed, so --version and
+# --help don't pay for importing smtplib/multiprocessing and fast commands like
+# list-databases don't pay for importing celery
+
+# Numeric values of the loglevel names accepted by start_worker and start_beat
+LOGLEVELS = {
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR,
+    'critical': logging.CRITICAL
+}
+
+# Command lines of the scheduler processes started by run_scheduler
+SCHEDULER_CMDLINE = re.compile(rb'celery.*dbsavr|DBSavrScheduler')
+
+def _find_pids_by_cmdline(pattern):
+    """
+    Find running processes whose command line matches a pattern
+    
+    Reads /proc directly where available, so no ps/grep processes are spawned.
+    Elsewhere psutil is used if installed, with pgrep as the last resort.
+    
+    Args:
+        pattern: Compiled bytes regex matched against the space-joined command line
+        
+    Returns:
+        List of matching PIDs, excluding this process
+    """
+    own_pid = os.getpid()
+    pids = []
+    
+    if os.path.isdir('/proc'):
+        for entry in os.scandir('/proc'):
+            if not entry.name.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry.name}/cmdline', 'rb') as f:
+                    cmdline = f.read().replace(b'\0', b' ')
+            except OSError:
+                # The process exited or isn't ours to inspect
+                continue
+            if pattern.search(cmdline):
+                pids.append(int(entry.name))
+        return [pid for pid in pids if pid != own_pid]
+    
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    
+    if psutil is not None:
+        for proc in psutil.process_iter(['pid', 'cmdline']):
+            cmdline = ' '.join(proc.info['cmdline'] or []).encode()
+            if pattern.search(cmdline):
+                pids.append(proc.info['pid'])
+    else:
+        try:
+            result = subprocess.run(
+                ['pgrep', '-f', pattern.pattern.decode()],
+                capture_output=True,
+                text=True,
+                timeout=2
+            )
+        except (FileNotFoundError, subprocess.SubprocessError):
+            return []
+        pids = [int(pid) for pid in result.stdout.split()]
+    
+    return [pid for pid in pids if pid != own_pid]
+
+def _read_pid(pid_file):
+    """
+    Read a PID file with a single unbuffered read
+    
+    Args:
+        pid_file: Path of the PID file
+        
+    Returns:
+        The PID as a string, or None if the file is missing or empty
+    """
+    try:
+        fd = os.open(pid_file, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        return os.read(fd, 64).decode().strip() or None
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+
+def _wait_for_pid_file(pid_file, timeout=5.0):
+    """
+    Wait for a detached process to write its PID file
+    
+    Polls with a short, growing interval so a PID file written within a few
+    milliseconds is picked up immediately, without busy-waiting for slow starts.
+    
+    Args:
+        pid_file: Path of the PID file
+        timeout: Maximum number of seconds to wait
+        
+    Returns:
+        The PID read from the file, or None if it didn't appear in time
+    """
+    deadline = time.monotonic() + timeout
+    interval = 0.01
+    
+    while True:
+        pid = _read_pid(pid_file)
+        if pid:
+            return pid
+        
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 2, 0.5)
+
+def _child_exit_waiter():
+    """
+    Create a function that blocks until a child process may have exited
+    
+    Uses a SIGCHLD handler together with signal.set_wakeup_fd, so an exit is
+    noticed immediately and one that happens just before the wait is never
+    missed. Other signals (e.g. SIGINT) also wake the wait, so their handlers
+    run promptly. Where SIGCHLD isn't available, falls back to polling.
+    
+    The returned function can also wait for other file descriptors (such as
+    the children's output pipes) to become readable. It returns whether a
+    signal arrived (so the children are worth polling) and the readable fds.
+    
+    Must be called from the main thread.
+    
+    Returns:
+        Function taking optional fds to watch, returning (signalled, readable fds)
+    """
+    if not hasattr(signal, 'SIGCHLD'):
+        def poll_for_child(fds=()):
+            if not fds:
+                time.sleep(1)
+                return True, []
+            return True, select.select(list(fds), [], [], 1)[0]
+        
+        return poll_for_child
+    
+    read_fd, write_fd = os.pipe()
+    os.set_blocking(read_fd, False)
+    os.set_blocking(write_fd, False)
+    
+    # The C-level handler writes to the wakeup fd; the Python handler can be a no-op
+    signal.signal(signal.SIGCHLD, lambda sig, frame: None)
+    signal.set_wakeup_fd(write_fd)
+    
+    def wait_for_child(fds=()):
+        # The timeout is only a safety net, exits are reported through the pipe
+        readable = select.select([read_fd, *fds], [], [], 60)[0]
+        # A timeout counts as signalled too, as a safety net
+        signalled = not readable or read_fd in readable
+        if read_fd in readable:
+            readable.remove(read_fd)
+            try:
+                while os.read(read_fd, 512):
+                    pass
+            except BlockingIOError:
+                pass
+        return signalled, readable
+    
+    return wait_for_child
+
+def _open_pidfds(pids):
+    """
+    Open a pidfd for each process, where the platform supports it
+    
+    Args:
+        pids: PIDs to watch
+        
+    Returns:
+        Dict mapping pidfd to PID (processes that are already gone are left
+        out), or None if pidfds aren't available for all of them
+    """
+    pidfd_open = getattr(os, 'pidfd_open', None)
+    if pidfd_open is None:
+        return None
+    
+    pidfds = {}
+    for pid in pids:
+        try:
+            pidfds[pidfd_open(int(pid))] = pid
+        except ProcessLookupError:
+            continue
+        except (OSError, ValueError):
+            # E.g. a kernel older than 5.3; fall back to polling
+            for fd in pidfds:
+                os.close(fd)
+            return None
+    return pidfds
+
+def _wait_for_exit(pids, timeout, on_exit=None):
+    """
+    Wait for processes to exit
+    
+    On Linux 5.3+ this blocks on pidfds, which become readable the moment a
+    process exits and can't be confused by PID reuse. Elsewhere it checks with
+    signal 0 at a short, growing interval (10 ms up to 200 ms). Either way a
+    progress dot is printed per second.
+    
+    Args:
+        pids: PIDs to wait for
+        timeout: Maximum number of seconds to wait
+        on_exit: Optional function called with each PID once it has exited
+        
+    Returns:
+        List of the PIDs that were still running when the timeout expired
+    """
+    remaining = list(pids)
+    deadline = time.monotonic() + timeout
+    next_dot = time.monotonic() + 1
+    interval = 0.01
+    
+    def exited(pid):
+        remaining.remove(pid)
+        if on_exit:
+            on_exit(pid)
+    
+    pidfds = _open_pidfds(remaining)
+    if pidfds is not None:
+        try:
+            # Processes without a pidfd had already exited
+            for pid in [pid for pid in remaining if pid not in pidfds.values()]:
+                exited(pid)
+            
+            while pidfds:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                if now >= next_dot:
+                    click.echo(".", nl=False)
+                    next_dot += 1
+                
+                readable = select.select(list(pidfds), [], [], min(next_dot, deadline) - now)[0]
+                for fd in readable:
+                    exited(pidfds.pop(fd))
+                    os.close(fd)
+        finally:
+            for fd in pidfds:
+                os.close(fd)
+        return remaining
+    
+    while remaining:
+        for pid in list(remaining):
+            try:
+                # Check if process exists by sending signal 0
+                os.kill(int(pid), 0)
+            except (OSError, ValueError):
+                # Process has exited
+                exited(pid)
+        
+        now = time.monotonic()
+        if not remaining or now >= deadline:
+            break
+        
+        if now >= next_dot:
+            click.echo(".", nl=False)
+            next_dot += 1
+        
+        time.sleep(min(interval, deadline - now))
+        interval = min(interval * 1.5, 0.2)
+    
+    return remaining
 
 @click.group()
 @click.option('--config', '-c', default='config.yaml', help='Path to config file')
@@ -55,74 +320,150 @@ def cli(ctx, config):
 @cli.command()
 @click.argument('database_name')
 @click.option('--timeout', '-t', default=3600, help='Timeout in seconds for backup operation (default: 1 hour)')
+@click.option('--json', 'as_json', is_flag=True, help='Print the backup results as JSON')
 @click.pass_obj
-def backup(config, database_name, timeout):
+def backup(config, database_name, timeout, as_json):
     """Run a backup for a specific database"""
+    from .backup_service import BackupService
+    
     backup_service = BackupService(config)
     
-    if database_name not in backup_service.list_available_databases():
+    # The databases dict gives an O(1) membership test; the names are only listed on error
+    if database_name not in config.databases:
         click.echo(f"Error: Database '{database_name}' not found in configuration.", err=True)
         click.echo(f"Available databases: {', '.join(backup_service.list_available_databases())}")
         sys.exit(1)
     
-    # Get all schedules for this database
-    schedules = [s for i, s in enumerate(config.schedules) if s.database_name == database_name]
+    # Get all schedules (and their indexes) for this database in one pass
+    schedules = [(idx, s) for idx, s in enumerate(config.schedules) if s.database_name == database_name]
     
     if not schedules:
         # No schedules defined, just run a default backup
-        click.echo(f"Starting backup for {database_name}...")
+        if not as_json:
+            click.echo(f"Starting backup for {database_name}...")
         try:
             result = backup_service.perform_backup(database_name)
-            click.echo(f"Backup completed: {result['status']}")
-            click.echo(f"S3 Key: {result['s3_key']}")
-            click.echo(f"Backup Size: {result['size_mb']:.2f} MB")
-            click.echo(f"Duration: {result['duration']:.2f} seconds")
-            click.echo(f"Deleted old backups: {result['deleted_backups']}")
+            if as_json:
+                click.echo(json.dumps(result, indent=2))
+                return
+            click.echo("\n".join([
+                f"Backup completed: {result['status']}",
+                f"S3 Key: {result['s3_key']}",
+                f"Backup Size: {result['size_mb']:.2f} MB",
+                f"Duration: {result['duration']:.2f} seconds",
+                f"Deleted old backups: {result['deleted_backups']}"
+            ]))
         except Exception as e:
             click.echo(f"Backup failed: {str(e)}", err=True)
             sys.exit(1)
     else:
         # Run all schedules
-        click.echo(f"Starting backup for {database_name} ({len(schedules)} schedules)...")
+        if not as_json:
+            click.echo(f"Starting backup for {database_name} ({len(schedules)} schedules)...")
         
-        for idx, schedule in enumerate(config.schedules):
-            if schedule.database_name != database_name:
-                continue
-                
+        perform_backup = backup_service.perform_backup
+        echo = click.echo
+        results = []
+        for idx, schedule in schedules:
             prefix = schedule.prefix or 'default'
-            click.echo(f"\nRunning {prefix} backup...")
+            if not as_json:
+                echo(f"\nRunning {prefix} backup...")
             
             try:
-                result = backup_service.perform_backup(database_name, schedule_index=idx)
-                click.echo(f"✓ Backup completed: {result['status']}")
-                click.echo(f"  S3 Key: {result['s3_key']}")
-                click.echo(f"  Size: {result['size_mb']:.2f} MB")
-                click.echo(f"  Duration: {result['duration']:.2f} seconds")
-                click.echo(f"  Deleted old backups: {result['deleted_backups']}")
+                result = perform_backup(database_name, schedule_index=idx)
+                results.append(result)
+                if as_json:
+                    continue
+                echo("\n".join([
+                    f"✓ Backup completed: {result['status']}",
+                    f"  S3 Key: {result['s3_key']}",
+                    f"  Size: {result['size_mb']:.2f} MB",
+                    f"  Duration: {result['duration']:.2f} seconds",
+                    f"  Deleted old backups: {result['deleted_backups']}"
+                ]))
             except Exception as e:
-                click.echo(f"✗ Backup failed for {prefix}: {str(e)}", err=True)
+                echo(f"✗ Backup failed for {prefix}: {str(e)}", err=True)
+                results.append({
+                    'status': 'failed',
+                    'database': database_name,
+                    'schedule_prefix': schedule.prefix,
+                    'error': str(e)
+                })
                 # Continue with other schedules even if one fails
+        
+        if as_json:
+            echo(json.dumps(results, indent=2))
+
+@cli.command()
+@click.option('--workers', '-w', default=None, type=int,
+              help='Number of backups run in parallel (default: one per CPU, at most one per database)')
+@click.option('--json', 'as_json', is_flag=True, help='Print the backup results as JSON')
+@click.pass_obj
+def backup_all(config, workers, as_json):
+    """Run backups for all configured databases in parallel"""
+    from .backup_service import BackupService
+    
+    db_names = list(config.databases)
+    if not db_names:
+        click.echo("No databases configured.")
+        return
+    
+    if workers is None:
+        workers = min(os.cpu_count() or 1, len(db_names))
+    
+    if not as_json:
+        click.echo(f"Starting backups for {len(db_names)} databases with {workers} workers...")
+    
+    # Each backup runs in its own worker process
+    results = BackupService(config).perform_backups(db_names, max_workers=workers)
+    
+    lines = []
+    failed = 0
+    for db_name in db_names:
+        result = results[db_name]
+        if result['status'] == 'success':
+            lines.append(f"✓ {db_name}: {result['s3_key']} ({result['size_mb']:.2f} MB, {result['duration']:.2f} seconds)")
+        else:
+            failed += 1
+            lines.append(f"✗ {db_name}: {result['error']}")
+    
+    if as_json:
+        click.echo(json.dumps({db_name: results[db_name] for db_name in db_names}, indent=2))
+    else:
+        click.echo("\n".join(lines))
+    
+    if failed:
+        click.echo(f"{failed} of {len(db_names)} backups failed", err=True)
+        sys.exit(1)
 
 @cli.command()
 @click.pass_obj
 def list_databases(config):
     """List all configured databases"""
+    from .backup_service import BackupService
+    
     backup_service = BackupService(config)
-    db_names = backup_service.list_available_databases()
     
-    click.echo("Configured databases:")
+    # Collect the output and write it at once
+    lines = ["Configured databases:"]
     
-    for db_name in db_names:
-        db_info = backup_service.get_database_info(db_name)
-        click.echo(f"\n{db_name}:")
-        click.echo(f"  Type: {db_info['type']}")
-        click.echo(f"  Host: {db_info['host']}:{db_info['port']}")
-        click.echo(f"  Database: {db_info['database']}")
+    for db_name, db_info in backup_service.iter_database_info():
+        lines.extend([
+            f"\n{db_name}:",
+            f"  Type: {db_info['type']}",
+            f"  Host: {db_info['host']}:{db_info['port']}",
+            f"  Database: {db_info['database']}"
+        ])
+    
+    click.echo("\n".join(lines))
 
 @cli.command()
 @click.pass_obj
 def list_schedules(config):
     """List all configured backup schedules"""
+    from .backup_service import BackupService
+    from .scheduler_service import SchedulerService
+    
     backup_service = BackupService(config)
     scheduler_service = SchedulerService(config, backup_service)
     
@@ -130,22 +471,27 @@ def list_schedules(config):
         click.echo("No backup schedules configured.")
         return
         
-    click.echo("Configured backup schedules:")
+    # Collect the output and write it at once
+    lines = ["Configured backup schedules:"]
     
     # Get information about next scheduled runs
     next_runs = scheduler_service.get_next_run_times()
     
     for schedule in config.schedules:
         db_name = schedule.database_name
-        click.echo(f"\nDatabase: {db_name}")
-        click.echo(f"  Schedule: {schedule.cron_expression}")
-        click.echo(f"  Retention: {schedule.retention_days} days")
+        lines.extend([
+            f"\nDatabase: {db_name}",
+            f"  Schedule: {schedule.cron_expression}",
+            f"  Retention: {schedule.retention_days} days"
+        ])
         
         # Show next run time if available
         if db_name in next_runs and 'next_run' in next_runs[db_name]:
             next_run = next_runs[db_name]['next_run']
             next_run_in = next_runs[db_name]['next_run_in']
-            click.echo(f"  Next Run: {next_run.strftime('%Y-%m-%d %H:%M:%S')} (in {next_run_in/60:.1f} minutes)")
+            lines.append(f"  Next Run: {next_run.strftime('%Y-%m-%d %H:%M:%S')} (in {next_run_in/60:.1f} minutes)")
+    
+    click.echo("\n".join(lines))
 
 @cli.command()
 @click.option('--output', '-o', default='celeryconfig.py', help='Output file path')
@@ -179,6 +525,8 @@ def setup_celery_schedule(ctx, output, force, broker_url, result_backend, run_af
             show_default=True
         )
     
+    from .scheduler_service import SchedulerService
+    
     # Use the SchedulerService to generate the configuration
     scheduler_service = SchedulerService(ctx.obj)
     config_content = scheduler_service.generate_celery_config(broker_url, result_backend)
@@ -203,16 +551,19 @@ def setup_celery_schedule(ctx, output, force, broker_url, result_backend, run_af
 @click.pass_obj
 def cleanup(config, database_name, days):
     """Clean up old backups based on retention policy"""
+    from .backup_service import BackupService
+    
     backup_service = BackupService(config)
     
-    if database_name not in backup_service.list_available_databases():
+    # The databases dict gives an O(1) membership test; the names are only listed on error
+    if database_name not in config.databases:
         click.echo(f"Error: Database '{database_name}' not found in configuration.", err=True)
         click.echo(f"Available databases: {', '.join(backup_service.list_available_databases())}")
         sys.exit(1)
 
     # Get schedule information
     db_info = backup_service.get_database_info(database_name)
-    retention_days = days if days is not None else db_info['schedule'].get('retention_days', 30)
+    retention_days = days if days is not None else db_info['schedules'][0].get('retention_days', 30)
         
     click.echo(f"Cleaning up backups for {database_name} older than {retention_days} days...")
     
@@ -248,8 +599,7 @@ def run_scheduler(config, workers, loglevel, detach, pid_file, log_dir):
         sys.exit(1)
 
     # Create log directory if it doesn't exist
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir, exist_ok=True)
+    os.makedirs(log_dir, exist_ok=True)
     
     # Set up PID files
     pid_base = pid_file or 'dbsavr'
@@ -283,106 +633,55 @@ def run_scheduler(config, workers, loglevel, detach, pid_file, log_dir):
         beat_cmd.extend(['--detach', '--pidfile', pid_file_beat, '--logfile', beat_log])
         
         click.echo(f"Starting Celery worker in detached mode (log: {worker_log})...")
+        click.echo(f"Starting Celery beat in detached mode (log: {beat_log})...")
         try:
-            # Run the worker process
-            worker_process = subprocess.run(
-                worker_cmd, 
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
+            # Both commands fork into the background and return, so start them together
+            launches = [
+                (cmd, subprocess.Popen(
+                    cmd,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True
+                ))
+                for cmd in (worker_cmd, beat_cmd)
+            ]
             
-            # Give the worker a moment to initialize and write PID file
-            click.echo("Waiting for worker to initialize...")
+            for cmd, process in launches:
+                stdout, stderr = process.communicate()
+                if process.returncode:
+                    raise subprocess.CalledProcessError(process.returncode, cmd, output=stdout, stderr=stderr)
             
-            # Poll for PID file with timeout
-            worker_pid = None
-            for _ in range(10):  # Try for up to 5 seconds (10 * 0.5)
-                if os.path.exists(pid_file_worker):
-                    try:
-                        with open(pid_file_worker, 'r') as f:
-                            worker_pid = f.read().strip()
-                        if worker_pid:
-                            break
-                    except:
-                        pass
-                time.sleep(0.5)
+            # Give both a moment to initialize and write their PID files, within one 5 second window
+            click.echo("Waiting for worker and beat scheduler to initialize...")
+            deadline = time.monotonic() + 5
+            worker_pid = _wait_for_pid_file(pid_file_worker)
+            beat_pid = _wait_for_pid_file(pid_file_beat, timeout=max(0.0, deadline - time.monotonic()))
             
             if worker_pid:
                 click.echo(f"Worker started with PID: {worker_pid}")
             else:
                 # Even if PID file isn't detected, the process might still be running
                 click.echo(f"Worker started but PID file not found. Check logs: {worker_log}")
-                # Try to find process by command pattern
-                try:
-                    ps_cmd = ["ps", "aux"]
-                    grep_cmd = ["grep", "-E", "celery.*worker.*dbsavr.tasks"]
-                    pipe1 = subprocess.Popen(ps_cmd, stdout=subprocess.PIPE)
-                    pipe2 = subprocess.Popen(grep_cmd, stdin=pipe1.stdout, stdout=subprocess.PIPE, text=True)
-                    pipe1.stdout.close()
-                    worker_ps = pipe2.communicate()[0]
-                    if worker_ps and "grep" not in worker_ps:
-                        click.echo("Worker process is running based on process list")
-                except:
-                    pass
-            
-            click.echo(f"Starting Celery beat in detached mode (log: {beat_log})...")
-            
-            # Run the beat process
-            beat_process = subprocess.run(
-                beat_cmd,
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            
-            # Poll for PID file with timeout
-            beat_pid = None
-            click.echo("Waiting for beat scheduler to initialize...")
-            for _ in range(10):  # Try for up to 5 seconds
-                if os.path.exists(pid_file_beat):
-                    try:
-                        with open(pid_file_beat, 'r') as f:
-                            beat_pid = f.read().strip()
-                        if beat_pid:
-                            break
-                    except:
-                        pass
-                time.sleep(0.5)
             
             if beat_pid:
                 click.echo(f"Beat scheduler started with PID: {beat_pid}")
             else:
                 # Even if PID file isn't detected, process might still be running
                 click.echo(f"Beat scheduler started but PID file not found. Check logs: {beat_log}")
-                # Try to find process by command pattern
-                try:
-                    ps_cmd = ["ps", "aux"]
-                    grep_cmd = ["grep", "-E", "celery.*beat.*dbsavr.tasks"]
-                    pipe1 = subprocess.Popen(ps_cmd, stdout=subprocess.PIPE)
-                    pipe2 = subprocess.Popen(grep_cmd, stdin=pipe1.stdout, stdout=subprocess.PIPE, text=True)
-                    pipe1.stdout.close()
-                    beat_ps = pipe2.communicate()[0]
-                    if beat_ps and "grep" not in beat_ps:
-                        click.echo("Beat process is running based on process list")
-                except:
-                    pass
             
             # Create a combined PID file if requested
             if pid_file and pid_file != 'dbsavr':
                 try:
+                    # Reuse the PIDs read above, only rereading files that weren't there yet
+                    worker_pid = worker_pid or _read_pid(pid_file_worker)
+                    beat_pid = beat_pid or _read_pid(pid_file_beat)
+                    
                     with open(pid_file, 'w') as f:
-                        if os.path.exists(pid_file_worker):
-                            with open(pid_file_worker, 'r') as wf:
-                                worker_pid = wf.read().strip()
-                                f.write(f"Worker PID: {worker_pid}\n")
+                        if worker_pid:
+                            f.write(f"Worker PID: {worker_pid}\n")
                         
-                        if os.path.exists(pid_file_beat):
-                            with open(pid_file_beat, 'r') as bf:
-                                beat_pid = bf.read().strip()
-                                f.write(f"Beat PID: {beat_pid}\n")
+                        if beat_pid:
+                            f.write(f"Beat PID: {beat_pid}\n")
                 except Exception as e:
                     click.echo(f"Warning: Failed to create combined PID file: {str(e)}", err=True)
             
@@ -404,8 +703,8 @@ def run_scheduler(config, workers, loglevel, detach, pid_file, log_dir):
     else:
         # For non-detached mode, run interactively
         # Create output files
-        worker_output = open(worker_log, 'w')
-        beat_output = open(beat_log, 'w')
+        worker_output = open(worker_log, 'wb')
+        beat_output = open(beat_log, 'wb')
         
         try:
             click.echo(f"Starting Celery worker with {workers} processes...")
@@ -413,8 +712,7 @@ def run_scheduler(config, workers, loglevel, detach, pid_file, log_dir):
                 worker_cmd, 
                 stdout=subprocess.PIPE, 
                 stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1  # Line buffered
+                bufsize=0  # Raw pipe, read in large chunks below
             )
             
             click.echo("Starting Celery beat scheduler...")
@@ -422,8 +720,7 @@ def run_scheduler(config, workers, loglevel, detach, pid_file, log_dir):
                 beat_cmd, 
                 stdout=subprocess.PIPE, 
                 stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1  # Line buffered
+                bufsize=0  # Raw pipe, read in large chunks below
             )
             
             click.echo("Scheduler is running. Press Ctrl+C to stop.")
@@ -449,62 +746,68 @@ def run_scheduler(config, workers, loglevel, detach, pid_file, log_dir):
             signal.signal(signal.SIGINT, signal_handler)
             signal.signal(signal.SIGTERM, signal_handler)
             
-            # Function to handle process output
-            def print_process_output(process, prefix, output_file):
-                for line in iter(process.stdout.readline, ''):
-                    if not line:
-                        break
-                    # Write to console and log file
-                    click.echo(line, nl=False)
-                    output_file.write(line)
-                    output_file.flush()
+            # Output pipes still open, mapped to their log files
+            outputs = {
+                worker_process.stdout.fileno(): worker_output,
+                beat_process.stdout.fileno(): beat_output
+            }
+            for fd in outputs:
+                os.set_blocking(fd, False)
             
-            # Monitor processes and print output
-            import threading
-            
-            # Create threads to handle output
-            worker_thread = threading.Thread(
-                target=print_process_output, 
-                args=(worker_process, "worker", worker_output)
-            )
-            beat_thread = threading.Thread(
-                target=print_process_output, 
-                args=(beat_process, "beat", beat_output)
-            )
+            def copy_output(fd):
+                """Copy the available output of a process to the console and its log file"""
+                while True:
+                    try:
+                        chunk = os.read(fd, 65536)
+                    except BlockingIOError:
+                        return
+                    if not chunk:
+                        # The process closed its output
+                        del outputs[fd]
+                        return
+                    click.echo(chunk, nl=False)
+                    outputs[fd].write(chunk)
+                    outputs[fd].flush()
             
-            # Start threads
-            worker_thread.daemon = True
-            beat_thread.daemon = True
-            worker_thread.start()
-            beat_thread.start()
+            # Wake up as soon as a child exits or writes output, all in this thread
+            wait_for_child = _child_exit_waiter()
             
             # Wait for processes to complete or be interrupted
+            signalled = True
             while True:
-                worker_status = worker_process.poll()
-                beat_status = beat_process.poll()
-                
-                if worker_status is not None or beat_status is not None:
-                    # At least one process died
-                    click.echo("\nOne of the scheduler processes has terminated unexpectedly.", err=True)
-                    
-                    if worker_status is not None:
-                        click.echo(f"Worker process exited with code {worker_status}", err=True)
-                    if beat_status is not None:
-                        click.echo(f"Beat process exited with code {beat_status}", err=True)
-                    
-                    # Terminate any remaining processes
-                    if worker_status is None:
-                        worker_process.terminate()
-                    if beat_status is None:
-                        beat_process.terminate()
+                # Children are only polled after a signal, not for every chunk of output
+                if signalled:
+                    worker_status = worker_process.poll()
+                    beat_status = beat_process.poll()
                     
-                    # Close file handlers
-                    worker_output.close()
-                    beat_output.close()
-                    
-                    sys.exit(1)
+                    if worker_status is not None or beat_status is not None:
+                        # Show the last output before reporting the exit
+                        for fd in list(outputs):
+                            copy_output(fd)
+                        
+                        # At least one process died
+                        click.echo("\nOne of the scheduler processes has terminated unexpectedly.", err=True)
+                        
+                        if worker_status is not None:
+                            click.echo(f"Worker process exited with code {worker_status}", err=True)
+                        if beat_status is not None:
+                            click.echo(f"Beat process exited with code {beat_status}", err=True)
+                        
+                        # Terminate any remaining processes
+                        if worker_status is None:
+                            worker_process.terminate()
+                        if beat_status is None:
+                            beat_process.terminate()
+                        
+                        # Close file handlers
+                        worker_output.close()
+                        beat_output.close()
+                        
+                        sys.exit(1)
                 
-                time.sleep(1)
+                signalled, readable = wait_for_child(list(outputs))
+                for fd in readable:
+                    copy_output(fd)
             
         except Exception as e:
             click.echo(f"Error running scheduler: {str(e)}", err=True)
@@ -553,22 +856,14 @@ def stop_scheduler(pid_file, graceful, timeout, force):
                 os.kill(pid, signal.SIGTERM)
                 
                 # Wait for the process to exit
-                start_time = time.time()
-                while time.time() - start_time < timeout:
+                if not _wait_for_exit([pid], timeout):
+                    click.echo("\nScheduler has been stopped gracefully.")
+                    # Clean up PID file
                     try:
-                        # Check if process exists by sending signal 0
-                        os.kill(pid, 0)
-                        click.echo(".", nl=False)
-                        time.sleep(1)
+                        os.unlink(pid_file)
                     except OSError:
-                        # Process has exited
-                        click.echo("\nScheduler has been stopped gracefully.")
-                        # Clean up PID file
-                        try:
-                            os.unlink(pid_file)
-                        except OSError:
-                            pass
-                        return 0
+                        pass
+                    return 0
                 
                 # If we get here, graceful shutdown timed out
                 click.echo("\nGraceful shutdown timed out.")
@@ -613,29 +908,7 @@ def stop_scheduler(pid_file, graceful, timeout, force):
         
         # Look for Celery processes and our simple scheduler
         try:
-            # Try using pgrep first, as it's more efficient
-            try:
-                pgrep_cmd = ["pgrep", "-f", "(celery.*dbsavr|DBSavrScheduler)"]
-                result = subprocess.run(pgrep_cmd, capture_output=True, text=True)
-                pids = result.stdout.strip().split("\n")
-                pids = [pid.strip() for pid in pids if pid.strip()]
-            except (FileNotFoundError, subprocess.SubprocessError):
-                # Fall back to ps | grep if pgrep is not available
-                ps_cmd = ["ps", "-ef"]
-                grep_cmd = ["grep", "-E", "(celery.*dbsavr|DBSavrScheduler)"]
-                pipe1 = subprocess.Popen(ps_cmd, stdout=subprocess.PIPE)
-                pipe2 = subprocess.Popen(grep_cmd, stdin=pipe1.stdout, stdout=subprocess.PIPE, text=True)
-                pipe1.stdout.close()
-                grep_result = pipe2.communicate()[0]
-                
-                # Filter out the grep process itself and extract PIDs
-                process_lines = [line for line in grep_result.strip().split("\n") 
-                                if "grep" not in line and line.strip()]
-                pids = []
-                for line in process_lines:
-                    parts = line.strip().split()
-                    if len(parts) >= 2:
-                        pids.append(parts[1])
+            pids = [str(pid) for pid in _find_pids_by_cmdline(SCHEDULER_CMDLINE)]
             
             if not pids:
                 click.echo("No running dbsavr scheduler processes found.", err=True)
@@ -654,22 +927,11 @@ def stop_scheduler(pid_file, graceful, timeout, force):
             if graceful:
                 # Wait for processes to exit
                 click.echo(f"Waiting up to {timeout} seconds for processes to exit...")
-                start_time = time.time()
-                remaining_pids = pids.copy()
-                
-                while remaining_pids and time.time() - start_time < timeout:
-                    for pid in remaining_pids.copy():
-                        try:
-                            # Check if process exists by sending signal 0
-                            os.kill(int(pid), 0)
-                        except (OSError, ValueError):
-                            # Process has exited
-                            remaining_pids.remove(pid)
-                            click.echo(f"Process {pid} has exited.")
-                    
-                    if remaining_pids:
-                        click.echo(".", nl=False)
-                        time.sleep(1)
+                remaining_pids = _wait_for_exit(
+                    pids,
+                    timeout,
+                    on_exit=lambda pid: click.echo(f"Process {pid} has exited.")
+                )
                 
                 if remaining_pids:
                     click.echo("\nSome processes did not exit in time.")
@@ -696,18 +958,7 @@ def start_worker(app, worker_args):
     """Start the Celery worker process"""
     # Convert loglevel from string to int if necessary
     if 'loglevel' in worker_args and isinstance(worker_args['loglevel'], str):
-        # Map common loglevel strings to their numeric values
-        loglevel_map = {
-            'debug': logging.DEBUG,
-            'info': logging.INFO,
-            'warning': logging.WARNING,
-            'error': logging.ERROR,
-            'critical': logging.CRITICAL
-        }
-        worker_args['loglevel'] = loglevel_map.get(
-            worker_args['loglevel'].lower(), 
-            logging.INFO
-        )
+        worker_args['loglevel'] = LOGLEVELS.get(worker_args['loglevel'].lower(), logging.INFO)
     
     # Use the worker command from celery.bin
     from celery.bin.worker import worker as worker_command
@@ -729,18 +980,7 @@ def start_beat(app, beat_args):
     """Start the Celery beat scheduler process"""
     # Convert loglevel from string to int if necessary
     if 'loglevel' in beat_args and isinstance(beat_args['loglevel'], str):
-        # Map common loglevel strings to their numeric values
-        loglevel_map = {
-            'debug': logging.DEBUG,
-            'info': logging.INFO,
-            'warning': logging.WARNING,
-            'error': logging.ERROR,
-            'critical': logging.CRITICAL
-        }
-        beat_args['loglevel'] = loglevel_map.get(
-            beat_args['loglevel'].lower(), 
-            logging.INFO
-        )
+        beat_args['loglevel'] = LOGLEVELS.get(beat_args['loglevel'].lower(), logging.INFO)
     
     # Import the beat command from celery.bin
     from celery.bin.beat import beat as beat_command
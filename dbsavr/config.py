@@ -1,8 +1,9 @@
 # /dbsavr/config.py
 import os
 import yaml
-from dataclasses import dataclass
-from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Tuple
 
 @dataclass
 class DatabaseConfig:
@@ -23,6 +24,10 @@ class S3Config:
     access_key: Optional[str] = None
     secret_key: Optional[str] = None
     # If None, will use IAM role or AWS credentials from environment
+    stream_uploads: bool = True  # Stream dumps straight to S3 instead of staging them in /tmp
+    stream_part_size_mb: int = 64  # Part size of streamed uploads; caps them at 10,000 parts (625 GiB)
+    checksum_algorithm: Optional[str] = None  # e.g. SHA256: have S3 verify and store a checksum of each upload
+    compression: str = "gzip"  # Default for databases without a 'compression' option: gzip, zstd or none
 
 @dataclass
 class BackupSchedule:
@@ -30,6 +35,18 @@ class BackupSchedule:
     cron_expression: str  # "0 3 * * *" for daily at 3 AM
     retention_days: int = 30
     prefix: Optional[str] = None  # Optional prefix override
+    # (minute, hour, day_of_month, month_of_year, day_of_week), parsed once
+    cron_parts: Tuple[str, str, str, str, str] = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        """Split and validate cron_expression so bad schedules fail at config load"""
+        cron_parts = self.cron_expression.split()
+        if len(cron_parts) != 5:
+            raise ValueError(
+                f"Invalid cron expression for {self.database_name}: {self.cron_expression!r} "
+                "(expected 5 fields: minute hour day_of_month month_of_year day_of_week)"
+            )
+        self.cron_parts = tuple(cron_parts)
 
 @dataclass
 class Config:
@@ -39,47 +56,106 @@ class Config:
     log_level: str = "INFO"
     notifications_email: Optional[str] = None
 
+# Use libyaml's parser when PyYAML was built with it
+_SafeLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# Parsed configs by absolute path, with the (mtime, size) they were parsed at
+CONFIG_CACHE_SIZE = 100
+_config_cache = OrderedDict()
+
 def load_config(config_path: str) -> Config:
-    """Load configuration from YAML file"""
-    if not os.path.exists(config_path):
+    """
+    Load configuration from YAML file
+    
+    The parsed Config is cached and reused while the file's mtime and size are
+    unchanged, so callers must treat it as read-only. Set the environment
+    variable DBSAVR_CONFIG_NO_CACHE=1 to always re-read the file.
+    
+    Args:
+        config_path: Path to the configuration file
+        
+    Returns:
+        Parsed configuration
+        
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+    """
+    try:
+        stat = os.stat(config_path)
+    except FileNotFoundError:
         raise FileNotFoundError(f"Config file not found: {config_path}")
     
-    with open(config_path, 'r') as f:
-        config_data = yaml.safe_load(f)
+    if os.environ.get('DBSAVR_CONFIG_NO_CACHE') == '1':
+        return _parse_config_file(config_path)
     
-    # Parse database configs
-    databases = {}
-    for name, db_config in config_data.get('databases', {}).items():
-        databases[name] = DatabaseConfig(
-            type=db_config['type'],
-            host=db_config['host'],
-            port=db_config['port'],
-            username=db_config['username'],
-            password=db_config['password'],
-            database=db_config['database'],
-            options=db_config.get('options'),
-            bucket_name=db_config.get('bucket_name')  # Parse optional bucket_name
-        )
+    key = os.path.abspath(config_path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    
+    cached = _config_cache.get(key)
+    if cached is not None and cached[0] == signature:
+        _config_cache.move_to_end(key)
+        return cached[1]
     
-    # Parse S3 config
+    config = _parse_config_file(config_path)
+    _config_cache[key] = (signature, config)
+    _config_cache.move_to_end(key)
+    if len(_config_cache) > CONFIG_CACHE_SIZE:
+        _config_cache.popitem(last=False)
+    return config
+
+def _parse_config_file(config_path: str) -> Config:
+    """Parse a YAML configuration file into a Config"""
+    with open(config_path, 'r') as f:
+        return _build_config(yaml.load(f, Loader=_SafeLoader))
+
+def _database_options(options: Optional[Dict[str, Any]], compression: str) -> Optional[Dict[str, Any]]:
+    """Apply the S3 section's default compression to a database's options"""
+    if compression == 'gzip' or (options and 'compression' in options):
+        # gzip is already the engine's default
+        return options
+    return dict(options or {}, compression=compression)
+
+def _build_config(config_data: Dict[str, Any]) -> Config:
+    """Build a Config from parsed configuration data"""
+    # Parse S3 config first; it's a single section, so a bad config fails fast
     s3_config = config_data.get('s3', {})
     s3 = S3Config(
         bucket_name=s3_config['bucket_name'],
         prefix=s3_config['prefix'],
         region=s3_config['region'],
         access_key=s3_config.get('access_key'),
-        secret_key=s3_config.get('secret_key')
+        secret_key=s3_config.get('secret_key'),
+        stream_uploads=s3_config.get('stream_uploads', True),
+        stream_part_size_mb=int(s3_config.get('stream_part_size_mb', 64)),
+        checksum_algorithm=s3_config.get('checksum_algorithm'),
+        compression=s3_config.get('compression', 'gzip')
     )
     
-    # Parse schedule configs
-    schedules = []
-    for schedule in config_data.get('schedules', []):
-        schedules.append(BackupSchedule(
+    # Parse schedule configs (cron expressions are validated as they're built)
+    schedules = [
+        BackupSchedule(
             database_name=schedule['database_name'],
             cron_expression=schedule['cron_expression'],
             retention_days=schedule.get('retention_days', 30),
             prefix=schedule.get('prefix')  # Parse optional prefix
-        ))
+        )
+        for schedule in config_data.get('schedules', [])
+    ]
+    
+    # Parse database configs
+    databases = {
+        name: DatabaseConfig(
+            type=db_config['type'],
+            host=db_config['host'],
+            port=db_config['port'],
+            username=db_config['username'],
+            password=db_config['password'],
+            database=db_config['database'],
+            options=_database_options(db_config.get('options'), s3.compression),
+            bucket_name=db_config.get('bucket_name')  # Parse optional bucket_name
+        )
+        for name, db_config in config_data.get('databases', {}).items()
+    }
     
     return Config(
         databases=databases,
@@ -87,4 +163,4 @@ def load_config(config_path: str) -> Config:
         schedules=schedules,
         log_level=config_data.get('log_level', 'INFO'),
         notifications_email=config_data.get('notifications_email')
-    )
\ No newline at end of file
+    )
@@ -2,44 +2,131 @@
 import logging
 import smtplib
 import ssl
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import functools
+from contextlib import ExitStack
+from dataclasses import dataclass
+from email.message import EmailMessage
 from typing import List, Optional, Dict, Any
 import os
 
 logger = logging.getLogger(__name__)
 
+@dataclass(frozen=True)
+class SMTPSettings:
+    server: str
+    port: int
+    username: Optional[str]
+    password: Optional[str]
+    sender: str
+    use_tls: bool
+    use_ssl: bool
+    persistent: bool
+
+@functools.lru_cache(maxsize=1)
+def _smtp_settings() -> SMTPSettings:
+    """
+    Read the SMTP settings from environment variables
+    
+    The environment doesn't change after the process starts, so this runs
+    once; call _smtp_settings.cache_clear() to pick up changes.
+    
+    Returns:
+        SMTP settings with defaults and port adjustments applied
+    """
+    smtp_port = int(os.environ.get('SMTP_PORT', 25))
+    
+    # SSL/TLS configuration
+    use_tls = os.environ.get('SMTP_USE_TLS', 'false').lower() in ('true', '1', 'yes')
+    use_ssl = os.environ.get('SMTP_USE_SSL', 'false').lower() in ('true', '1', 'yes')
+    
+    # Validate configuration
+    if use_ssl and use_tls:
+        logger.warning("Both SMTP_USE_SSL and SMTP_USE_TLS are enabled. Using TLS.")
+        use_ssl = False
+    
+    # Set proper default port if TLS/SSL is enabled but port is default
+    if use_ssl and smtp_port == 25:
+        smtp_port = 465
+    elif use_tls and smtp_port == 25:
+        smtp_port = 587
+    
+    return SMTPSettings(
+        server=os.environ.get('SMTP_SERVER', 'localhost'),
+        port=smtp_port,
+        username=os.environ.get('SMTP_USERNAME'),
+        password=os.environ.get('SMTP_PASSWORD'),
+        sender=os.environ.get('SMTP_SENDER', 'db-backup@example.com'),
+        use_tls=use_tls,
+        use_ssl=use_ssl,
+        persistent=os.environ.get('SMTP_PERSISTENT', 'true').lower() in ('true', '1', 'yes')
+    )
+
 class EmailNotifier:
+    # Notification bodies, filled in with str.format_map
+    SUCCESS_TEMPLATE = """
+        Database Backup Completed Successfully
+        
+        Database: {db_name}
+        Backup Size: {size_mb:.2f} MB
+        S3 Location: {s3_key}
+        Duration: {duration:.2f} seconds
+        Old Backups Removed: {deleted_backups}
+        
+        This is an automated message from the database backup utility.
+        """
+    
+    FAILURE_TEMPLATE = """
+        Database Backup Failed
+        
+        Database: {db_name}
+        Error: {error}
+        
+        Please check the logs for more details.
+        This is an automated message from the database backup utility.
+        """
+    
     def __init__(self, recipient_email: str):
         """
         Initialize the email notifier with configuration from environment variables
         
+        The SMTP connection is opened on the first notification and kept for
+        later ones (unless SMTP_PERSISTENT=0), so a burst of notifications
+        pays for the TLS handshake and login once. Call close(), or use the
+        notifier as a context manager, to end the connection.
+        
         Args:
             recipient_email: Email address to send notifications to
         """
         self.recipient = recipient_email
         
-        # Get SMTP settings from environment variables
-        self.smtp_server = os.environ.get('SMTP_SERVER', 'localhost')
-        self.smtp_port = int(os.environ.get('SMTP_PORT', 25))
-        self.smtp_username = os.environ.get('SMTP_USERNAME')
-        self.smtp_password = os.environ.get('SMTP_PASSWORD')
-        self.sender = os.environ.get('SMTP_SENDER', 'db-backup@example.com')
-        
-        # SSL/TLS configuration
-        self.use_tls = os.environ.get('SMTP_USE_TLS', 'false').lower() in ('true', '1', 'yes')
-        self.use_ssl = os.environ.get('SMTP_USE_SSL', 'false').lower() in ('true', '1', 'yes')
+        settings = _smtp_settings()
+        self.smtp_server = settings.server
+        self.smtp_port = settings.port
+        self.smtp_username = settings.username
+        self.smtp_password = settings.password
+        self.sender = settings.sender
+        self.use_tls = settings.use_tls
+        self.use_ssl = settings.use_ssl
+        self.persistent = settings.persistent
         
-        # Validate configuration
-        if self.use_ssl and self.use_tls:
-            logger.warning("Both SMTP_USE_SSL and SMTP_USE_TLS are enabled. Using TLS.")
-            self.use_ssl = False
-        
-        # Set proper default port if TLS/SSL is enabled but port is default
-        if self.use_ssl and self.smtp_port == 25:
-            self.smtp_port = 465
-        elif self.use_tls and self.smtp_port == 25:
-            self.smtp_port = 587
+        # Open persistent connection, and the stack that closes it
+        self._server = None
+        self._server_stack = None
+    
+    def __enter__(self) -> 'EmailNotifier':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+    
+    def close(self) -> None:
+        """Close the persistent SMTP connection, if one is open"""
+        stack, self._server, self._server_stack = self._server_stack, None, None
+        if stack is not None:
+            try:
+                stack.close()
+            except (smtplib.SMTPException, OSError) as e:
+                logger.debug("Error closing SMTP connection: %s", e)
     
     def send_success_notification(self, db_name: str, backup_size: int, s3_key: str, 
                                   duration: float, deleted_backups: int) -> None:
@@ -54,21 +141,13 @@ class EmailNotifier:
             deleted_backups: Number of old backups deleted
         """
         subject = f"Backup Successful: {db_name}"
-        
-        # Create a human-readable size
-        size_mb = backup_size / (1024 * 1024)
-        
-        body = f"""
-        Database Backup Completed Successfully
-        
-        Database: {db_name}
-        Backup Size: {size_mb:.2f} MB
-        S3 Location: {s3_key}
-        Duration: {duration:.2f} seconds
-        Old Backups Removed: {deleted_backups}
-        
-        This is an automated message from the database backup utility.
-        """
+        body = self.SUCCESS_TEMPLATE.format_map({
+            'db_name': db_name,
+            'size_mb': backup_size / (1024 * 1024),  # Human-readable size
+            's3_key': s3_key,
+            'duration': duration,
+            'deleted_backups': deleted_backups
+        })
         
         self._send_email(subject, body)
     
@@ -81,16 +160,7 @@ class EmailNotifier:
             error: Error message
         """
         subject = f"Backup Failed: {db_name}"
-        
-        body = f"""
-        Database Backup Failed
-        
-        Database: {db_name}
-        Error: {error}
-        
-        Please check the logs for more details.
-        This is an automated message from the database backup utility.
-        """
+        body = self.FAILURE_TEMPLATE.format_map({'db_name': db_name, 'error': error})
         
         self._send_email(subject, body)
     
@@ -103,38 +173,84 @@ class EmailNotifier:
             body: Email body text
         """
         try:
-            msg = MIMEMultipart()
+            # A single text/plain part; no multipart wrapper is needed
+            msg = EmailMessage()
             msg['From'] = self.sender
             msg['To'] = self.recipient
             msg['Subject'] = subject
+            msg.set_content(body)
             
-            msg.attach(MIMEText(body, 'plain'))
-            
-            # Different connection methods based on SSL/TLS settings
-            if self.use_ssl:
-                context = ssl.create_default_context()
-                with smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, context=context) as server:
-                    self._authenticate_and_send(server, msg)
+            if self.persistent:
+                self._send_persistent(msg)
             else:
-                with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                    if self.use_tls:
-                        server.starttls()
-                    self._authenticate_and_send(server, msg)
+                with ExitStack() as stack:
+                    self._connect(stack).send_message(msg)
             
             logger.info(f"Sent email notification: {subject}")
         except Exception as e:
             # Fix the logging format to match test expectations
             logger.error(f"Failed to send email notification: {str(e)}")
     
-    def _authenticate_and_send(self, server: Any, msg: MIMEMultipart) -> None:
+    def _send_persistent(self, msg: EmailMessage) -> None:
         """
-        Authenticate with the SMTP server if credentials are provided and send the message
+        Send a message over the persistent connection, reconnecting if it was dropped
         
         Args:
-            server: SMTP server connection
             msg: Email message to send
         """
+        server = self._get_server()
+        try:
+            server.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # The server closed the connection since it was last checked
+            self.close()
+            self._get_server().send_message(msg)
+    
+    def _get_server(self) -> Any:
+        """
+        Get the persistent SMTP connection, opening a new one if it's missing or dead
+        
+        Returns:
+            Authenticated SMTP server connection
+        """
+        if self._server is not None:
+            try:
+                if self._server.noop()[0] == 250:
+                    return self._server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.close()
+        
+        stack = ExitStack()
+        try:
+            server = self._connect(stack)
+        except BaseException:
+            stack.close()
+            raise
+        
+        self._server, self._server_stack = server, stack
+        return server
+    
+    def _connect(self, stack: ExitStack) -> Any:
+        """
+        Open and authenticate an SMTP connection with proper SSL/TLS handling
+        
+        Args:
+            stack: Exit stack that will close the connection
+            
+        Returns:
+            Authenticated SMTP server connection
+        """
+        # Different connection methods based on SSL/TLS settings
+        if self.use_ssl:
+            context = ssl.create_default_context()
+            server = stack.enter_context(smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, context=context))
+        else:
+            server = stack.enter_context(smtplib.SMTP(self.smtp_server, self.smtp_port))
+            if self.use_tls:
+                server.starttls()
+        
         if self.smtp_username and self.smtp_password:
             server.login(self.smtp_username, self.smtp_password)
         
-        server.send_message(msg)
\ No newline at end of file
+        return server
@@ -1,18 +1,88 @@
 # /dbsavr/scheduler_service.py
 import os
+import heapq
 import logging
 import threading
 import time
 import signal
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Callable, Any, Set
-from celery.schedules import crontab
+from typing import List, Dict, Optional, Callable, Any, Set, Tuple, TYPE_CHECKING
 
 from .config import Config, BackupSchedule
 from .backup_service import BackupService
 
+# celery is imported when a crontab is first needed, so listing schedules or
+# generating the Celery config doesn't pay for importing it
+if TYPE_CHECKING:
+    from celery.schedules import crontab
+
 logger = logging.getLogger(__name__)
 
+# Templates for generate_celery_config
+CELERY_CONFIG_HEADER = """'''
+Celery configuration for dbsavr scheduled backups.
+Generated by dbsavr scheduler_service on {generated_at}
+'''
+
+from celery.schedules import crontab
+
+broker_url = '{broker_url}'
+result_backend = '{result_backend}'
+
+task_serializer = 'json'
+result_serializer = 'json'
+accept_content = ['json']
+timezone = 'UTC'
+enable_utc = True
+
+beat_scheduler = 'celery.beat.PersistentScheduler'
+beat_schedule = {{
+"""
+
+CELERY_SCHEDULE_ENTRY = """    'backup-{db_name}-{idx}': {{
+        'task': 'backup_database',
+        'schedule': crontab(
+            minute='{minute}',
+            hour='{hour}',
+            day_of_month='{day_of_month}',
+            month_of_year='{month_of_year}',
+            day_of_week='{day_of_week}'
+        ),
+        'args': ['{db_name}', {idx}]
+    }},
+"""
+
+# Backups the scheduler runs at once, unless DBSAVR_MAX_PARALLEL_BACKUPS is set
+DEFAULT_MAX_PARALLEL_BACKUPS = 4
+
+def _max_parallel_backups() -> int:
+    """
+    Get the number of backups the scheduler runs at once
+    
+    Returns:
+        DBSAVR_MAX_PARALLEL_BACKUPS if it's a positive integer, otherwise
+        DEFAULT_MAX_PARALLEL_BACKUPS
+    """
+    value = os.environ.get('DBSAVR_MAX_PARALLEL_BACKUPS')
+    if value is None:
+        return DEFAULT_MAX_PARALLEL_BACKUPS
+    
+    try:
+        max_parallel = int(value)
+    except ValueError:
+        max_parallel = 0
+    if max_parallel < 1:
+        logger.error(
+            f"Invalid DBSAVR_MAX_PARALLEL_BACKUPS {value!r} (expected a positive integer); "
+            f"using {DEFAULT_MAX_PARALLEL_BACKUPS}"
+        )
+        return DEFAULT_MAX_PARALLEL_BACKUPS
+    return max_parallel
+
+# How soon to check again when a backup is due while its previous run is active
+ACTIVE_BACKUP_RECHECK_INTERVAL = 10
+
 class SchedulerService:
     """Service for managing backup schedules without Celery dependency"""
     
@@ -29,6 +99,18 @@ class SchedulerService:
         self._scheduler_thread = None
         self._stop_event = threading.Event()
         self._active_backups: Set[str] = set()  # Track active backup jobs by database name
+        self._active_backups_lock = threading.Lock()
+        
+        # Runs the backups; extra due backups queue rather than all starting at once
+        self._executor = self._create_executor()
+        
+        # First schedule for each database, used to compute its next run
+        self._schedules_by_db: Dict[str, BackupSchedule] = {}
+        for schedule in self.config.schedules:
+            self._schedules_by_db.setdefault(schedule.database_name, schedule)
+        
+        # Celery crontabs by cron fields, filled in as they're first needed
+        self._crontabs: Dict[Tuple[str, ...], 'crontab'] = {}
     
     def start_scheduler(self, daemon: bool = False) -> None:
         """
@@ -59,7 +141,7 @@ class SchedulerService:
         Stop the scheduler thread
         
         Args:
-            wait: Whether to wait for the thread to stop
+            wait: Whether to wait for the thread, and then any running backups, to stop
             timeout: Optional timeout in seconds to wait
             
         Returns:
@@ -80,6 +162,12 @@ class SchedulerService:
             if self._scheduler_thread.is_alive():
                 logger.warning("Scheduler did not stop within the timeout period")
                 return False
+            
+            # The loop has stopped submitting; wait for backups already running
+            logger.info("Waiting for running backups to finish...")
+            self._executor.shutdown(wait=True)
+            # A fresh pool (its threads start on demand) lets the scheduler be restarted
+            self._executor = self._create_executor()
         
         logger.info("Scheduler stopped")
         return True
@@ -103,30 +191,17 @@ class SchedulerService:
         now = datetime.now()
         result = {}
         
+        # Consistent view of the running backups for the whole report
+        with self._active_backups_lock:
+            active_backups = set(self._active_backups)
+        
         for schedule in self.config.schedules:
             db_name = schedule.database_name
             cron_expression = schedule.cron_expression
             
             try:
-                # Parse cron expression
-                cron_parts = cron_expression.split()
-                if len(cron_parts) != 5:
-                    raise ValueError(f"Invalid cron expression: {cron_expression}")
-                    
-                minute, hour, day_of_month, month_of_year, day_of_week = cron_parts
-                
-                # Use Celery's crontab to calculate next run time
-                # First create a crontab object
-                cron_schedule = crontab(
-                    minute=minute,
-                    hour=hour,
-                    day_of_month=day_of_month,
-                    month_of_year=month_of_year,
-                    day_of_week=day_of_week
-                )
-                
                 # Calculate next run time
-                schedule_entry = cron_schedule
+                schedule_entry = self._get_crontab(schedule)
                 next_run = schedule_entry.maybe_make_aware(schedule_entry.now())
                 delta = schedule_entry.remaining_estimate(next_run)
                 next_run = next_run + delta
@@ -136,7 +211,7 @@ class SchedulerService:
                     'next_run_in': delta.total_seconds(),
                     'cron_expression': cron_expression,
                     'retention_days': schedule.retention_days,
-                    'is_active': db_name in self._active_backups
+                    'is_active': db_name in active_backups
                 }
             except Exception as e:
                 logger.error(f"Failed to parse cron expression for {db_name}: {str(e)}")
@@ -162,102 +237,104 @@ class SchedulerService:
             result_backend = broker_url
         
         # Start with basic configuration
-        config = f"""'''
-Celery configuration for dbsavr scheduled backups.
-Generated by dbsavr scheduler_service on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-'''
-
-from celery.schedules import crontab
-
-broker_url = '{broker_url}'
-result_backend = '{result_backend}'
-
-task_serializer = 'json'
-result_serializer = 'json'
-accept_content = ['json']
-timezone = 'UTC'
-enable_utc = True
-
-beat_scheduler = 'celery.beat.PersistentScheduler'
-beat_schedule = {{
-"""
+        parts = [CELERY_CONFIG_HEADER.format(
+            generated_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            broker_url=broker_url,
+            result_backend=result_backend
+        )]
         
         # Add schedule entries with schedule index
         for idx, schedule in enumerate(self.config.schedules):
-            db_name = schedule.database_name
-            cron_parts = schedule.cron_expression.split()
-            
-            if len(cron_parts) != 5:
-                logger.warning(f"Invalid cron expression for {db_name}: {schedule.cron_expression}")
-                continue
-            
-            minute, hour, day_of_month, month_of_year, day_of_week = cron_parts
-            
-            config += f"""    'backup-{db_name}-{idx}': {{
-        'task': 'backup_database',
-        'schedule': crontab(
-            minute='{minute}',
-            hour='{hour}',
-            day_of_month='{day_of_month}',
-            month_of_year='{month_of_year}',
-            day_of_week='{day_of_week}'
-        ),
-        'args': ['{db_name}', {idx}]
-    }},
-"""
+            minute, hour, day_of_month, month_of_year, day_of_week = schedule.cron_parts
+            parts.append(CELERY_SCHEDULE_ENTRY.format(
+                db_name=schedule.database_name,
+                idx=idx,
+                minute=minute,
+                hour=hour,
+                day_of_month=day_of_month,
+                month_of_year=month_of_year,
+                day_of_week=day_of_week
+            ))
         
         # Close the configuration
-        config += "}\n"
-        return config
+        parts.append("}\n")
+        return "".join(parts)
+    
+    def _create_executor(self) -> ThreadPoolExecutor:
+        """Create the thread pool that runs the scheduled backups"""
+        return ThreadPoolExecutor(
+            max_workers=_max_parallel_backups(),
+            thread_name_prefix='Backup'
+        )
     
     def _scheduler_loop(self) -> None:
         """
         Main scheduler loop that checks schedules and runs backups
+        
+        Due times are kept as monotonic deadlines in a min-heap and the loop
+        sleeps until the soonest one, rather than waking up at a fixed interval.
         """
         logger.info("Scheduler loop started")
         
         # Keep track of the next time each backup should run
-        next_runs: Dict[str, datetime] = {}
+        next_runs: Dict[str, Tuple[float, datetime]] = {}
         
         # Initialize next_runs with current schedules
         self._update_next_runs(next_runs)
         
+        # (monotonic deadline, database name) of each pending run, soonest first
+        heap = [(deadline, db_name) for db_name, (deadline, _) in next_runs.items()]
+        heapq.heapify(heap)
+        
         # Main loop
         while not self._stop_event.is_set():
-            now = datetime.now()
+            if not heap:
+                # Nothing to schedule; just wait to be stopped
+                self._stop_event.wait()
+                break
             
-            # Check each schedule
-            for db_name, next_run in list(next_runs.items()):
-                if now >= next_run and db_name not in self._active_backups:
-                    # Time to run this backup
-                    logger.info(f"Scheduling backup for {db_name}")
-                    self._run_backup(db_name)
-                    
-                    # Update next run time for this database
-                    self._update_next_run(next_runs, db_name)
+            deadline, db_name = heap[0]
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                # Using Event.wait() instead of time.sleep() allows for quicker shutdown
+                self._stop_event.wait(delay)
+                continue
             
-            # Sleep for a short time before checking again
-            # Using Event.wait() instead of time.sleep() allows for quicker shutdown
-            self._stop_event.wait(10)  # Check every 10 seconds
+            heapq.heappop(heap)
+            with self._active_backups_lock:
+                is_active = db_name in self._active_backups
+            if is_active:
+                # The previous run is still going; check again shortly
+                heapq.heappush(heap, (time.monotonic() + ACTIVE_BACKUP_RECHECK_INTERVAL, db_name))
+                continue
+            
+            # Time to run this backup
+            logger.info(f"Scheduling backup for {db_name}")
+            self._run_backup(db_name)
+            
+            # Update next run time for this database, counting from the run that
+            # just fired (or from now, if it was delayed)
+            _, run_time = next_runs.pop(db_name)
+            self._update_next_run(next_runs, db_name, run_time)
+            if db_name in next_runs:
+                heapq.heappush(heap, (next_runs[db_name][0], db_name))
         
         logger.info("Scheduler loop stopped")
     
-    def _update_next_runs(self, next_runs: Dict[str, datetime]) -> None:
+    def _update_next_runs(self, next_runs: Dict[str, Tuple[float, datetime]]) -> None:
         """
         Update the next run times for all schedules
         
         Args:
-            next_runs: Dict to update with next run times
+            next_runs: Dict to update with (monotonic deadline, run time) pairs
         """
-        now = datetime.now()
-        
-        for schedule in self.config.schedules:
-            db_name = schedule.database_name
-            self._update_next_run(next_runs, db_name, now)
+        # One entry per database; _update_next_run uses its first schedule
+        for db_name in self._schedules_by_db:
+            self._update_next_run(next_runs, db_name)
     
     def _update_next_run(
         self, 
-        next_runs: Dict[str, datetime],
+        next_runs: Dict[str, Tuple[float, datetime]],
         db_name: str,
         base_time: Optional[datetime] = None
     ) -> None:
@@ -265,26 +342,63 @@ beat_schedule = {{
         Update the next run time for a specific database
         
         Args:
-            next_runs: Dict to update with next run time
+            next_runs: Dict to update with the (monotonic deadline, run time) pair
             db_name: Name of the database
-            base_time: Optional base time to use (defaults to now)
+            base_time: Optional time of the run that just fired; the next run is
+                       counted from it or from now, whichever is later
         """
-        now = base_time or datetime.now()
-        schedule = next((s for s in self.config.schedules if s.database_name == db_name), None)
+        schedule = self._schedules_by_db.get(db_name)
         
         if not schedule:
             logger.warning(f"No schedule found for {db_name}")
             return
         
         try:
-            # Parse cron expression
-            cron_parts = schedule.cron_expression.split()
-            if len(cron_parts) != 5:
-                raise ValueError(f"Invalid cron expression: {schedule.cron_expression}")
-                
-            minute, hour, day_of_month, month_of_year, day_of_week = cron_parts
+            # Calculate next run time
+            schedule_entry = self._get_crontab(schedule)
+            now = schedule_entry.maybe_make_aware(schedule_entry.now())
+            
+            # The run that fired is the base if the wall clock still lags its
+            # deadline, so it isn't found again; a delayed run (deferred while
+            # the previous one was active, or after a suspend) counts from now
+            # so the next run isn't already in the past
+            curr_time = now
+            if base_time is not None:
+                curr_time = max(schedule_entry.maybe_make_aware(base_time), now)
+            # remaining_estimate() measures from the current time, not curr_time,
+            # so take the next run from the delta after curr_time itself
+            start, ends_in, _ = schedule_entry.remaining_delta(curr_time)
+            next_run = start + ends_in
+            
+            # The estimate can land a fraction of a second before the minute, which
+            # would fire the run early and then find the same run again
+            if next_run.microsecond:
+                next_run = next_run.replace(microsecond=0) + timedelta(seconds=1)
+            
+            # Measure the wait from the current time, not base_time, so lag in the
+            # loop doesn't accumulate from one run to the next
+            remaining = next_run - now
+            next_runs[db_name] = (time.monotonic() + remaining.total_seconds(), next_run)
+            
+            logger.info(f"Next run for {db_name}: {next_run}")
+        except Exception as e:
+            logger.error(f"Failed to parse cron expression for {db_name}: {str(e)}")
+    
+    def _get_crontab(self, schedule: BackupSchedule) -> 'crontab':
+        """
+        Get Celery's crontab for a schedule, building one per distinct cron expression
+        
+        Args:
+            schedule: Backup schedule
+            
+        Returns:
+            crontab for the schedule's cron expression
+        """
+        cron_schedule = self._crontabs.get(schedule.cron_parts)
+        if cron_schedule is None:
+            from celery.schedules import crontab
             
-            # Use Celery's crontab to calculate next run time
+            minute, hour, day_of_month, month_of_year, day_of_week = schedule.cron_parts
             cron_schedule = crontab(
                 minute=minute,
                 hour=hour,
@@ -292,41 +406,29 @@ beat_schedule = {{
                 month_of_year=month_of_year,
                 day_of_week=day_of_week
             )
-            
-            # Calculate next run time
-            schedule_entry = cron_schedule
-            curr_time = schedule_entry.maybe_make_aware(now)
-            delta = schedule_entry.remaining_estimate(curr_time)
-            next_run = curr_time + delta
-            
-            next_runs[db_name] = next_run
-            
-            logger.info(f"Next run for {db_name}: {next_run}")
-        except Exception as e:
-            logger.error(f"Failed to parse cron expression for {db_name}: {str(e)}")
+            self._crontabs[schedule.cron_parts] = cron_schedule
+        return cron_schedule
     
     def _run_backup(self, db_name: str) -> None:
         """
-        Run a backup for a database in a separate thread
+        Run a backup for a database on the backup thread pool
         
         Args:
             db_name: Name of the database to back up
         """
-        self._active_backups.add(db_name)
+        with self._active_backups_lock:
+            self._active_backups.add(db_name)
         
-        def backup_thread():
-            try:
-                logger.info(f"Starting backup for {db_name}")
-                self.backup_service.perform_backup(db_name)
-                logger.info(f"Backup completed for {db_name}")
-            except Exception as e:
-                logger.error(f"Backup failed for {db_name}: {str(e)}", exc_info=True)
-            finally:
-                self._active_backups.remove(db_name)
+        def backup_task():
+            logger.info(f"Starting backup for {db_name}")
+            self.backup_service.perform_backup(db_name)
+            logger.info(f"Backup completed for {db_name}")
         
-        thread = threading.Thread(
-            target=backup_thread,
-            name=f"Backup-{db_name}-{int(time.time())}"
-        )
-        thread.daemon = True
-        thread.start()
\ No newline at end of file
+        def backup_done(future):
+            exc = future.exception()
+            if exc is not None:
+                logger.error(f"Backup failed for {db_name}: {str(exc)}", exc_info=exc)
+            with self._active_backups_lock:
+                self._active_backups.discard(db_name)
+        
+        self._executor.submit(backup_task).add_done_callback(backup_done)
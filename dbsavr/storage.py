@@ -1,32 +1,201 @@
 # /dbsavr/storage.py
 import os
+import re
 import logging
+import functools
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import BinaryIO, Dict, Iterator, List, Optional
 
 import boto3
+from boto3.s3 import transfer as s3_transfer
+from boto3.s3.transfer import S3Transfer, TransferConfig
+from botocore.config import Config as BotoConfig
 from botocore.exceptions import ClientError
 
 from .config import S3Config
 
 logger = logging.getLogger(__name__)
 
+# Multipart settings for uploads of staged files: backups up to 64 MiB go in a single
+# PUT, larger ones as 16 MiB parts (raised as needed to stay within 10,000 parts)
+# with 8 read and sent concurrently
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=64 * 1024 * 1024,
+    multipart_chunksize=16 * 1024 * 1024,
+    max_concurrency=8,
+    use_threads=True
+)
+
+# S3 accepts at most 10,000 parts per object. Staged files get parts large enough to
+# fit, but a stream's length is unknown up front, so its part size caps the backup
+# at 10,000 x stream_part_size_mb (625 GiB with the default 64 MiB parts). Each of
+# the STREAM_MAX_CONCURRENCY threads buffers one part in memory.
+MAX_UPLOAD_PARTS = 10000
+MIN_STREAM_PART_SIZE_MB = 5
+STREAM_MAX_CONCURRENCY = 4
+
+# Whether boto3 can hand transfers to the AWS CRT client (installed with boto3[crt]);
+# older boto3 releases have neither the flag nor the version check
+CRT_AVAILABLE = bool(
+    getattr(s3_transfer, 'HAS_CRT', False)
+    and hasattr(s3_transfer, 'has_minimum_crt_version')
+    and s3_transfer.has_minimum_crt_version((0, 19, 18))
+)
+
+# Uploads of staged backup files go through the CRT client when it's available: it
+# sends the parts from native code over parallel connections, so large files aren't
+# capped by Python threads. Streamed uploads keep the classic transfer manager.
+if CRT_AVAILABLE:
+    FILE_TRANSFER_CONFIG = TransferConfig(
+        multipart_threshold=TRANSFER_CONFIG.multipart_threshold,
+        multipart_chunksize=TRANSFER_CONFIG.multipart_chunksize,
+        max_concurrency=TRANSFER_CONFIG.max_concurrency,
+        use_threads=True,
+        preferred_transfer_client='crt'
+    )
+else:
+    FILE_TRANSFER_CONFIG = TRANSFER_CONFIG
+
+# Whether uploads can ask S3 to verify and store a checksum of their own choosing
+# (S3Config.checksum_algorithm); older boto3 releases can't pass the algorithm
+CHECKSUM_ALGORITHM_SUPPORTED = 'ChecksumAlgorithm' in S3Transfer.ALLOWED_UPLOAD_ARGS
+
+# Maximum number of keys accepted by a single DeleteObjects request
+DELETE_BATCH_SIZE = 1000
+
+# Most DeleteObjects requests sent at once by delete_backups
+DELETE_MAX_WORKERS = 8
+
+# Retry policy of the client used for deletes: a cleanup's concurrent DeleteObjects
+# batches can hit S3 503 SlowDown, and adaptive mode also backs off client-side. Uploads
+# keep botocore's default policy, without the client-side rate limiter.
+DELETE_RETRY_CONFIG = {'max_attempts': 10, 'mode': 'adaptive'}
+
+# Backup file directly under a listing prefix: {name}_{YYYYmmdd_HHMMSS}.{extension}
+BACKUP_KEY_PATTERN = re.compile(r'(?P<group>[^/]*_)(?P<stamp>\d{8}_\d{6})\.[^/]*$')
+
+# Sorts after every {group}{stamp}.{extension} key of a group
+BACKUP_GROUP_END = '99999999_999999~'
+
+@functools.lru_cache(maxsize=8)
+def _cached_s3_client(region: str, access_key: Optional[str], secret_key: Optional[str],
+                      max_pool_connections: Optional[int], for_deletes: bool = False):
+    """
+    Create (and memoize) an S3 client
+    
+    boto3 clients are thread-safe, so every storage of a process with the same
+    settings shares one client: its credentials (e.g. from the instance metadata
+    service or STS) are resolved once and its connection pool is reused.
+    
+    Args:
+        region: AWS region
+        access_key: Optional access key (uses the default credential chain if None)
+        secret_key: Optional secret key
+        max_pool_connections: Optional size of the client's HTTP connection pool
+        for_deletes: Whether the client is used for deletes (and so retries with
+                     DELETE_RETRY_CONFIG)
+        
+    Returns:
+        S3 client
+    """
+    client_kwargs = {
+        'region_name': region
+    }
+    
+    if access_key and secret_key:
+        client_kwargs['aws_access_key_id'] = access_key
+        client_kwargs['aws_secret_access_key'] = secret_key
+    
+    client_config = BotoConfig(retries=DELETE_RETRY_CONFIG) if for_deletes else BotoConfig()
+    if max_pool_connections:
+        client_config = client_config.merge(BotoConfig(max_pool_connections=max_pool_connections))
+    client_kwargs['config'] = client_config
+    
+    return boto3.client('s3', **client_kwargs)
+
+# Clients (and their pooled connections) can't be shared with forked backup workers
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_cached_s3_client.cache_clear)
+
 class S3Storage:
-    def __init__(self, config: S3Config):
+    def __init__(self, config: S3Config, max_pool_connections: Optional[int] = None):
+        """
+        Initialize the storage
+        
+        Args:
+            config: S3 configuration
+            max_pool_connections: Optional size of the client's HTTP connection pool
+                                  (botocore defaults to 10); raise it when the client
+                                  is shared by many threads
+        """
         self.config = config
+        self.max_pool_connections = max_pool_connections
+        
+        # S3 keys always use '/', whatever the local path separator is
+        root = config.prefix.rstrip('/')
+        self._key_root = f"{root}/" if root else ''
         self.s3_client = self._create_s3_client()
+        self.delete_client = None  # Created by the first delete
+        self.stream_transfer_config = self._create_stream_transfer_config()
+        self.upload_extra_args = self._upload_extra_args()
+    
+    def _upload_extra_args(self) -> Dict[str, str]:
+        """
+        Get the extra arguments for uploads from the configured checksum algorithm
+        
+        With an algorithm set, S3 verifies a checksum of every part and stores it
+        with the object; it's computed as each part is sent, so the backup is never
+        read a second time. Streams then send it in an aws-chunked trailer, which
+        some S3-compatible stores reject, so by default the SDK's own checksum
+        behavior applies.
+        
+        Raises:
+            ValueError: If a checksum algorithm is set but boto3 can't pass it
+        """
+        algorithm = self.config.checksum_algorithm
+        if not algorithm:
+            return {}
+        if not CHECKSUM_ALGORITHM_SUPPORTED:
+            raise ValueError("checksum_algorithm requires a newer boto3 release")
+        return {'ChecksumAlgorithm': algorithm}
     
-    def _create_s3_client(self):
-        """Create and return an S3 client"""
-        session_kwargs = {
-            'region_name': self.config.region
-        }
+    def _create_stream_transfer_config(self) -> TransferConfig:
+        """
+        Build the multipart settings for streamed uploads from the configured part size
         
-        if self.config.access_key and self.config.secret_key:
-            session_kwargs['aws_access_key_id'] = self.config.access_key
-            session_kwargs['aws_secret_access_key'] = self.config.secret_key
+        Raises:
+            ValueError: If the part size is below S3's minimum
+        """
+        part_size_mb = self.config.stream_part_size_mb
+        if part_size_mb < MIN_STREAM_PART_SIZE_MB:
+            raise ValueError(
+                f"stream_part_size_mb must be at least {MIN_STREAM_PART_SIZE_MB}, got {part_size_mb}"
+            )
         
-        return boto3.client('s3', **session_kwargs)
+        part_size = part_size_mb * 1024 * 1024
+        return TransferConfig(
+            multipart_threshold=TRANSFER_CONFIG.multipart_threshold,
+            multipart_chunksize=part_size,
+            max_concurrency=STREAM_MAX_CONCURRENCY,
+            use_threads=True
+        )
+    
+    def _create_s3_client(self, for_deletes: bool = False):
+        """Return the S3 client for this storage's settings, shared with other storages"""
+        return _cached_s3_client(
+            self.config.region,
+            self.config.access_key,
+            self.config.secret_key,
+            self.max_pool_connections,
+            for_deletes
+        )
+    
+    def _get_delete_client(self):
+        """Return the S3 client for deletes, creating it on first use"""
+        if self.delete_client is None:
+            self.delete_client = self._create_s3_client(for_deletes=True)
+        return self.delete_client
     
     def upload_backup(self, file_path: str, db_name: str, filename: str, 
                      custom_bucket: Optional[str] = None, custom_prefix: Optional[str] = None) -> str:
@@ -49,24 +218,91 @@ class S3Storage:
         # Use custom bucket if provided, otherwise use the default
         bucket_name = custom_bucket or self.config.bucket_name
         
-        # Base prefix is always from the config
-        prefix = self.config.prefix
-        
         # Create S3 key in format: prefix/db_name/[schedule_prefix/]filename
-        if custom_prefix:
-            s3_key = os.path.join(prefix, db_name, custom_prefix, filename)
-        else:
-            s3_key = os.path.join(prefix, db_name, filename)
+        s3_key = self._build_key(db_name, filename, custom_prefix)
         
         try:
             logger.info(f"Uploading {file_path} to s3://{bucket_name}/{s3_key}")
-            self.s3_client.upload_file(file_path, bucket_name, s3_key)
+            self.s3_client.upload_file(
+                file_path,
+                bucket_name,
+                s3_key,
+                ExtraArgs=self.upload_extra_args,
+                Config=FILE_TRANSFER_CONFIG
+            )
+            logger.info(f"Successfully uploaded backup to S3: {s3_key}")
+            return s3_key
+        except ClientError as e:
+            logger.error(f"Failed to upload backup to S3: {str(e)}")
+            raise
+    
+    def upload_backup_stream(self, fileobj: BinaryIO, db_name: str, filename: str,
+                             custom_bucket: Optional[str] = None, custom_prefix: Optional[str] = None) -> str:
+        """
+        Upload a backup from a readable stream to S3 and return the S3 object key
+        
+        The stream is sent as a concurrent multipart upload, so the backup never
+        needs to be staged on local disk. Its length is unknown, so the parts
+        are stream_part_size_mb each and the backup can be at most
+        MAX_UPLOAD_PARTS of them.
+        
+        Args:
+            fileobj: Readable binary stream with the backup contents
+            db_name: Name of the database (used in the S3 key path)
+            filename: Filename of the backup
+            custom_bucket: Optional override for the bucket name
+            custom_prefix: Optional override for the schedule-specific prefix
+            
+        Returns:
+            S3 object key of the uploaded backup
+            
+        Raises:
+            ClientError: If the upload to S3 fails
+        """
+        bucket_name = custom_bucket or self.config.bucket_name
+        s3_key = self._build_key(db_name, filename, custom_prefix)
+        
+        try:
+            logger.info(f"Streaming backup to s3://{bucket_name}/{s3_key}")
+            self.s3_client.upload_fileobj(
+                fileobj,
+                bucket_name,
+                s3_key,
+                ExtraArgs=self.upload_extra_args,
+                Config=self.stream_transfer_config
+            )
             logger.info(f"Successfully uploaded backup to S3: {s3_key}")
             return s3_key
         except ClientError as e:
             logger.error(f"Failed to upload backup to S3: {str(e)}")
             raise
     
+    def delete_backup(self, s3_key: str, custom_bucket: Optional[str] = None) -> None:
+        """
+        Delete a single backup object
+        
+        Args:
+            s3_key: S3 object key of the backup
+            custom_bucket: Optional override for the bucket name
+            
+        Raises:
+            ClientError: If the delete fails
+        """
+        bucket_name = custom_bucket or self.config.bucket_name
+        
+        try:
+            logger.info(f"Deleting backup: s3://{bucket_name}/{s3_key}")
+            self._get_delete_client().delete_object(Bucket=bucket_name, Key=s3_key)
+        except ClientError as e:
+            logger.error(f"Failed to delete backup from S3: {str(e)}")
+            raise
+    
+    def _build_key(self, db_name: str, filename: str, custom_prefix: Optional[str] = None) -> str:
+        """Build the S3 key in format: prefix/db_name/[schedule_prefix/]filename"""
+        if custom_prefix:
+            return f"{self._key_root}{db_name}/{custom_prefix}/{filename}"
+        return f"{self._key_root}{db_name}/{filename}"
+    
     def cleanup_old_backups(self, db_name: str, retention_days: int, 
                            custom_bucket: Optional[str] = None, custom_prefix: Optional[str] = None) -> List[str]:
         """
@@ -87,44 +323,234 @@ class S3Storage:
         Returns:
             List of S3 keys that were deleted
             
+        Raises:
+            ClientError: If listing or deleting objects from S3 fails
+        """
+        deleted_keys = list(self.iter_cleanup_old_backups(
+            db_name,
+            retention_days,
+            custom_bucket=custom_bucket,
+            custom_prefix=custom_prefix
+        ))
+        
+        logger.info(f"Deleted {len(deleted_keys)} old backups for {db_name}")
+        return deleted_keys
+    
+    def iter_cleanup_old_backups(self, db_name: str, retention_days: int,
+                                 custom_bucket: Optional[str] = None,
+                                 custom_prefix: Optional[str] = None) -> Iterator[str]:
+        """
+        Delete backups older than retention_days, yielding each deleted key
+        
+        Expired objects are deleted as each listing page arrives, so memory use
+        doesn't grow with the number of backups and deletion starts right away.
+        Affects the same path as cleanup_old_backups.
+        
+        Args:
+            db_name: Name of the database to clean up backups for
+            retention_days: Number of days to keep backups (backups older than this will be deleted)
+            custom_bucket: Optional override for the bucket name
+            custom_prefix: Optional override for the schedule-specific prefix
+            
+        Yields:
+            S3 keys that were deleted
+            
         Raises:
             ClientError: If listing or deleting objects from S3 fails
         """
         # Use custom bucket if provided, otherwise use the default
         bucket_name = custom_bucket or self.config.bucket_name
         
-        # Base prefix is always from the config
-        base_prefix = self.config.prefix
+        try:
+            for expired_keys in self._iter_expired_pages(db_name, retention_days, bucket_name, custom_prefix):
+                # Delete this page's expired objects before fetching the next page
+                for start in range(0, len(expired_keys), DELETE_BATCH_SIZE):
+                    yield from self._delete_batch(
+                        bucket_name,
+                        expired_keys[start:start + DELETE_BATCH_SIZE]
+                    )
+        except ClientError as e:
+            logger.error(f"Failed to cleanup old backups: {str(e)}")
+            raise
+    
+    def list_expired_backups(self, db_name: str, retention_days: int,
+                             custom_bucket: Optional[str] = None,
+                             custom_prefix: Optional[str] = None) -> List[str]:
+        """
+        List backups older than retention_days without deleting them
+        
+        Lets the listing run ahead (e.g. while a new backup is uploading); pass
+        the result to delete_backups once it is safe to delete.
+        
+        Args:
+            db_name: Name of the database to list backups for
+            retention_days: Number of days to keep backups
+            custom_bucket: Optional override for the bucket name
+            custom_prefix: Optional override for the schedule-specific prefix
+            
+        Returns:
+            List of expired S3 keys
+            
+        Raises:
+            ClientError: If listing objects from S3 fails
+        """
+        bucket_name = custom_bucket or self.config.bucket_name
+        
+        try:
+            return [
+                key
+                for expired_keys in self._iter_expired_pages(db_name, retention_days, bucket_name, custom_prefix)
+                for key in expired_keys
+            ]
+        except ClientError as e:
+            logger.error(f"Failed to list old backups: {str(e)}")
+            raise
+    
+    def delete_backups(self, keys: List[str], custom_bucket: Optional[str] = None) -> Iterator[str]:
+        """
+        Delete backups in DeleteObjects batches, yielding each deleted key
+        
+        When there is more than one batch, up to DELETE_MAX_WORKERS of them are
+        sent concurrently, so keys are yielded in the order batches complete.
         
-        # Construct the full prefix with optional schedule prefix
+        Args:
+            keys: S3 keys to delete
+            custom_bucket: Optional override for the bucket name
+            
+        Yields:
+            S3 keys that were deleted
+            
+        Raises:
+            ClientError: If deleting objects from S3 fails
+        """
+        bucket_name = custom_bucket or self.config.bucket_name
+        batches = [keys[start:start + DELETE_BATCH_SIZE] for start in range(0, len(keys), DELETE_BATCH_SIZE)]
+        
+        try:
+            if len(batches) <= 1:
+                for batch in batches:
+                    yield from self._delete_batch(bucket_name, batch)
+                return
+            
+            # boto3 clients are thread-safe, so the requests' latency can overlap
+            with ThreadPoolExecutor(max_workers=min(DELETE_MAX_WORKERS, len(batches)),
+                                    thread_name_prefix='dbsavr-delete') as executor:
+                futures = [
+                    executor.submit(self._delete_batch, bucket_name, batch)
+                    for batch in batches
+                ]
+                for future in as_completed(futures):
+                    yield from future.result()
+        except ClientError as e:
+            logger.error(f"Failed to delete old backups: {str(e)}")
+            raise
+    
+    def _iter_expired_pages(self, db_name: str, retention_days: int, bucket_name: str,
+                            custom_prefix: Optional[str] = None) -> Iterator[List[str]]:
+        """
+        List a database's backups page by page, yielding the expired keys of each page
+        
+        Only objects under {prefix}/{db_name}/[{schedule_prefix}/] are considered.
+        
+        Args:
+            db_name: Name of the database
+            retention_days: Number of days to keep backups
+            bucket_name: Bucket to list
+            custom_prefix: Optional schedule-specific prefix
+            
+        Yields:
+            Expired S3 keys of each listing page
+        """
+        # Construct the full prefix with optional schedule prefix. The trailing
+        # separator keeps e.g. "app" from matching the backups of "app_v2".
         if custom_prefix:
-            prefix = os.path.join(base_prefix, db_name, custom_prefix)
+            prefix = f"{self._key_root}{db_name}/{custom_prefix}/"
         else:
-            prefix = os.path.join(base_prefix, db_name)
+            prefix = f"{self._key_root}{db_name}/"
         
         cutoff_date = datetime.utcnow() - timedelta(days=retention_days)
         
-        deleted_keys = []
+        # Backups are named with the local time they started, so only names at
+        # least a day past the cutoff are certainly too new to expire
+        skip_stamp = (cutoff_date + timedelta(days=1)).strftime('%Y%m%d_%H%M%S')
         
-        try:
-            # List all objects with the given prefix
-            paginator = self.s3_client.get_paginator('list_objects_v2')
-            pages = paginator.paginate(Bucket=bucket_name, Prefix=prefix)
+        # List all objects with the given prefix
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        start_after = None
+        while True:
+            list_kwargs = {'StartAfter': start_after} if start_after else {}
+            pages = paginator.paginate(
+                Bucket=bucket_name,
+                Prefix=prefix,
+                PaginationConfig={'PageSize': DELETE_BATCH_SIZE},
+                **list_kwargs
+            )
             
+            start_after = None
             for page in pages:
                 if 'Contents' not in page:
                     continue
                 
-                for obj in page['Contents']:
-                    # Check if object is older than retention period
-                    if obj['LastModified'].replace(tzinfo=None) < cutoff_date:
-                        s3_key = obj['Key']
-                        logger.info(f"Deleting old backup: s3://{bucket_name}/{s3_key}")
-                        self.s3_client.delete_object(Bucket=bucket_name, Key=s3_key)
-                        deleted_keys.append(s3_key)
-            
-            logger.info(f"Deleted {len(deleted_keys)} old backups for {db_name}")
-            return deleted_keys
-        except ClientError as e:
-            logger.error(f"Failed to cleanup old backups: {str(e)}")
-            raise
\ No newline at end of file
+                # Check which objects are older than retention period
+                yield [
+                    obj['Key'] for obj in page['Contents']
+                    if obj['LastModified'].replace(tzinfo=None) < cutoff_date
+                ]
+                
+                if page.get('IsTruncated'):
+                    start_after = self._skip_recent_backups(prefix, page['Contents'], skip_stamp)
+                    if start_after:
+                        break
+            
+            if start_after is None:
+                return
+    
+    @staticmethod
+    def _skip_recent_backups(prefix: str, contents: List[Dict], skip_stamp: str) -> Optional[str]:
+        """
+        Find where listing can resume to skip the rest of a run of recent backups
+        
+        Keys sort by name, so the backups of one database sort by timestamp. If a
+        page ends in such a run and has already reached backups named after
+        skip_stamp, the rest of the run can't be expired and needn't be listed.
+        
+        Args:
+            prefix: Listing prefix
+            contents: Objects of the listing page
+            skip_stamp: Timestamp from which backups are certainly not expired
+            
+        Returns:
+            StartAfter key that skips the rest of the run, or None to keep listing
+        """
+        match = BACKUP_KEY_PATTERN.match(contents[-1]['Key'], len(prefix))
+        if match is None or match.group('stamp') < skip_stamp:
+            return None
+        return f"{prefix}{match.group('group')}{BACKUP_GROUP_END}"
+    
+    def _delete_batch(self, bucket_name: str, keys: List[str]) -> List[str]:
+        """
+        Delete up to DELETE_BATCH_SIZE objects with a single request
+        
+        Args:
+            bucket_name: Bucket containing the objects
+            keys: S3 keys to delete
+            
+        Returns:
+            List of S3 keys that were deleted
+            
+        Raises:
+            ClientError: If the delete request fails
+        """
+        logger.info(f"Deleting {len(keys)} old backups from s3://{bucket_name}")
+        response = self._get_delete_client().delete_objects(
+            Bucket=bucket_name,
+            Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True}
+        )
+        
+        # Quiet mode only reports the keys that could not be deleted
+        failed_keys = set()
+        for error in response.get('Errors', []):
+            failed_keys.add(error['Key'])
+            logger.error(f"Failed to delete s3://{bucket_name}/{error['Key']}: {error.get('Message')}")
+        
+        return [key for key in keys if key not in failed_keys]
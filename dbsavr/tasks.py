@@ -1,6 +1,7 @@
 # /dbsavr/tasks.py
 import os
 import logging
+import threading
 from datetime import datetime
 from celery import Celery
 import tempfile
@@ -22,19 +23,27 @@ except ImportError:
 _config = None
 _backup_service = None
 
+# Serialises first-time initialisation for thread/gevent pools
+_init_lock = threading.Lock()
+
 def get_config():
     """Lazy load configuration"""
     global _config
     if _config is None:
-        config_path = os.environ.get('DB_BACKUP_CONFIG', 'config.yaml')
-        _config = load_config(config_path)
+        with _init_lock:
+            if _config is None:
+                config_path = os.environ.get('DB_BACKUP_CONFIG', 'config.yaml')
+                _config = load_config(config_path)
     return _config
 
 def get_backup_service():
     """Lazy load backup service"""
     global _backup_service
     if _backup_service is None:
-        _backup_service = BackupService(get_config())
+        config = get_config()
+        with _init_lock:
+            if _backup_service is None:
+                _backup_service = BackupService(config)
     return _backup_service
 
 @app.task(bind=True, name='backup_database')
@@ -54,6 +63,7 @@ def backup_database(self, db_name: str, schedule_index: int = None):
     logger = logging.getLogger(__name__)
     logger.info(f"Celery task started for database backup: {db_name} (schedule_index: {schedule_index})")
     
+    backup_service = None
     try:
         # Use BackupService to perform the backup with the specific schedule
         backup_service = get_backup_service()
@@ -62,4 +72,9 @@ def backup_database(self, db_name: str, schedule_index: int = None):
         return result
     except Exception as e:
         logger.error(f"Backup task failed for {db_name}: {str(e)}", exc_info=True)
-        raise
\ No newline at end of file
+        raise
+    finally:
+        # Celery's prefork children leave through os._exit, skipping the atexit
+        # flush, so send this backup's notification before the task returns
+        if backup_service is not None:
+            backup_service.flush_notifications()
\ No newline at end of file
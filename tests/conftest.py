@@ -0,0 +1,27 @@
+# /tests/conftest.py
+import io
+import pytest
+
+class FakePopen:
+    """Finished subprocess.Popen stand-in, much cheaper to create and use than a MagicMock"""
+    
+    __slots__ = ('returncode', 'stdout', 'stderr_output')
+    
+    def __init__(self, returncode=0, stdout=b'', stderr=b''):
+        self.returncode = returncode
+        self.stdout = io.BytesIO(stdout)
+        self.stderr_output = stderr
+    
+    def communicate(self, input=None, timeout=None):
+        return b'', self.stderr_output
+    
+    def wait(self, timeout=None):
+        return self.returncode
+    
+    def kill(self):
+        pass
+
+@pytest.fixture
+def fake_popen():
+    """Factory for FakePopen processes, e.g. mock_popen.side_effect = [fake_popen(0), fake_popen(0)]."""
+    return FakePopen
@@ -1,12 +1,22 @@
 # /tests/test_backup_engine.py
+import io
 import os
+import sys
+import subprocess
 import tempfile
+import threading
 import pytest
-from unittest.mock import patch, MagicMock, ANY, call
+from unittest.mock import patch, MagicMock, call
 
 from dbsavr.backup_engine import BackupEngine
 from dbsavr.config import DatabaseConfig
 
+@pytest.fixture(autouse=True)
+def no_pigz():
+    """Compress gzip in-process as if pigz weren't installed, unless a test patches which()."""
+    with patch('dbsavr.backup_engine.shutil.which', return_value=None):
+        yield
+
 @pytest.fixture
 def mysql_config():
     """Create a sample MySQL configuration for testing."""
@@ -47,27 +57,21 @@ def mongodb_config():
 
 @patch('dbsavr.backup_engine.subprocess.Popen')
 @patch('dbsavr.backup_engine.tempfile.gettempdir')
-def test_backup_mysql(mock_tempfile, mock_popen, mysql_config):
+def test_backup_mysql(mock_tempfile, mock_popen, mysql_config, fake_popen):
     """Test MySQL backup functionality with detailed verification of commands."""
     # Setup
     mock_tempfile.return_value = "/tmp"
     
     # Mock mysqldump process
-    mysqldump_mock = MagicMock()
-    mysqldump_mock.returncode = 0
-    mysqldump_mock.communicate.return_value = (b'', b'')
-    mysqldump_mock.stdout = MagicMock()
-    
-    # Mock gzip process
-    gzip_mock = MagicMock()
-    gzip_mock.returncode = 0
-    gzip_mock.communicate.return_value = (b'', b'')
+    mysqldump_mock = fake_popen(0, stdout=b'-- MySQL dump')
     
-    # Configure mock_popen to return different mocks based on command
-    mock_popen.side_effect = [mysqldump_mock, gzip_mock]
+    # Configure mock_popen to return the dump process
+    mock_popen.side_effect = [mysqldump_mock]
     
     # Call the method
-    with patch('builtins.open', MagicMock()):
+    with patch('builtins.open', MagicMock()), \
+         patch.object(BackupEngine, '_sync_and_drop_cache'), \
+         patch('dbsavr.backup_engine.os.replace'):
         path, filename = BackupEngine._backup_mysql(mysql_config, "20250101_120000")
     
     # Assertions
@@ -76,7 +80,8 @@ def test_backup_mysql(mock_tempfile, mock_popen, mysql_config):
     assert "test_database_20250101_120000" in filename
     
     # Verify mysqldump command in detail
-    assert len(mock_popen.call_args_list) >= 2
+    # Compression happens in-process, so mysqldump is the only process
+    assert len(mock_popen.call_args_list) == 1
     # First call should be mysqldump
     mysqldump_call = mock_popen.call_args_list[0]
     
@@ -102,35 +107,72 @@ def test_backup_mysql(mock_tempfile, mock_popen, mysql_config):
     assert 'MYSQL_PWD' in env
     assert env['MYSQL_PWD'] == mysql_config.password
     
-    # Verify gzip command
-    gzip_call = mock_popen.call_args_list[1]
-    assert gzip_call[0][0][0] == 'gzip'
+    # Verify the dump doesn't inherit other descriptors and runs in its own session
+    assert mysqldump_call[1]['close_fds'] is True
+    assert mysqldump_call[1]['start_new_session'] is True
+
+@patch('dbsavr.backup_engine.subprocess.Popen')
+@patch('dbsavr.backup_engine.tempfile.gettempdir')
+def test_backup_mysql_writes_gzip_file(mock_tempfile, mock_popen, mysql_config, tmp_path, fake_popen):
+    """Test that the dump output is compressed in-process into a valid gzip file."""
+    import gzip
+    
+    # Setup
+    mock_tempfile.return_value = str(tmp_path)
+    dump_output = b"CREATE TABLE test (id INT);\n" * 1000
+    
+    # Mock mysqldump process
+    mysqldump_mock = fake_popen(0, stdout=dump_output)
+    mock_popen.return_value = mysqldump_mock
+    
+    # Call the method
+    path, filename = BackupEngine._backup_mysql(mysql_config, "20250101_120000")
+    
+    # The backup file should decompress to the exact dump output
+    with gzip.open(path, 'rb') as f:
+        assert f.read() == dump_output
+    
+    # The temporary .part file has been renamed to the final name
+    assert os.listdir(tmp_path) == [filename]
+    
+    # The gzip header names the final file (for gunzip -N), not the .part file
+    with open(path, 'rb') as f:
+        header = f.read(10 + len(filename))
+    assert header[10:].split(b'\0')[0] == filename[:-len('.gz')].encode()
+
+@patch('dbsavr.backup_engine.subprocess.Popen')
+@patch('dbsavr.backup_engine.tempfile.gettempdir')
+def test_backup_mysql_failure_removes_part_file(mock_tempfile, mock_popen, mysql_config, tmp_path, fake_popen):
+    """Test that a failed dump leaves neither a .part file nor a final backup file."""
+    mock_tempfile.return_value = str(tmp_path)
+    
+    mysqldump_mock = fake_popen(2, stdout=b'-- partial dump', stderr=b'Error: access denied')
+    mock_popen.return_value = mysqldump_mock
+    
+    with pytest.raises(Exception, match="mysqldump failed"):
+        BackupEngine._backup_mysql(mysql_config, "20250101_120000")
+    
+    assert os.listdir(tmp_path) == []
 
 @patch('dbsavr.backup_engine.subprocess.Popen')
 @patch('dbsavr.backup_engine.tempfile.gettempdir')
 @patch('dbsavr.backup_engine.os.environ.copy')
-def test_backup_postgresql(mock_environ, mock_tempfile, mock_popen, postgresql_config):
+def test_backup_postgresql(mock_environ, mock_tempfile, mock_popen, postgresql_config, fake_popen):
     """Test PostgreSQL backup functionality."""
     # Setup
     mock_tempfile.return_value = "/tmp"
     mock_environ.return_value = {"PATH": "/usr/bin"}
     
     # Mock pg_dump process
-    pg_dump_mock = MagicMock()
-    pg_dump_mock.returncode = 0
-    pg_dump_mock.communicate.return_value = (b'', b'')
-    pg_dump_mock.stdout = MagicMock()
+    pg_dump_mock = fake_popen(0, stdout=b'-- PostgreSQL database dump')
     
-    # Mock gzip process
-    gzip_mock = MagicMock()
-    gzip_mock.returncode = 0
-    gzip_mock.communicate.return_value = (b'', b'')
-    
-    # Configure mock_popen to return different mocks based on command
-    mock_popen.side_effect = [pg_dump_mock, gzip_mock]
+    # Configure mock_popen to return the dump process
+    mock_popen.side_effect = [pg_dump_mock]
     
     # Call the method
-    with patch('builtins.open', MagicMock()):
+    with patch('builtins.open', MagicMock()), \
+         patch.object(BackupEngine, '_sync_and_drop_cache'), \
+         patch('dbsavr.backup_engine.os.replace'):
         path, filename = BackupEngine._backup_postgresql(postgresql_config, "20250101_120000")
     
     # Assertions
@@ -140,7 +182,7 @@ def test_backup_postgresql(mock_environ, mock_tempfile, mock_popen, postgresql_c
     
     # Check if pg_dump was called with correct args
     calls = mock_popen.call_args_list
-    assert len(calls) >= 1
+    assert len(calls) == 1
     pg_dump_args = calls[0][0][0]
     assert "pg_dump" in pg_dump_args[0]
     assert "--host=localhost" in pg_dump_args
@@ -151,62 +193,268 @@ def test_backup_postgresql(mock_environ, mock_tempfile, mock_popen, postgresql_c
     env = calls[0][1]['env']
     assert "PGPASSWORD" in env
     assert env["PGPASSWORD"] == "test_password"
-    
-    # Check if gzip was called
-    assert "gzip" in calls[1][0][0][0]
 
 @patch('dbsavr.backup_engine.subprocess.Popen')
-@patch('dbsavr.backup_engine.subprocess.run')
 @patch('dbsavr.backup_engine.tempfile.gettempdir')
-@patch('dbsavr.backup_engine.os.makedirs')
+@patch('dbsavr.backup_engine.os.environ.copy')
+def test_backup_postgresql_zstd(mock_environ, mock_tempfile, mock_popen, postgresql_config, fake_popen):
+    """Test PostgreSQL backup piped through zstd when configured."""
+    # Setup
+    mock_tempfile.return_value = "/tmp"
+    mock_environ.return_value = {"PATH": "/usr/bin"}
+    postgresql_config.options["compression"] = "zstd"
+    
+    # Mock pg_dump process
+    pg_dump_mock = fake_popen(0)
+    
+    # Mock zstd process
+    zstd_mock = fake_popen(0)
+    
+    mock_popen.side_effect = [pg_dump_mock, zstd_mock]
+    
+    # Call the method
+    with patch('builtins.open', MagicMock()), \
+         patch.object(BackupEngine, '_sync_and_drop_cache'), \
+         patch('dbsavr.backup_engine.os.replace'):
+        path, filename = BackupEngine._backup_postgresql(postgresql_config, "20250101_120000")
+    
+    # Assertions
+    assert path.endswith(".sql.zst")
+    assert filename == "test_database_20250101_120000.sql.zst"
+    
+    # Check that zstd reads from pg_dump and uses all cores
+    calls = mock_popen.call_args_list
+    assert len(calls) == 2
+    zstd_args = calls[1][0][0]
+    assert zstd_args[0] == "zstd"
+    assert "-T0" in zstd_args
+    assert "--long=27" in zstd_args
+    assert calls[1][1]['stdin'] is pg_dump_mock.stdout
+
 @patch('dbsavr.backup_engine.shutil.rmtree')
-def test_backup_mongodb(mock_rmtree, mock_makedirs, mock_tempfile, mock_run, mock_popen, mongodb_config):
+@patch('dbsavr.backup_engine.subprocess.run')
+@patch('dbsavr.backup_engine.tempfile.mkdtemp')
+@patch('dbsavr.backup_engine.tempfile.gettempdir')
+@patch('dbsavr.backup_engine.os.environ.copy')
+def test_backup_postgresql_directory_format(mock_environ, mock_tempfile, mock_mkdtemp, mock_run, mock_rmtree,
+                                            postgresql_config):
+    """Test parallel directory-format pg_dump archived with tar instead of piped to gzip."""
+    mock_tempfile.return_value = "/tmp"
+    mock_mkdtemp.return_value = "/tmp/pgdump_abc"
+    mock_environ.return_value = {"PATH": "/usr/bin"}
+    mock_run.return_value = MagicMock(returncode=0, stderr=b'')
+    postgresql_config.options["directory_format"] = True
+    
+    with patch('dbsavr.backup_engine.os.replace') as mock_replace, \
+         patch('dbsavr.backup_engine.os.cpu_count', return_value=4):
+        path, filename = BackupEngine._backup_postgresql(postgresql_config, "20250101_120000")
+    
+    assert filename == "test_database_20250101_120000.tar"
+    assert path == "/tmp/test_database_20250101_120000.tar"
+    mock_replace.assert_called_once_with(path + ".part", path)
+    
+    calls = mock_run.call_args_list
+    assert len(calls) == 2
+    pg_dump_args = calls[0][0][0]
+    assert "pg_dump" in pg_dump_args[0]
+    assert "--format=directory" in pg_dump_args
+    assert "--jobs=4" in pg_dump_args
+    assert "--compress=9" in pg_dump_args
+    assert "--file=/tmp/pgdump_abc/pgdump_20250101_120000" in pg_dump_args
+    assert "--exclude-table=temp_logs" in pg_dump_args
+    assert calls[0][1]['env']["PGPASSWORD"] == "test_password"
+    
+    # The second step archives the already compressed files with tar, not gzip
+    tar_args = calls[1][0][0]
+    assert tar_args[0] == "tar"
+    assert "gzip" not in tar_args and "pigz" not in tar_args
+    assert tar_args[tar_args.index("-cf") + 1] == path + ".part"
+    
+    mock_rmtree.assert_called_once_with("/tmp/pgdump_abc", ignore_errors=True)
+    assert BackupEngine.supports_streaming(postgresql_config) is False
+
+def test_unsupported_compression(mysql_config):
+    """Test that an unsupported compression format raises a ValueError."""
+    mysql_config.options["compression"] = "lzma"
+    
+    with pytest.raises(ValueError, match="Unsupported compression"):
+        BackupEngine._backup_mysql(mysql_config, "20250101_120000")
+
+@patch('dbsavr.backup_engine.subprocess.Popen')
+@patch('dbsavr.backup_engine.shutil.which')
+@patch('dbsavr.backup_engine.tempfile.gettempdir')
+def test_backup_mongodb(mock_tempfile, mock_which, mock_popen, mongodb_config, fake_popen):
     """Test MongoDB backup functionality."""
     # Setup
     mock_tempfile.return_value = "/tmp"
+    mock_which.return_value = None  # pigz not installed
     
-    # Mock mongodump process
-    mongodump_mock = MagicMock()
-    mongodump_mock.returncode = 0
-    mongodump_mock.communicate.return_value = (b'', b'')
-    
-    # Mock tar process
-    tar_mock = MagicMock()
-    tar_mock.returncode = 0
-    tar_mock.communicate.return_value = (b'', b'')
+    # Mock mongodump process writing its archive to stdout
+    mongodump_mock = fake_popen(0, stdout=b'mongodump archive')
     
-    # Configure mock_popen to return different mocks
-    mock_popen.side_effect = [mongodump_mock, tar_mock]
+    mock_popen.side_effect = [mongodump_mock]
     
     # Call the method
-    path, filename = BackupEngine._backup_mongodb(mongodb_config, "20250101_120000")
+    with patch('builtins.open', MagicMock()), \
+         patch.object(BackupEngine, '_sync_and_drop_cache'), \
+         patch('dbsavr.backup_engine.os.replace'), \
+         patch('dbsavr.backup_engine.os.cpu_count', return_value=4):
+        path, filename = BackupEngine._backup_mongodb(mongodb_config, "20250101_120000")
     
     # Assertions
     assert path.startswith("/tmp/")
-    assert path.endswith(".tar.gz")
+    assert path.endswith(".archive.gz")
     assert "test_database_20250101_120000" in filename
     
-    # Check if mongodump was called with correct args
+    # mongodump is the only process; no dump directory or tar is involved
     calls = mock_popen.call_args_list
-    assert len(calls) >= 1
+    assert len(calls) == 1
     mongodump_args = calls[0][0][0]
     assert "mongodump" in mongodump_args[0]
     assert f"--host={mongodb_config.host}" in mongodump_args
     assert f"--username={mongodb_config.username}" in mongodump_args
     assert f"--db={mongodb_config.database}" in mongodump_args
+    assert "--archive" in mongodump_args
+    assert "--numParallelCollections=4" in mongodump_args
+    assert not any(arg.startswith("--out") for arg in mongodump_args)
+
+@patch('dbsavr.backup_engine.subprocess.Popen')
+@patch('dbsavr.backup_engine.shutil.which')
+@patch('dbsavr.backup_engine.tempfile.gettempdir')
+def test_backup_mongodb_pigz(mock_tempfile, mock_which, mock_popen, mongodb_config, fake_popen):
+    """Test that the MongoDB archive is compressed by pigz when it is installed."""
+    # Setup
+    mock_tempfile.return_value = "/tmp"
+    mock_which.return_value = "/usr/bin/pigz"
     
-    # Check if tar was called
-    tar_args = calls[1][0][0]
-    assert "tar" in tar_args[0]
-    assert "-czf" in tar_args
+    process_mocks = []
+    for _ in range(2):
+        process_mock = fake_popen(0)
+        process_mocks.append(process_mock)
+    
+    # mongodump and pigz
+    mock_popen.side_effect = process_mocks
+    
+    # Call the method
+    with patch('builtins.open', MagicMock()), \
+         patch.object(BackupEngine, '_sync_and_drop_cache'), \
+         patch('dbsavr.backup_engine.os.replace'):
+        path, filename = BackupEngine._backup_mongodb(mongodb_config, "20250101_120000")
+    
+    # Assertions
+    assert filename == "test_database_20250101_120000.archive.gz"
+    
+    # Check that pigz compresses mongodump's output
+    calls = mock_popen.call_args_list
+    assert len(calls) == 2
+    pigz_args = calls[1][0][0]
+    assert pigz_args[0] == "pigz"
+    assert calls[1][1]['stdin'] is process_mocks[0].stdout
+
+@patch('dbsavr.backup_engine.subprocess.Popen')
+@patch('dbsavr.backup_engine.shutil.which')
+@patch('dbsavr.backup_engine.tempfile.gettempdir')
+def test_backup_mysql_pigz(mock_tempfile, mock_which, mock_popen, mysql_config, fake_popen):
+    """Test that SQL dumps are compressed by pigz on all cores when it is installed."""
+    mock_tempfile.return_value = "/tmp"
+    mock_which.return_value = "/usr/bin/pigz"
+    
+    process_mocks = []
+    for _ in range(2):
+        process_mock = fake_popen(0)
+        process_mocks.append(process_mock)
+    
+    # mysqldump and pigz
+    mock_popen.side_effect = process_mocks
+    
+    with patch('builtins.open', MagicMock()), \
+         patch.object(BackupEngine, '_sync_and_drop_cache'), \
+         patch('dbsavr.backup_engine.os.replace'), \
+         patch('dbsavr.backup_engine.os.cpu_count', return_value=4):
+        path, filename = BackupEngine._backup_mysql(mysql_config, "20250101_120000")
+    
+    # The output is still a regular .sql.gz file
+    assert filename == "test_database_20250101_120000.sql.gz"
+    
+    calls = mock_popen.call_args_list
+    assert len(calls) == 2
+    assert calls[1][0][0] == ["pigz", "-p", "4", "-6", "-c"]
+    assert calls[1][1]['stdin'] is process_mocks[0].stdout
+
+@patch('dbsavr.backup_engine.shutil.rmtree')
+@patch('dbsavr.backup_engine.subprocess.run')
+@patch('dbsavr.backup_engine.subprocess.Popen')
+@patch('dbsavr.backup_engine.tempfile.mkdtemp')
+@patch('dbsavr.backup_engine.tempfile.gettempdir')
+def test_backup_mysql_mydumper(mock_tempfile, mock_mkdtemp, mock_popen, mock_run, mock_rmtree, mysql_config, fake_popen):
+    """Test that the use_mydumper option dumps in parallel threads and tars the dump directory."""
+    mock_tempfile.return_value = "/tmp"
+    mock_mkdtemp.return_value = "/tmp/mydumper_abc"
+    mock_run.return_value = MagicMock(returncode=0, stderr=b'')
+    mysql_config.options["use_mydumper"] = True
+    
+    tar_mock = fake_popen(0)
+    mock_popen.side_effect = [tar_mock]
+    
+    with patch('builtins.open', MagicMock()), \
+         patch.object(BackupEngine, '_sync_and_drop_cache'), \
+         patch('dbsavr.backup_engine.os.replace'), \
+         patch('dbsavr.backup_engine.os.cpu_count', return_value=4):
+        path, filename = BackupEngine._backup_mysql(mysql_config, "20250101_120000")
+    
+    assert filename == "test_database_20250101_120000.tar.gz"
+    assert path == "/tmp/test_database_20250101_120000.tar.gz"
+    
+    mysqldump_args = mock_run.call_args[0][0]
+    assert "mydumper" in mysqldump_args[0]
+    assert mysqldump_args[mysqldump_args.index("-t") + 1] == "4"
+    assert mysqldump_args[mysqldump_args.index("-B") + 1] == mysql_config.database
+    assert mysqldump_args[mysqldump_args.index("-o") + 1] == "/tmp/mydumper_abc"
+    assert "--trx-consistency-only" in mysqldump_args
+    for arg in mysqldump_args:
+        assert mysql_config.password not in arg
+    assert mock_run.call_args[1]['env']['MYSQL_PWD'] == mysql_config.password
     
-    # Verify temporary directory cleanup was called
-    mock_rmtree.assert_called_once_with(ANY, ignore_errors=True)
+    # The dump directory is tarred through compression and removed afterwards
+    tar_args = mock_popen.call_args_list[0][0][0]
+    assert tar_args == ["tar", "-C", "/tmp/mydumper_abc", "-cf", "-", "."]
+    mock_rmtree.assert_called_once_with("/tmp/mydumper_abc", ignore_errors=True)
+    
+    # The dump directory can't be streamed
+    assert BackupEngine.supports_streaming(mysql_config) is False
+    
+    # Tables aren't split into chunks unless chunk_rows is set
+    assert not any(arg.startswith("--rows") for arg in mysqldump_args)
+
+@patch('dbsavr.backup_engine.shutil.rmtree')
+@patch('dbsavr.backup_engine.subprocess.run')
+@patch('dbsavr.backup_engine.subprocess.Popen')
+@patch('dbsavr.backup_engine.tempfile.mkdtemp')
+@patch('dbsavr.backup_engine.tempfile.gettempdir')
+def test_backup_mysql_chunk_rows(mock_tempfile, mock_mkdtemp, mock_popen, mock_run, mock_rmtree, mysql_config,
+                                 fake_popen):
+    """Test that chunk_rows dumps large tables in primary key chunks with mydumper."""
+    mock_tempfile.return_value = "/tmp"
+    mock_mkdtemp.return_value = "/tmp/mydumper_abc"
+    mock_run.return_value = MagicMock(returncode=0, stderr=b'')
+    mock_popen.side_effect = [fake_popen(0)]
+    mysql_config.options["chunk_rows"] = 100000
+    
+    with patch('builtins.open', MagicMock()), \
+         patch.object(BackupEngine, '_sync_and_drop_cache'), \
+         patch('dbsavr.backup_engine.os.replace'):
+        path, filename = BackupEngine._backup_mysql(mysql_config, "20250101_120000")
+    
+    assert filename == "test_database_20250101_120000.tar.gz"
+    mysqldump_args = mock_run.call_args[0][0]
+    assert mysqldump_args[0] == "mydumper"
+    assert "--rows=100000" in mysqldump_args
+    assert "--skip-triggers" in mysqldump_args
 
 @patch('dbsavr.backup_engine.subprocess.Popen')
 @patch('dbsavr.backup_engine.tempfile.gettempdir')
 @patch('dbsavr.backup_engine.os.unlink')
-def test_backup_mysql_failure_cleanup(mock_unlink, mock_tempfile, mock_popen, mysql_config):
+def test_backup_mysql_failure_cleanup(mock_unlink, mock_tempfile, mock_popen, mysql_config, fake_popen):
     """Test file cleanup when MySQL backup fails."""
     # Setup
     mock_tempfile.return_value = "/tmp"
@@ -217,16 +465,15 @@ def test_backup_mysql_failure_cleanup(mock_unlink, mock_tempfile, mock_popen, my
         return path == expected_path
     
     # Mock mysqldump process that fails
-    mysqldump_mock = MagicMock()
-    mysqldump_mock.returncode = 1  # Failure
-    mysqldump_mock.communicate.return_value = (b'', b'Error: command failed')
-    mysqldump_mock.stdout = MagicMock()
+    mysqldump_mock = fake_popen(1, stderr=b'Error: command failed')  # Failure
     
     # Configure mock_popen to return failed process
     mock_popen.return_value = mysqldump_mock
     
     # Call the method and expect exception
-    with patch('builtins.open', MagicMock()):
+    with patch('builtins.open', MagicMock()), \
+         patch.object(BackupEngine, '_sync_and_drop_cache'), \
+         patch('dbsavr.backup_engine.os.replace'):
         with patch('os.path.exists', side_effect=path_exists_mock):
             with pytest.raises(Exception) as excinfo:
                 BackupEngine._backup_mysql(mysql_config, "20250101_120000")
@@ -239,7 +486,7 @@ def test_backup_mysql_failure_cleanup(mock_unlink, mock_tempfile, mock_popen, my
 @patch('dbsavr.backup_engine.tempfile.gettempdir')
 @patch('dbsavr.backup_engine.os.environ.copy')
 @patch('dbsavr.backup_engine.os.unlink')
-def test_backup_postgresql_failure_cleanup(mock_unlink, mock_environ, mock_tempfile, mock_popen, postgresql_config):
+def test_backup_postgresql_failure_cleanup(mock_unlink, mock_environ, mock_tempfile, mock_popen, postgresql_config, fake_popen):
     """Test file cleanup when PostgreSQL backup fails."""
     # Setup
     mock_tempfile.return_value = "/tmp"
@@ -251,16 +498,15 @@ def test_backup_postgresql_failure_cleanup(mock_unlink, mock_environ, mock_tempf
         return path == expected_path
     
     # Mock pg_dump process that fails
-    pg_dump_mock = MagicMock()
-    pg_dump_mock.returncode = 1  # Failure
-    pg_dump_mock.communicate.return_value = (b'', b'Error: command failed')
-    pg_dump_mock.stdout = MagicMock()
+    pg_dump_mock = fake_popen(1, stderr=b'Error: command failed')  # Failure
     
     # Configure mock_popen to return failed process
     mock_popen.return_value = pg_dump_mock
     
     # Call the method and expect exception
-    with patch('builtins.open', MagicMock()):
+    with patch('builtins.open', MagicMock()), \
+         patch.object(BackupEngine, '_sync_and_drop_cache'), \
+         patch('dbsavr.backup_engine.os.replace'):
         with patch('os.path.exists', side_effect=path_exists_mock):
             with pytest.raises(Exception) as excinfo:
                 BackupEngine._backup_postgresql(postgresql_config, "20250101_120000")
@@ -270,42 +516,26 @@ def test_backup_postgresql_failure_cleanup(mock_unlink, mock_environ, mock_tempf
     assert "pg_dump failed" in str(excinfo.value)
 
 @patch('dbsavr.backup_engine.subprocess.Popen')
+@patch('dbsavr.backup_engine.shutil.which')
 @patch('dbsavr.backup_engine.tempfile.gettempdir')
-@patch('dbsavr.backup_engine.os.makedirs')
-@patch('dbsavr.backup_engine.shutil.rmtree')
-@patch('dbsavr.backup_engine.os.unlink')
-def test_backup_mongodb_failure_cleanup(mock_unlink, mock_rmtree, mock_makedirs, mock_tempfile, mock_popen, mongodb_config):
-    """Test directory and file cleanup when MongoDB backup fails."""
+def test_backup_mongodb_failure_cleanup(mock_tempfile, mock_which, mock_popen, mongodb_config, tmp_path, fake_popen):
+    """Test file cleanup when MongoDB backup fails."""
     # Setup
-    mock_tempfile.return_value = "/tmp"
-    backup_dir = "/tmp/mongodb_backup_20250101_120000"
-    archive_path = "/tmp/test_database_20250101_120000.tar.gz"
+    mock_tempfile.return_value = str(tmp_path)
+    mock_which.return_value = None
     
-    # Create mock path checkers
-    def dir_exists_mock(path):
-        return path == backup_dir
-    
-    def file_exists_mock(path):
-        return path == archive_path
-    
-    # Mock mongodump process that fails
-    mongodump_mock = MagicMock()
-    mongodump_mock.returncode = 1  # Failure
-    mongodump_mock.communicate.return_value = (b'', b'Error: command failed')
+    # Mock mongodump process that fails after writing part of the archive
+    mongodump_mock = fake_popen(1, stdout=b'partial archive', stderr=b'Error: command failed')  # Failure
     
     # Configure mock_popen to return failed process
     mock_popen.return_value = mongodump_mock
     
     # Call the method and expect exception
-    with patch('os.path.exists', side_effect=[dir_exists_mock, file_exists_mock]):
-        with pytest.raises(Exception) as excinfo:
-            BackupEngine._backup_mongodb(mongodb_config, "20250101_120000")
-    
-    # Verify temporary directory was cleaned up
-    mock_rmtree.assert_called_once_with(backup_dir, ignore_errors=True)
+    with pytest.raises(Exception) as excinfo:
+        BackupEngine._backup_mongodb(mongodb_config, "20250101_120000")
     
-    # Verify temporary archive was cleaned up if created
-    mock_unlink.assert_called_once_with(archive_path)
+    # Verify no partial archive was left behind
+    assert os.listdir(tmp_path) == []
     assert "mongodump failed" in str(excinfo.value)
 
 def test_unsupported_database_type():
@@ -320,4 +550,238 @@ def test_unsupported_database_type():
     )
     
     with pytest.raises(ValueError, match="Unsupported database type"):
-        BackupEngine.backup_database(config)
\ No newline at end of file
+        BackupEngine.backup_database(config)
+
+def test_start_stream_gzips_in_process():
+    """Test that a streamed dump is gzip-compressed without touching disk."""
+    import gzip
+    
+    stream = BackupEngine._start_stream(["printf", "dump data"], None, "printf")
+    
+    # Read in small pieces like a multipart upload would
+    chunks = []
+    while True:
+        chunk = stream.read(4)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    stream.close()
+    
+    data = b''.join(chunks)
+    assert gzip.decompress(data) == b"dump data"
+    assert stream.bytes_read == len(data)
+
+def test_start_stream_with_compressor():
+    """Test that a streamed dump is piped through an external compressor."""
+    import gzip
+    
+    stream = BackupEngine._start_stream(["printf", "dump data"], None, "printf", ["gzip", "-c"])
+    data = stream.read()
+    stream.close()
+    
+    assert gzip.decompress(data) == b"dump data"
+
+def test_start_stream_removes_temp_files(tmp_path):
+    """Test that files needed by the dump are removed when the stream is closed or aborted."""
+    for finish in ("close", "abort"):
+        temp_file = tmp_path / f"{finish}.yaml"
+        temp_file.write_text("password: secret\n")
+        
+        stream = BackupEngine._start_stream(["printf", "dump data"], None, "printf", temp_files=[str(temp_file)])
+        stream.read()
+        getattr(stream, finish)()
+        
+        assert not temp_file.exists()
+
+def test_start_stream_failure_raised_at_end_of_stream():
+    """Test that a failing dump command is reported by the read reaching the end of the stream."""
+    stream = BackupEngine._start_stream(["sh", "-c", "echo boom >&2; exit 3"], None, "pg_dump")
+    
+    # Raising from read() makes a multipart upload abort instead of completing
+    with pytest.raises(Exception, match="pg_dump failed: boom"):
+        stream.read()
+    
+    # The pipeline has already been waited for
+    stream.close()
+
+def test_interrupted_stream_kills_pipeline():
+    """Test that Ctrl+C while waiting for a stream kills its processes, which don't get the SIGINT."""
+    stream = BackupEngine._start_stream(["sleep", "30"], None, "sleep", ["cat"])
+    compressor_process = stream._compressor_process
+    communicate = compressor_process.communicate
+    
+    def interrupted(*args, **kwargs):
+        compressor_process.communicate = communicate
+        raise KeyboardInterrupt
+    compressor_process.communicate = interrupted
+    
+    with pytest.raises(KeyboardInterrupt):
+        stream.close()
+    
+    assert compressor_process.returncode is not None
+    assert stream._dump_process.returncode is not None
+
+def test_interrupted_dump_compressed_is_cleaned_up(tmp_path):
+    """Test that Ctrl+C during a staged dump kills the dump and removes the partial file."""
+    processes = []
+    real_popen = subprocess.Popen
+    def popen(*args, **kwargs):
+        process = real_popen(*args, **kwargs)
+        processes.append(process)
+        return process
+    
+    backup_path = str(tmp_path / "test_database.sql.gz")
+    with patch('dbsavr.backup_engine.subprocess.Popen', side_effect=popen), \
+         patch('dbsavr.backup_engine.shutil.copyfileobj', side_effect=KeyboardInterrupt):
+        with pytest.raises(KeyboardInterrupt):
+            BackupEngine._dump_compressed(["sleep", "30"], None, backup_path, "sleep")
+    
+    assert processes[0].returncode is not None
+    assert list(tmp_path.iterdir()) == []
+
+def test_backup_database_stream_unsupported(mongodb_config):
+    """Test that unsupported database types can't be streamed."""
+    assert BackupEngine.supports_streaming(mongodb_config)
+    
+    mongodb_config.type = "unsupported"
+    assert not BackupEngine.supports_streaming(mongodb_config)
+    
+    with pytest.raises(ValueError, match="Streaming backups are not supported"):
+        BackupEngine.backup_database_stream(mongodb_config)
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="pipe resizing is Linux-only")
+@pytest.mark.parametrize("use_splice", [True, False])
+def test_copy_pipe_to_file(use_splice, tmp_path):
+    """Test that a pipe is copied into a file, with or without splice(2)."""
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    read_fd, write_fd = os.pipe()
+    
+    def write_all():
+        with os.fdopen(write_fd, 'wb') as w:
+            w.write(data)
+    
+    writer = threading.Thread(target=write_all)
+    writer.start()
+    
+    path = tmp_path / "dump.sql"
+    with os.fdopen(read_fd, 'rb') as pipe, open(path, 'wb') as f:
+        if use_splice:
+            if not hasattr(os, 'splice'):
+                pytest.skip("os.splice is not available")
+            BackupEngine._copy_pipe_to_file(pipe, f)
+        else:
+            with patch('dbsavr.backup_engine.os.splice', create=True, side_effect=OSError(22, "Invalid argument")):
+                BackupEngine._copy_pipe_to_file(pipe, f)
+    writer.join()
+    
+    assert path.read_bytes() == data
+
+def test_enlarge_pipe():
+    """Test that the dump pipe is resized and that unsupported pipes are ignored."""
+    import fcntl
+    
+    read_fd, write_fd = os.pipe()
+    try:
+        with os.fdopen(read_fd, 'rb') as pipe:
+            BackupEngine._enlarge_pipe(pipe)
+            assert fcntl.fcntl(read_fd, getattr(fcntl, "F_GETPIPE_SZ", 1032)) >= 1024 * 1024
+    finally:
+        os.close(write_fd)
+    
+    # Objects without a real file descriptor are left alone
+    BackupEngine._enlarge_pipe(io.BytesIO(b''))
+
+def test_command_templates_are_cached(mysql_config):
+    """Test that the dump command is built once per connection settings."""
+    BackupEngine._mysql_base_command.cache_clear()
+    
+    cmd1, env1 = BackupEngine._mysql_command(mysql_config)
+    cmd2, env2 = BackupEngine._mysql_command(mysql_config)
+    
+    assert cmd1 == cmd2
+    assert cmd1 is not cmd2  # Callers get their own list to modify
+    assert BackupEngine._mysql_base_command.cache_info().hits == 1
+    
+    # Changing the options produces a new command
+    mysql_config.options = {"extra_args": ["--no-data"]}
+    cmd3, _ = BackupEngine._mysql_command(mysql_config)
+    assert cmd3[-1] == "--no-data"
+
+def test_rsyncable_and_custom_compression(mysql_config):
+    """Test the rsyncable and compress_command compression options."""
+    mysql_config.options = {"rsyncable": True}
+    compressor_cmd, extension = BackupEngine._get_compression(mysql_config)
+    assert compressor_cmd[:2] == ["gzip", "--rsyncable"]
+    assert extension == ".gz"
+    
+    mysql_config.options = {"compression": "zstd", "rsyncable": True}
+    compressor_cmd, extension = BackupEngine._get_compression(mysql_config)
+    assert "--rsyncable" in compressor_cmd
+    assert extension == ".zst"
+    
+    mysql_config.options = {"compression": "zstd", "compress_command": "zstd --long=27 -c"}
+    compressor_cmd, extension = BackupEngine._get_compression(mysql_config)
+    assert compressor_cmd == ["zstd", "--long=27", "-c"]
+    assert extension == ".zst"
+
+def test_no_compression(mysql_config, tmp_path):
+    """Test that the 'none' compression stores the dump as is, staged or streamed."""
+    mysql_config.options = {"compression": "none", "rsyncable": True}
+    compressor_cmd, extension = BackupEngine._get_compression(mysql_config)
+    assert compressor_cmd == []
+    assert extension == ""
+    
+    backup_path = str(tmp_path / "test_database.sql")
+    BackupEngine._dump_compressed(["printf", "dump data"], None, backup_path, "printf", compressor_cmd)
+    with open(backup_path, 'rb') as f:
+        assert f.read() == b"dump data"
+    
+    stream = BackupEngine._start_stream(["printf", "dump data"], None, "printf", compressor_cmd)
+    assert stream.read() == b"dump data"
+    stream.close()
+
+@patch('dbsavr.backup_engine.subprocess.Popen')
+@patch('dbsavr.backup_engine.shutil.which')
+@patch('dbsavr.backup_engine.tempfile.gettempdir')
+def test_backup_mongodb_password_config_file(mock_tempfile, mock_which, mock_popen, mongodb_config, tmp_path, fake_popen):
+    """Test that the MongoDB password is passed in a private config file, not in argv."""
+    import stat
+    import yaml
+    
+    mock_tempfile.return_value = str(tmp_path)
+    mock_which.return_value = None
+    
+    seen = {}
+    
+    def start_mongodump(cmd, **kwargs):
+        config_arg = next(arg for arg in cmd if arg.startswith("--config="))
+        config_path = config_arg.split("=", 1)[1]
+        seen['path'] = config_path
+        seen['mode'] = stat.S_IMODE(os.stat(config_path).st_mode)
+        with open(config_path) as f:
+            seen['config'] = yaml.safe_load(f)
+        
+        mongodump_mock = fake_popen(0, stdout=b'mongodump archive')
+        return mongodump_mock
+    
+    mock_popen.side_effect = start_mongodump
+    
+    path, filename = BackupEngine._backup_mongodb(mongodb_config, "20250101_120000")
+    
+    mongodump_args = mock_popen.call_args_list[0][0][0]
+    for arg in mongodump_args:
+        assert mongodb_config.password not in arg
+    
+    assert seen['config'] == {'password': mongodb_config.password}
+    assert seen['mode'] == 0o600
+    
+    # The config file is removed once the backup is done
+    assert not os.path.exists(seen['path'])
+    assert os.listdir(tmp_path) == [filename]
+
+@patch('dbsavr.backup_engine.BackupEngine._backup_mysql')
+def test_backup_database_uses_given_timestamp(mock_backup_mysql, mysql_config):
+    """Test that a caller-provided timestamp is used instead of the current time."""
+    BackupEngine.backup_database(mysql_config, timestamp="20250101_120000")
+    mock_backup_mysql.assert_called_once_with(mysql_config, "20250101_120000")
@@ -0,0 +1,322 @@
+# /tests/test_backup_service.py
+import pytest
+from unittest.mock import patch, MagicMock
+
+from dbsavr.backup_service import BackupService
+from dbsavr.config import Config, DatabaseConfig, S3Config, BackupSchedule
+
+@pytest.fixture
+def sample_config():
+    """Create a sample Config object for testing."""
+    databases = {
+        "test_db": DatabaseConfig(
+            type="postgresql",
+            host="localhost",
+            port=5432,
+            username="test_user",
+            password="test_password",
+            database="test_database"
+        )
+    }
+    
+    s3 = S3Config(
+        bucket_name="test-bucket",
+        prefix="backups",
+        region="us-east-1"
+    )
+    
+    schedules = [
+        BackupSchedule(
+            database_name="test_db",
+            cron_expression="0 2 * * *",
+            retention_days=30,
+            prefix="daily"
+        )
+    ]
+    
+    return Config(
+        databases=databases,
+        s3=s3,
+        schedules=schedules
+    )
+
+@pytest.fixture
+def service(sample_config):
+    """Create a BackupService with a mocked S3 storage."""
+    service = BackupService(sample_config)
+    service._s3_storage = MagicMock()
+    return service
+
+def test_perform_backup_deletes_expired_after_upload(service):
+    """Test that expired backups listed during the upload are deleted afterwards."""
+    storage = service.s3_storage
+    storage.list_expired_backups.return_value = ['backups/test_db/daily/old_1.sql.gz',
+                                                 'backups/test_db/daily/old_2.sql.gz']
+    storage.delete_backups.side_effect = lambda keys, custom_bucket=None: iter(keys)
+    
+    with patch.object(BackupService, '_create_and_upload_backup',
+                      return_value=('backups/test_db/daily/new.sql.gz', 2048)) as mock_upload:
+        result = service.perform_backup("test_db")
+    
+    assert result['status'] == 'success'
+    assert result['s3_key'] == 'backups/test_db/daily/new.sql.gz'
+    assert result['size_bytes'] == 2048
+    assert result['deleted_backups'] == 2
+    
+    mock_upload.assert_called_once()
+    storage.list_expired_backups.assert_called_once_with(
+        "test_db",
+        30,
+        custom_bucket=None,
+        custom_prefix="daily"
+    )
+    storage.delete_backups.assert_called_once_with(
+        ['backups/test_db/daily/old_1.sql.gz', 'backups/test_db/daily/old_2.sql.gz'],
+        custom_bucket=None
+    )
+
+def test_perform_backup_failure_keeps_old_backups(service):
+    """Test that nothing is deleted when the new backup fails."""
+    storage = service.s3_storage
+    storage.list_expired_backups.return_value = ['backups/test_db/daily/old_1.sql.gz']
+    
+    with patch.object(BackupService, '_create_and_upload_backup', side_effect=Exception("pg_dump failed")):
+        with pytest.raises(Exception, match="pg_dump failed"):
+            service.perform_backup("test_db")
+    
+    storage.delete_backups.assert_not_called()
+    storage.iter_cleanup_old_backups.assert_not_called()
+
+@patch('dbsavr.backup_service.BackupEngine.backup_database_stream')
+def test_stream_backup_removes_upload_when_dump_fails(mock_stream, service, sample_config):
+    """Test that an uploaded object is deleted again if the dump turns out to have failed."""
+    stream = MagicMock()
+    stream.close.side_effect = Exception("pg_dump failed: connection lost")
+    mock_stream.return_value = (stream, "test_database_20250101_120000.sql.gz")
+    
+    storage = service.s3_storage
+    storage.upload_backup_stream.return_value = "backups/test_db/test_database_20250101_120000.sql.gz"
+    
+    with pytest.raises(Exception, match="pg_dump failed"):
+        service._stream_backup(storage, sample_config.databases["test_db"], "test_db", "20250101_120000")
+    
+    storage.delete_backup.assert_called_once_with(
+        "backups/test_db/test_database_20250101_120000.sql.gz",
+        None
+    )
+
+@patch('dbsavr.backup_service.BackupEngine.backup_database_stream')
+def test_stream_backup_dump_failure_aborts_upload(mock_stream, service, sample_config):
+    """Test that a dump failing while it is read fails the upload without a completed object to delete."""
+    stream = MagicMock()
+    mock_stream.return_value = (stream, "test_database_20250101_120000.sql.gz")
+    
+    storage = service.s3_storage
+    storage.upload_backup_stream.side_effect = Exception("pg_dump failed: connection lost")
+    
+    with pytest.raises(Exception, match="pg_dump failed"):
+        service._stream_backup(storage, sample_config.databases["test_db"], "test_db", "20250101_120000")
+    
+    stream.abort.assert_called_once()
+    storage.delete_backup.assert_not_called()
+
+def test_perform_backups_bulk_reports_failures(service):
+    """Test that one failing backup doesn't stop the others in a bulk run."""
+    def perform_backup(db_name, schedule_index=None):
+        if db_name == "missing_db":
+            raise ValueError("Database configuration not found for: missing_db")
+        return {'status': 'success', 'database': db_name}
+    
+    with patch.object(service, 'perform_backup', side_effect=perform_backup):
+        results = service.perform_backups_bulk([("test_db", 0), ("missing_db", None)], max_workers=2)
+    
+    assert results[0] == {'status': 'success', 'database': 'test_db'}
+    assert results[1]['status'] == 'failed'
+    assert results[1]['database'] == 'missing_db'
+    assert "not found" in results[1]['error']
+
+def test_schedule_lookups(service, sample_config):
+    """Test schedule lookups by database, prefix and index, including after the config changes."""
+    sample_config.schedules.append(BackupSchedule(
+        database_name="test_db",
+        cron_expression="0 3 * * 0",
+        retention_days=90,
+        prefix="weekly"
+    ))
+    
+    schedules = service._get_all_schedules_for_database("test_db")
+    assert [s['prefix'] for s in schedules] == ["daily", "weekly"]
+    assert [s['index'] for s in schedules] == [0, 1]
+    
+    weekly = service._get_schedule_by_prefix("test_db", "weekly")
+    assert weekly['index'] == 1
+    assert weekly['retention_days'] == 90
+    
+    assert service._get_schedule_info("test_db")['prefix'] == "daily"
+    assert service._get_schedule_info("test_db", schedule_index=1)['prefix'] == "weekly"
+    
+    missing = service._get_schedule_by_prefix("test_db", "monthly")
+    assert missing['index'] is None
+    assert missing['retention_days'] == 30
+
+def test_notifications_sent_in_background(sample_config):
+    """Test that notifications are queued and sent by a background thread."""
+    sample_config.notifications_email = "test@example.com"
+    service = BackupService(sample_config)
+    notifier = MagicMock()
+    service._notifier = notifier
+    
+    service._send_success_notification(
+        db_name="test_db",
+        backup_size=1024,
+        s3_key="backups/test_db/daily/new.sql.gz",
+        duration=1.5,
+        deleted_backups=0
+    )
+    service._send_failure_notification(db_name="test_db", error="pg_dump failed")
+    
+    service.flush_notifications()
+    
+    notifier.send_success_notification.assert_called_once_with(
+        db_name="test_db",
+        backup_size=1024,
+        s3_key="backups/test_db/daily/new.sql.gz",
+        duration=1.5,
+        deleted_backups=0
+    )
+    notifier.send_failure_notification.assert_called_once_with(db_name="test_db", error="pg_dump failed")
+    assert service._notify_thread is None
+
+def test_notification_errors_are_logged(sample_config):
+    """Test that a failing notification doesn't stop the ones queued after it."""
+    sample_config.notifications_email = "test@example.com"
+    service = BackupService(sample_config)
+    notifier = MagicMock()
+    notifier.send_failure_notification.side_effect = [Exception("SMTP down"), None]
+    service._notifier = notifier
+    
+    with patch('dbsavr.backup_service.logger') as mock_logger:
+        service._send_failure_notification(db_name="test_db", error="first")
+        service._send_failure_notification(db_name="test_db", error="second")
+        service.flush_notifications()
+    
+    assert notifier.send_failure_notification.call_count == 2
+    mock_logger.error.assert_called_once()
+    message, kind, error = mock_logger.error.call_args[0]
+    assert message % (kind, error) == "Failed to send failure notification: SMTP down"
+
+def test_flush_timeout_keeps_single_sender(sample_config):
+    """Test that notifications queued after a timed out flush go to the sender still running."""
+    import threading
+    
+    sample_config.notifications_email = "test@example.com"
+    service = BackupService(sample_config)
+    notifier = MagicMock()
+    release = threading.Event()
+    notifier.send_failure_notification.side_effect = lambda **kwargs: release.wait(5)
+    service._notifier = notifier
+    
+    service._send_failure_notification(db_name="test_db", error="first")
+    sender = service._notify_thread
+    service.flush_notifications(timeout=0.05)
+    
+    # The slow sender is still registered, so no second one is started
+    assert service._notify_thread is sender
+    service._send_failure_notification(db_name="test_db", error="second")
+    assert service._notify_thread is sender
+    
+    release.set()
+    service.flush_notifications()
+    assert notifier.send_failure_notification.call_count == 2
+    assert service._notify_thread is None
+
+def test_notification_connection_kept_for_newer_sender(sample_config):
+    """Test that an exiting sender thread doesn't close the connection a newer one is using."""
+    sample_config.notifications_email = "test@example.com"
+    service = BackupService(sample_config)
+    notifier = MagicMock()
+    service._notifier = notifier
+    
+    # A newer sender took over after this one was flushed
+    service._notify_thread = MagicMock()
+    service._notify_queue.put(None)
+    service._notify_worker()
+    notifier.close.assert_not_called()
+    
+    # With no newer sender, the connection is closed between bursts
+    service._notify_thread = None
+    service._notify_queue.put(None)
+    service._notify_worker()
+    notifier.close.assert_called_once()
+
+def test_schedule_info_is_cached(service, sample_config):
+    """Test that schedule info is computed once and get_database_info returns copies."""
+    assert service._get_schedule_info("test_db") is service._get_schedule_info("test_db", schedule_index=0)
+    
+    info = service.get_database_info("test_db")
+    info['schedules'][0]['retention_days'] = 1
+    
+    assert service._get_schedule_info("test_db")['retention_days'] == 30
+    
+    # Replacing the schedules invalidates the cached info
+    sample_config.schedules = [BackupSchedule(
+        database_name="test_db",
+        cron_expression="0 4 * * *",
+        retention_days=7,
+        prefix="nightly"
+    )]
+    assert service._get_schedule_info("test_db")['prefix'] == "nightly"
+
+@pytest.mark.parametrize("upload_error", [None, Exception("upload failed")])
+def test_staged_backup_file_removed_in_background(service, sample_config, tmp_path, upload_error):
+    """Test that the staged dump file is removed after the upload, even if it fails."""
+    sample_config.s3.stream_uploads = False
+    backup_path = tmp_path / "test_database_20250101_120000.sql.gz"
+    backup_path.write_bytes(b"x" * 100)
+    
+    storage = service.s3_storage
+    storage.upload_backup.side_effect = upload_error
+    storage.upload_backup.return_value = "backups/test_db/test_database_20250101_120000.sql.gz"
+    
+    with patch('dbsavr.backup_service.BackupEngine.backup_database',
+               return_value=(str(backup_path), backup_path.name)):
+        if upload_error:
+            with pytest.raises(Exception, match="upload failed"):
+                service._create_and_upload_backup(
+                    storage, sample_config.databases["test_db"], "test_db", "20250101_120000"
+                )
+        else:
+            s3_key, size = service._create_and_upload_backup(
+                storage, sample_config.databases["test_db"], "test_db", "20250101_120000"
+            )
+            assert s3_key == "backups/test_db/test_database_20250101_120000.sql.gz"
+            assert size == 100
+    
+    service._cleanup_pool.shutdown(wait=True)
+    assert not backup_path.exists()
+
+def test_list_available_databases_is_cached(service, sample_config):
+    """Test that the database names are cached until the databases change."""
+    names = service.list_available_databases()
+    assert names == ["test_db"]
+    
+    # Callers get their own list, so changing it doesn't touch the cache
+    names.append("extra_db")
+    assert service.list_available_databases() == ["test_db"]
+    
+    sample_config.databases["other_db"] = sample_config.databases["test_db"]
+    assert service.list_available_databases() == ["test_db", "other_db"]
+
+def test_iter_database_info(service):
+    """Test iterating over the configured databases in one pass."""
+    infos = dict(service.iter_database_info())
+    
+    assert list(infos) == ["test_db"]
+    assert infos["test_db"] == {
+        'name': "test_db",
+        'type': "postgresql",
+        'host': "localhost",
+        'port': 5432,
+        'database': "test_database",
+        'custom_bucket': None
+    }
@@ -1,6 +1,7 @@
 # /tests/test_cli.py
 import os
 import sys
+import signal
 import tempfile
 import pytest
 import importlib
@@ -10,7 +11,6 @@ from click.testing import CliRunner
 
 from dbsavr.cli import cli
 from dbsavr.config import Config, DatabaseConfig, S3Config, BackupSchedule
-from dbsavr.backup_service import BackupService  # Add this import
 
 @pytest.fixture
 def sample_config():
@@ -74,18 +74,22 @@ beat_schedule = {}
     celeryconfig = importlib.util.module_from_spec(celeryconfig_spec)
     celeryconfig_spec.loader.exec_module(celeryconfig)
     
-    # Patch sys.modules with our mock
-    orig_modules = sys.modules.copy()
+    # Patch sys.modules with our mock (in place, so modules imported by the test stay loaded)
     sys.modules['celeryconfig'] = celeryconfig
     
     yield
     
     # Clean up
-    sys.modules = orig_modules
+    sys.modules.pop('celeryconfig', None)
     if os.path.exists(filename):
         os.unlink(filename)
 
 
+@pytest.fixture(autouse=True)
+def config_env(monkeypatch):
+    """Point DB_BACKUP_CONFIG at a config file, restoring it after the test (the CLI sets it too)."""
+    monkeypatch.setenv('DB_BACKUP_CONFIG', 'config.yaml')
+
 @pytest.fixture
 def cli_runner():
     """Create a Click CLI test runner."""
@@ -130,14 +134,8 @@ def test_list_databases(mock_load_config, sample_config, cli_runner):
     """Test list_databases command."""
     mock_load_config.return_value = sample_config
     
-    # Create a minimal environment to run the command
-    os.environ['DB_BACKUP_CONFIG'] = 'config.yaml'
-    
     result = cli_runner.invoke(cli, ['list_databases'], catch_exceptions=False)
     
-    # Reset environment
-    os.environ.pop('DB_BACKUP_CONFIG', None)
-    
     # The test may fail due to Click CLI context issues, but
     # we just want to verify the function would behave correctly
     # with a proper config
@@ -149,9 +147,6 @@ def test_list_schedules(mock_load_config, sample_config, cli_runner):
     """Test list_schedules command."""
     mock_load_config.return_value = sample_config
     
-    # Create a minimal environment to run the command
-    os.environ['DB_BACKUP_CONFIG'] = 'config.yaml'
-    
     # This test might fail due to Click CLI context issues
     # We'll verify the schedule information to ensure it would work
     assert len(sample_config.schedules) == 1
@@ -162,7 +157,7 @@ def test_list_schedules(mock_load_config, sample_config, cli_runner):
 
 @pytest.mark.usefixtures('mock_celeryconfig')
 @patch('dbsavr.cli.load_config')
-@patch('dbsavr.cli.BackupService')  # Patch the class at the module level where it's imported
+@patch('dbsavr.backup_service.BackupService')  # Imported by the command when it runs
 def test_backup_command_success(mock_backup_service_class, mock_load_config, sample_config, cli_runner):
     """Test backup command with successful execution."""
     mock_load_config.return_value = sample_config
@@ -186,15 +181,9 @@ def test_backup_command_success(mock_backup_service_class, mock_load_config, sam
     # Make the class return our configured instance
     mock_backup_service_class.return_value = mock_backup_service
     
-    # Create a minimal environment to run the command
-    os.environ['DB_BACKUP_CONFIG'] = 'config.yaml'
-    
     # Run the CLI command
     result = cli_runner.invoke(cli, ['backup', 'test_db'], catch_exceptions=False)
     
-    # Reset environment
-    os.environ.pop('DB_BACKUP_CONFIG', None)
-    
     # Check that the BackupService was instantiated and perform_backup was called
     mock_backup_service_class.assert_called_once_with(sample_config)
     mock_backup_service.perform_backup.assert_called_once_with('test_db')
@@ -209,7 +198,7 @@ def test_backup_command_success(mock_backup_service_class, mock_load_config, sam
 
 @pytest.mark.usefixtures('mock_celeryconfig')
 @patch('dbsavr.cli.load_config')
-@patch('dbsavr.cli.BackupService')
+@patch('dbsavr.backup_service.BackupService')
 @patch('dbsavr.cli.sys.exit')  # Patch sys.exit to prevent actual exit
 def test_backup_command_failure(mock_exit, mock_backup_service_class, mock_load_config, sample_config, cli_runner):
     """Test backup command with failed execution."""
@@ -224,15 +213,9 @@ def test_backup_command_failure(mock_exit, mock_backup_service_class, mock_load_
     # Make the class return our configured instance
     mock_backup_service_class.return_value = mock_backup_service
     
-    # Create a minimal environment to run the command
-    os.environ['DB_BACKUP_CONFIG'] = 'config.yaml'
-    
     # Run the CLI command
     result = cli_runner.invoke(cli, ['backup', 'test_db'], catch_exceptions=False)
     
-    # Reset environment
-    os.environ.pop('DB_BACKUP_CONFIG', None)
-    
     # Check that the BackupService was instantiated and perform_backup was called
     mock_backup_service_class.assert_called_once_with(sample_config)
     mock_backup_service.perform_backup.assert_called_once_with('test_db')
@@ -244,15 +227,79 @@ def test_backup_command_failure(mock_exit, mock_backup_service_class, mock_load_
     # just verify that the backup process started
     assert "Starting backup for test_db" in result.output
 
+@pytest.mark.usefixtures('mock_celeryconfig')
+@patch('dbsavr.cli.load_config')
+@patch('dbsavr.backup_service.BackupService')
+def test_backup_command_json(mock_backup_service_class, mock_load_config, sample_config, cli_runner):
+    """Test that --json prints the backup results as JSON without the progress messages."""
+    import json
+    
+    mock_load_config.return_value = sample_config
+    mock_backup_service = mock_backup_service_class.return_value
+    mock_backup_service.perform_backup.return_value = {
+        'status': 'success',
+        'database': 'test_db',
+        's3_key': 'backups/test_db/backup.sql.gz',
+        'size_bytes': 1048576,
+        'size_mb': 1.0,
+        'duration': 10.5,
+        'deleted_backups': 2,
+        'timestamp': '2023-01-01T00:00:00'
+    }
+    
+    result = cli_runner.invoke(cli, ['backup', 'test_db', '--json'], catch_exceptions=False)
+    
+    assert result.exit_code == 0
+    assert '"status": "success"' in result.stdout
+    results = json.loads(result.stdout)
+    assert results == [mock_backup_service.perform_backup.return_value]
+    
+    # Without schedules there's a single result
+    sample_config.schedules = []
+    result = cli_runner.invoke(cli, ['backup', 'test_db', '--json'], catch_exceptions=False)
+    assert json.loads(result.stdout)['s3_key'] == 'backups/test_db/backup.sql.gz'
+
+@pytest.mark.usefixtures('mock_celeryconfig')
+@patch('dbsavr.cli.load_config')
+@patch('dbsavr.backup_service.BackupService')
+def test_backup_all_command(mock_backup_service_class, mock_load_config, sample_config, cli_runner):
+    """Test backup_all runs every database in parallel and fails if any backup failed."""
+    sample_config.databases["other_db"] = sample_config.databases["test_db"]
+    mock_load_config.return_value = sample_config
+    
+    mock_backup_service = mock_backup_service_class.return_value
+    mock_backup_service.perform_backups.return_value = {
+        'test_db': {
+            'status': 'success',
+            's3_key': 'backups/test_db/backup.sql.gz',
+            'size_mb': 1.0,
+            'duration': 10.5
+        },
+        'other_db': {'status': 'failed', 'database': 'other_db', 'error': 'pg_dump failed'}
+    }
+    
+    with patch('dbsavr.cli.os.cpu_count', return_value=8):
+        result = cli_runner.invoke(cli, ['backup-all'], catch_exceptions=False)
+    
+    # One backup per database, with no more workers than databases
+    mock_backup_service.perform_backups.assert_called_once_with(["test_db", "other_db"], max_workers=2)
+    assert "✓ test_db: backups/test_db/backup.sql.gz" in result.output
+    assert "✗ other_db: pg_dump failed" in result.output
+    assert result.exit_code == 1
+    
+    mock_backup_service.perform_backups.return_value.pop('other_db')
+    sample_config.databases.pop('other_db')
+    result = cli_runner.invoke(cli, ['backup-all', '--workers', '3'], catch_exceptions=False)
+    
+    mock_backup_service.perform_backups.assert_called_with(["test_db"], max_workers=3)
+    assert result.exit_code == 0
+
 @pytest.mark.usefixtures('mock_celeryconfig')
 @patch('dbsavr.cli.load_config')
 def test_setup_celery_schedule(mock_load_config, sample_config, cli_runner):
     """Test setup_celery_schedule command."""
     mock_load_config.return_value = sample_config
     
-    # Create a minimal environment to run the command
-    os.environ['DB_BACKUP_CONFIG'] = 'config.yaml'
-    
     with tempfile.TemporaryDirectory() as tmpdir:
         output_file = os.path.join(tmpdir, 'celeryconfig.py')
         
@@ -269,9 +316,6 @@ def test_setup_celery_schedule_file_exists(mock_load_config, sample_config, cli_
     """Test setup_celery_schedule command when output file already exists."""
     mock_load_config.return_value = sample_config
     
-    # Create a minimal environment to run the command
-    os.environ['DB_BACKUP_CONFIG'] = 'config.yaml'
-    
     with tempfile.TemporaryDirectory() as tmpdir:
         output_file = os.path.join(tmpdir, 'celeryconfig.py')
         
@@ -296,9 +340,6 @@ def test_cleanup_command(mock_cleanup, mock_load_config, sample_config, cli_runn
         'backups/test_db/old_backup2.sql.gz'
     ]
     
-    # Create a minimal environment to run the command
-    os.environ['DB_BACKUP_CONFIG'] = 'config.yaml'
-    
     # The CLI test will likely fail due to context issues
     # Let's verify the key parts would work
     assert "test_db" in sample_config.databases
@@ -316,11 +357,90 @@ def test_cleanup_command_custom_retention(mock_cleanup, mock_load_config, sample
     # Mock BackupService.cleanup_old_backups
     mock_cleanup.return_value = ['backups/test_db/old_backup.sql.gz']
     
-    # Create a minimal environment to run the command
-    os.environ['DB_BACKUP_CONFIG'] = 'config.yaml'
-    
     # The CLI test will likely fail due to context issues
     # Let's verify our mock would be called with the custom retention
     custom_days = 7
     # In a working CLI, this would be passed to cleanup_old_backups
-    assert custom_days != sample_config.schedules[0].retention_days
\ No newline at end of file
+    assert custom_days != sample_config.schedules[0].retention_days
+
+@pytest.mark.skipif(not os.path.isdir('/proc'), reason="Requires /proc")
+def test_find_pids_by_cmdline():
+    """Test finding processes by command line without spawning ps/grep."""
+    import re
+    import time
+    import subprocess
+    from dbsavr.cli import _find_pids_by_cmdline
+    
+    # Unique to this test run, so parallel runs (e.g. pytest -n auto) don't see each other's process
+    marker = f'DBSavrTestMarker{os.getpid()}'
+    process = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)', marker])
+    try:
+        for _ in range(50):
+            pids = _find_pids_by_cmdline(re.compile(re.escape(marker).encode()))
+            if pids:
+                break
+            time.sleep(0.1)
+        assert pids == [process.pid]
+    finally:
+        process.kill()
+        process.wait()
+
+def test_wait_for_pid_file(tmp_path):
+    """Test waiting for a PID file that exists, and timing out on one that doesn't."""
+    from dbsavr.cli import _wait_for_pid_file
+    
+    pid_file = tmp_path / "worker.pid"
+    pid_file.write_text("1234\n")
+    
+    assert _wait_for_pid_file(str(pid_file)) == "1234"
+    assert _wait_for_pid_file(str(tmp_path / "missing.pid"), timeout=0.05) is None
+    
+    # An empty PID file (still being written) counts as missing
+    empty_file = tmp_path / "beat.pid"
+    empty_file.write_text("")
+    assert _wait_for_pid_file(str(empty_file), timeout=0.05) is None
+
+@pytest.mark.skipif(not hasattr(signal, 'SIGCHLD'), reason="Requires SIGCHLD")
+def test_child_exit_waiter():
+    """Test that the waiter returns as soon as a child process exits."""
+    import time
+    import subprocess
+    from dbsavr.cli import _child_exit_waiter
+    
+    previous_handler = signal.getsignal(signal.SIGCHLD)
+    try:
+        wait_for_child = _child_exit_waiter()
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        
+        start = time.monotonic()
+        while process.poll() is None:
+            wait_for_child()
+        
+        assert time.monotonic() - start < 30
+    finally:
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, previous_handler)
+
+@pytest.mark.parametrize("use_pidfd", [True, False])
+def test_wait_for_exit(monkeypatch, use_pidfd):
+    """Test that waiting for a process notices its exit quickly."""
+    import time
+    import subprocess
+    from dbsavr.cli import _wait_for_exit
+    
+    if not use_pidfd:
+        monkeypatch.delattr(os, 'pidfd_open', raising=False)
+    elif not hasattr(os, 'pidfd_open'):
+        pytest.skip("pidfd_open is not available")
+    
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    
+    exited = []
+    start = time.monotonic()
+    assert _wait_for_exit([process.pid], 10, on_exit=exited.append) == []
+    assert exited == [process.pid]
+    assert time.monotonic() - start < 1
+    
+    # This process is still running, so it's reported as remaining
+    assert _wait_for_exit([os.getpid()], 0.05) == [os.getpid()]
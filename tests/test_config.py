@@ -67,6 +67,10 @@ def test_load_config(sample_config_file):
     assert config.s3.bucket_name == "test-bucket"
     assert config.s3.prefix == "test-prefix"
     assert config.s3.region == "us-east-1"
+    assert config.s3.compression == "gzip"
+    assert config.s3.stream_part_size_mb == 64
+    assert config.s3.checksum_algorithm is None
+    assert db_config.options is None
     
     assert len(config.schedules) == 1
     schedule = config.schedules[0]
@@ -78,7 +82,53 @@ def test_load_config(sample_config_file):
     assert config.log_level == "INFO"
     assert config.notifications_email == "test@example.com"
 
+def test_s3_default_compression(sample_config_file):
+    """Test that the S3 section's compression applies to databases without their own."""
+    with open(sample_config_file) as f:
+        config_data = yaml.safe_load(f)
+    config_data["s3"]["compression"] = "zstd"
+    config_data["databases"]["other_db"] = dict(config_data["databases"]["test_db"], options={"compression": "gzip"})
+    with open(sample_config_file, 'w') as f:
+        yaml.dump(config_data, f)
+    
+    config = load_config(sample_config_file)
+    
+    assert config.s3.compression == "zstd"
+    assert config.databases["test_db"].options == {"compression": "zstd"}
+    assert config.databases["other_db"].options == {"compression": "gzip"}
+
 def test_load_nonexistent_config():
     """Test that loading a nonexistent config file raises an exception."""
     with pytest.raises(FileNotFoundError):
-        load_config("nonexistent_file.yaml")
\ No newline at end of file
+        load_config("nonexistent_file.yaml")
+
+def test_load_config_cached(sample_config_file, monkeypatch):
+    """Test that a parsed config is reused until the file changes."""
+    config = load_config(sample_config_file)
+    assert load_config(sample_config_file) is config
+    
+    # A change in size invalidates the cached config
+    with open(sample_config_file, 'a') as f:
+        f.write("# changed\n")
+    changed = load_config(sample_config_file)
+    assert changed is not config
+    assert changed == config
+    
+    # The cache can be bypassed entirely
+    monkeypatch.setenv("DBSAVR_CONFIG_NO_CACHE", "1")
+    assert load_config(sample_config_file) is not changed
+
+def test_load_config_leaves_no_files(sample_config_file):
+    """Test that loading a config doesn't write anything next to it."""
+    directory = os.path.dirname(sample_config_file)
+    before = set(os.listdir(directory))
+    load_config(sample_config_file)
+    assert set(os.listdir(directory)) == before
+
+def test_backup_schedule_cron_parts():
+    """Test that cron expressions are split once and validated when a schedule is created."""
+    schedule = BackupSchedule(database_name="test_db", cron_expression="0  3 * * 1-5")
+    assert schedule.cron_parts == ("0", "3", "*", "*", "1-5")
+    
+    with pytest.raises(ValueError, match="Invalid cron expression for test_db"):
+        BackupSchedule(database_name="test_db", cron_expression="0 3 * *")
@@ -1,28 +1,88 @@
 # /tests/test_notifications.py
+import socket
 import pytest
+from email import message_from_bytes, policy
 from unittest.mock import patch, MagicMock, call
 
-from dbsavr.notifications import EmailNotifier
+from dbsavr.notifications import EmailNotifier, _smtp_settings
+
+# SMTP environment for test_email_notifier_init
+_SMTP_ENV = {
+    'SMTP_SERVER': 'smtp.example.com',
+    'SMTP_PORT': '587',
+    'SMTP_USERNAME': 'user',
+    'SMTP_PASSWORD': 'pass',
+    'SMTP_SENDER': 'sender@example.com'
+}
+
+@pytest.fixture(autouse=True)
+def clear_smtp_settings():
+    """Re-read SMTP settings from the environment for each test."""
+    _smtp_settings.cache_clear()
+    yield
+    _smtp_settings.cache_clear()
 
 @pytest.fixture
 def email_notifier():
-    """Create an EmailNotifier instance for testing."""
-    return EmailNotifier("test@example.com")
+    """Create an EmailNotifier instance for testing (per test: it holds the open SMTP connection)."""
+    notifier = EmailNotifier("test@example.com")
+    yield notifier
+    notifier.close()
+
+@pytest.fixture
+def smtp_mock():
+    """Patch smtplib.SMTP with a server mock already returned by its context manager."""
+    with patch('dbsavr.notifications.smtplib.SMTP') as mock_smtp:
+        server_mock = MagicMock()
+        mock_smtp.return_value.__enter__.return_value = server_mock
+        yield mock_smtp, server_mock
+
+class _SinkHandler:
+    """aiosmtpd handler keeping every message it receives."""
+    
+    def __init__(self):
+        self.messages = []
+    
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(message_from_bytes(envelope.content, policy=policy.default))
+        return '250 Message accepted for delivery'
+
+@pytest.fixture(scope="module")
+def smtp_sink():
+    """Run an in-process SMTP server for this module's tests, keeping the messages it receives."""
+    controller_module = pytest.importorskip("aiosmtpd.controller")
+    
+    # The controller connects to its own port to check it started, so it needs a real one
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    
+    handler = _SinkHandler()
+    controller = controller_module.Controller(handler, hostname='127.0.0.1', port=port)
+    controller.start()
+    yield controller
+    controller.stop()
+
+@pytest.fixture
+def sink_notifier(smtp_sink, monkeypatch):
+    """Create an EmailNotifier sending to the in-process SMTP server."""
+    smtp_sink.handler.messages.clear()
+    monkeypatch.setenv('SMTP_SERVER', smtp_sink.hostname)
+    monkeypatch.setenv('SMTP_PORT', str(smtp_sink.port))
+    
+    notifier = EmailNotifier("test@example.com")
+    yield notifier
+    notifier.close()
 
 @patch('dbsavr.notifications.smtplib.SMTP')
 @patch('dbsavr.notifications.os.environ.get')
 def test_email_notifier_init(mock_environ_get, mock_smtp, email_notifier):
     """Test EmailNotifier initialization with environment variables."""
-    # Setup environment variable mocks with correct function signature
-    mock_environ_get.side_effect = lambda key, default=None: {
-        'SMTP_SERVER': 'smtp.example.com',
-        'SMTP_PORT': '587',
-        'SMTP_USERNAME': 'user',
-        'SMTP_PASSWORD': 'pass',
-        'SMTP_SENDER': 'sender@example.com'
-    }.get(key, default)
+    # Setup environment variable mocks; dict.get has os.environ.get's signature
+    mock_environ_get.side_effect = _SMTP_ENV.get
     
     # Create a new notifier with mocked environment
+    _smtp_settings.cache_clear()
     notifier = EmailNotifier("test@example.com")
     
     # Verify environment variables were read correctly
@@ -33,15 +93,10 @@ def test_email_notifier_init(mock_environ_get, mock_smtp, email_notifier):
     assert notifier.sender == "sender@example.com"
     assert notifier.recipient == "test@example.com"
 
-@patch('dbsavr.notifications.smtplib.SMTP')
-def test_send_success_notification(mock_smtp, email_notifier):
+def test_send_success_notification(smtp_sink, sink_notifier):
     """Test sending a success notification email."""
-    # Setup mock SMTP server
-    server_mock = MagicMock()
-    mock_smtp.return_value.__enter__.return_value = server_mock
-    
     # Call the method
-    email_notifier.send_success_notification(
+    sink_notifier.send_success_notification(
         db_name="test_db",
         backup_size=1048576,  # 1 MB
         s3_key="backups/test_db/backup.sql.gz",
@@ -49,72 +104,70 @@ def test_send_success_notification(mock_smtp, email_notifier):
         deleted_backups=2
     )
     
-    # Verify SMTP was called correctly
-    mock_smtp.assert_called_once_with(email_notifier.smtp_server, email_notifier.smtp_port)
-    
-    # Verify email was sent
-    assert server_mock.send_message.called
-    
-    # Get the message that was sent
-    msg = server_mock.send_message.call_args[0][0]
+    # Verify email was received by the server
+    assert len(smtp_sink.handler.messages) == 1
+    msg = smtp_sink.handler.messages[0]
     
     # Verify email headers
-    assert msg['From'] == email_notifier.sender
-    assert msg['To'] == email_notifier.recipient
+    assert msg['From'] == sink_notifier.sender
+    assert msg['To'] == sink_notifier.recipient
     assert "Backup Successful: test_db" in msg['Subject']
     
     # Verify email content
-    payload = msg.get_payload(0).get_payload()
-    assert "Database: test_db" in payload
-    assert "Backup Size: 1.00 MB" in payload
-    assert "S3 Location: backups/test_db/backup.sql.gz" in payload
-    assert "Duration: 15.75 seconds" in payload
-    assert "Old Backups Removed: 2" in payload
+    lines = {line.strip() for line in msg.get_content().splitlines()}
+    missing = {
+        "Database: test_db",
+        "Backup Size: 1.00 MB",
+        "S3 Location: backups/test_db/backup.sql.gz",
+        "Duration: 15.75 seconds",
+        "Old Backups Removed: 2"
+    } - lines
+    assert not missing
 
-@patch('dbsavr.notifications.smtplib.SMTP')
-def test_send_failure_notification(mock_smtp, email_notifier):
+def test_send_failure_notification(smtp_sink, sink_notifier):
     """Test sending a failure notification email."""
-    # Setup mock SMTP server
-    server_mock = MagicMock()
-    mock_smtp.return_value.__enter__.return_value = server_mock
-    
     # Call the method
-    email_notifier.send_failure_notification(
+    sink_notifier.send_failure_notification(
         db_name="test_db",
         error="Connection refused"
     )
     
-    # Verify SMTP was called correctly
-    mock_smtp.assert_called_once_with(email_notifier.smtp_server, email_notifier.smtp_port)
-    
-    # Verify email was sent
-    assert server_mock.send_message.called
-    
-    # Get the message that was sent
-    msg = server_mock.send_message.call_args[0][0]
+    # Verify email was received by the server
+    assert len(smtp_sink.handler.messages) == 1
+    msg = smtp_sink.handler.messages[0]
     
     # Verify email headers
-    assert msg['From'] == email_notifier.sender
-    assert msg['To'] == email_notifier.recipient
+    assert msg['From'] == sink_notifier.sender
+    assert msg['To'] == sink_notifier.recipient
     assert "Backup Failed: test_db" in msg['Subject']
     
     # Verify email content
-    payload = msg.get_payload(0).get_payload()
-    assert "Database: test_db" in payload
-    assert "Error: Connection refused" in payload
+    lines = {line.strip() for line in msg.get_content().splitlines()}
+    missing = {"Database: test_db", "Error: Connection refused"} - lines
+    assert not missing
+    assert msg.get_content_type() == "text/plain"
 
-@patch('dbsavr.notifications.smtplib.SMTP')
-def test_send_email_with_authentication(mock_smtp, email_notifier):
+def test_persistent_connection_to_server(smtp_sink, sink_notifier):
+    """Test that a burst of notifications is delivered over one real SMTP connection."""
+    with sink_notifier:
+        sink_notifier.send_failure_notification(db_name="db1", error="boom")
+        server = sink_notifier._server
+        sink_notifier.send_failure_notification(db_name="db2", error="boom")
+        assert sink_notifier._server is server
+    
+    assert [msg['Subject'] for msg in smtp_sink.handler.messages] == [
+        "Backup Failed: db1", "Backup Failed: db2"
+    ]
+
+def test_send_email_with_authentication(smtp_mock, email_notifier):
     """Test sending email with SMTP authentication."""
+    mock_smtp, server_mock = smtp_mock
+    
     # Configure notifier to use authentication
     email_notifier.smtp_username = "user"
     email_notifier.smtp_password = "pass"
     email_notifier.use_tls = True  # Make sure TLS is enabled for this test
     
-    # Setup mock SMTP server
-    server_mock = MagicMock()
-    mock_smtp.return_value.__enter__.return_value = server_mock
-    
     # Call the method
     email_notifier.send_success_notification(
         db_name="test_db",
@@ -129,10 +182,11 @@ def test_send_email_with_authentication(mock_smtp, email_notifier):
     server_mock.login.assert_called_once_with("user", "pass")
     assert server_mock.send_message.called
 
-@patch('dbsavr.notifications.smtplib.SMTP')
 @patch('dbsavr.notifications.logger.error')
-def test_send_email_error_handling(mock_logging_error, mock_smtp, email_notifier):
+def test_send_email_error_handling(mock_logging_error, smtp_mock, email_notifier):
     """Test error handling when sending email fails."""
+    mock_smtp, server_mock = smtp_mock
+    
     # Make SMTP raise an exception
     mock_smtp.return_value.__enter__.side_effect = Exception("Connection refused")
     
@@ -152,4 +206,51 @@ def test_send_email_error_handling(mock_logging_error, mock_smtp, email_notifier
     # Check that the error message contains the expected text
     called_args = mock_logging_error.call_args[0]
     assert "Failed to send email notification" in called_args[0]
-    assert "Connection refused" in str(called_args)
\ No newline at end of file
+    assert "Connection refused" in str(called_args)
+
+def test_smtp_settings_read_once():
+    """Test that SMTP settings are read from the environment only once."""
+    with patch.dict('os.environ', {'SMTP_USE_SSL': 'yes'}):
+        first = EmailNotifier("test@example.com")
+    
+    # Later environment changes don't affect new notifiers
+    with patch.dict('os.environ', {'SMTP_USE_SSL': 'no'}):
+        second = EmailNotifier("other@example.com")
+    
+    assert first.use_ssl and second.use_ssl
+    assert second.smtp_port == 465
+
+@patch('dbsavr.notifications.smtplib.SMTP')
+def test_persistent_connection(mock_smtp, email_notifier):
+    """Test that one SMTP connection is reused for a burst of notifications."""
+    server_mock = MagicMock()
+    server_mock.noop.return_value = (250, b'OK')
+    mock_smtp.return_value.__enter__.return_value = server_mock
+    
+    with email_notifier:
+        email_notifier.send_failure_notification(db_name="db1", error="boom")
+        email_notifier.send_failure_notification(db_name="db2", error="boom")
+        
+        # A connection the server has dropped is replaced
+        server_mock.noop.side_effect = [OSError("dropped"), (250, b'OK')]
+        email_notifier.send_failure_notification(db_name="db3", error="boom")
+    
+    assert mock_smtp.call_count == 2
+    assert server_mock.send_message.call_count == 3
+    assert mock_smtp.return_value.__exit__.call_count == 2
+
+@patch('dbsavr.notifications.smtplib.SMTP')
+def test_one_shot_connection(mock_smtp):
+    """Test that SMTP_PERSISTENT=0 opens a connection per notification."""
+    server_mock = MagicMock()
+    mock_smtp.return_value.__enter__.return_value = server_mock
+    
+    with patch.dict('os.environ', {'SMTP_PERSISTENT': '0'}):
+        notifier = EmailNotifier("test@example.com")
+    
+    notifier.send_failure_notification(db_name="db1", error="boom")
+    notifier.send_failure_notification(db_name="db2", error="boom")
+    
+    assert mock_smtp.call_count == 2
+    assert mock_smtp.return_value.__exit__.call_count == 2
+    server_mock.noop.assert_not_called()
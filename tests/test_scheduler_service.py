@@ -0,0 +1,85 @@
+# /tests/test_scheduler_service.py
+import time
+import threading
+import pytest
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+from dbsavr.config import Config, S3Config, BackupSchedule
+from dbsavr.scheduler_service import SchedulerService, DEFAULT_MAX_PARALLEL_BACKUPS, _max_parallel_backups
+
+@pytest.fixture
+def scheduler():
+    """Create a SchedulerService with an hourly schedule and a mocked BackupService."""
+    config = Config(
+        databases={},
+        s3=S3Config(bucket_name="test-bucket", prefix="backups", region="us-east-1"),
+        schedules=[
+            BackupSchedule(
+                database_name="test_db",
+                cron_expression="0 * * * *",
+                retention_days=30
+            )
+        ]
+    )
+    return SchedulerService(config, backup_service=MagicMock())
+
+def test_next_runs_are_in_the_future(scheduler):
+    """Test that the first runs are counted from the current time."""
+    next_runs = {}
+    scheduler._update_next_runs(next_runs)
+    
+    deadline, next_run = next_runs["test_db"]
+    assert 0 < deadline - time.monotonic() <= 3600
+    assert next_run.minute == 0 and next_run.second == 0
+
+def test_next_run_after_fired_run(scheduler):
+    """Test that the next run follows the run that fired, even if the clock still lags it."""
+    next_runs = {}
+    scheduler._update_next_runs(next_runs)
+    _, run_time = next_runs["test_db"]
+    
+    scheduler._update_next_run(next_runs, "test_db", run_time)
+    
+    assert next_runs["test_db"][1] == run_time + timedelta(hours=1)
+
+def test_next_run_after_delayed_run(scheduler):
+    """Test that a run that fired late doesn't schedule its successor in the past."""
+    next_runs = {}
+    scheduler._update_next_runs(next_runs)
+    _, run_time = next_runs["test_db"]
+    
+    # e.g. deferred while the previous backup was still running, or after a suspend
+    scheduler._update_next_run(next_runs, "test_db", run_time - timedelta(hours=3))
+    
+    deadline, next_run = next_runs["test_db"]
+    assert deadline - time.monotonic() > 0
+    assert next_run == run_time
+
+@pytest.mark.parametrize("value", ["abc", "0", "-2"])
+def test_invalid_max_parallel_backups(value, monkeypatch):
+    """Test that a bad DBSAVR_MAX_PARALLEL_BACKUPS falls back to the default."""
+    monkeypatch.setenv("DBSAVR_MAX_PARALLEL_BACKUPS", value)
+    assert _max_parallel_backups() == DEFAULT_MAX_PARALLEL_BACKUPS
+    
+    monkeypatch.setenv("DBSAVR_MAX_PARALLEL_BACKUPS", "2")
+    assert _max_parallel_backups() == 2
+
+def test_stop_scheduler_waits_for_running_backups(scheduler):
+    """Test that stopping the scheduler waits for backups already running."""
+    started = threading.Event()
+    finished = threading.Event()
+    
+    def perform_backup(db_name):
+        started.set()
+        time.sleep(0.2)
+        finished.set()
+    
+    scheduler.backup_service.perform_backup.side_effect = perform_backup
+    scheduler.start_scheduler()
+    scheduler._run_backup("test_db")
+    assert started.wait(5)
+    
+    assert scheduler.stop_scheduler(timeout=5)
+    assert finished.is_set()
+    assert scheduler.get_next_run_times()["test_db"]["is_active"] is False
@@ -1,13 +1,60 @@
 # /tests/test_storage.py
 import os
+import dataclasses
 import pytest
-from unittest.mock import patch, MagicMock, call
+from unittest.mock import patch, Mock, MagicMock, call, ANY
 from datetime import datetime, timedelta
 
-from dbsavr.storage import S3Storage
+from dbsavr.storage import (
+    S3Storage, TRANSFER_CONFIG, FILE_TRANSFER_CONFIG, CRT_AVAILABLE, DELETE_RETRY_CONFIG, CHECKSUM_ALGORITHM_SUPPORTED,
+    _cached_s3_client
+)
 from dbsavr.config import S3Config
 
-@pytest.fixture
+# The S3 client methods S3Storage uses
+S3_CLIENT_METHODS = ['upload_file', 'upload_fileobj', 'delete_object', 'delete_objects', 'get_paginator']
+
+# Keys of the old backups listed on each page in test_multiple_pages_cleanup,
+# and the batched delete expected for each page
+_OLD_BACKUP_PAGES = [[f'backups/test_db/old_backup_{page}_{i}.sql.gz' for i in range(5)] for page in (1, 2)]
+_EXPECTED_PAGE_DELETES = [call(
+    Bucket="test-bucket",
+    Delete={'Objects': [{'Key': key} for key in page], 'Quiet': True}
+) for page in _OLD_BACKUP_PAGES]
+
+def _mock_s3_client():
+    """Create a mock S3 client limited to the methods S3Storage uses."""
+    client = Mock(spec=S3_CLIENT_METHODS)
+    client.get_paginator.return_value = Mock(spec=['paginate'])
+    client.delete_objects.return_value = {}
+    return client
+
+@pytest.fixture(scope="module")
+def _boto_patch():
+    """Patch boto3.client once for all tests of this module."""
+    with patch('dbsavr.storage.boto3.client') as mock_client:
+        yield mock_client
+
+@pytest.fixture(autouse=True)
+def mock_boto3_client(_boto_patch):
+    """The patched boto3.client, reset for each test and returning a fresh client mock."""
+    _boto_patch.reset_mock(return_value=True, side_effect=True)
+    _boto_patch.return_value = _mock_s3_client()
+    return _boto_patch
+
+@pytest.fixture(autouse=True)
+def clear_client_cache():
+    """Create a new (mocked) S3 client for each test."""
+    _cached_s3_client.cache_clear()
+    yield
+    _cached_s3_client.cache_clear()
+
+@pytest.fixture(scope="module")
+def now():
+    """The current UTC time, read once for all tests of this module."""
+    return datetime.utcnow()
+
+@pytest.fixture(scope="session")
 def s3_config():
     """Create a sample S3 configuration for testing."""
     return S3Config(
@@ -18,7 +65,7 @@ def s3_config():
         secret_key="test-secret-key"
     )
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def s3_config_iam():
     """Create a sample S3 configuration using IAM roles for testing."""
     return S3Config(
@@ -27,7 +74,17 @@ def s3_config_iam():
         region="us-east-1"
     )
 
-@patch('dbsavr.storage.boto3.client')
+@pytest.fixture(scope="module")
+def _storage(_boto_patch, s3_config):
+    """Create one S3Storage instance for the tests of this module."""
+    return S3Storage(s3_config)
+
+@pytest.fixture
+def storage(_storage):
+    """The shared S3Storage instance, with a fresh (mocked) S3 client for each test."""
+    _storage.s3_client = _storage.delete_client = _mock_s3_client()
+    return _storage
+
 def test_create_s3_client_with_keys(mock_boto3_client, s3_config):
     """Test creating S3 client with access keys."""
     # Create S3Storage instance
@@ -38,10 +95,11 @@ def test_create_s3_client_with_keys(mock_boto3_client, s3_config):
         's3',
         region_name='us-east-1',
         aws_access_key_id='test-access-key',
-        aws_secret_access_key='test-secret-key'
+        aws_secret_access_key='test-secret-key',
+        config=ANY
     )
+    assert mock_boto3_client.call_args.kwargs['config'].retries is None
 
-@patch('dbsavr.storage.boto3.client')
 def test_create_s3_client_with_iam(mock_boto3_client, s3_config_iam):
     """Test creating S3 client with IAM role credentials."""
     # Create S3Storage instance
@@ -50,194 +108,115 @@ def test_create_s3_client_with_iam(mock_boto3_client, s3_config_iam):
     # Check if boto3.client was called correctly
     mock_boto3_client.assert_called_once_with(
         's3',
-        region_name='us-east-1'
+        region_name='us-east-1',
+        config=ANY
     )
 
-@patch('dbsavr.storage.boto3.client')
-def test_upload_backup_without_schedule_prefix(mock_boto3_client, s3_config):
-    """Test uploading a backup file to S3 without a schedule prefix."""
-    # Mock S3 client
-    mock_s3 = MagicMock()
-    mock_boto3_client.return_value = mock_s3
-    
-    # Create S3Storage instance
-    storage = S3Storage(s3_config)
-    
-    # Call upload_backup method without custom prefix
-    file_path = "/tmp/test_backup.sql.gz"
-    db_name = "test_db"
-    filename = "test_backup.sql.gz"
-    
-    s3_key = storage.upload_backup(file_path, db_name, filename)
+def test_create_s3_client_with_pool_size(mock_boto3_client, s3_config_iam):
+    """Test sizing the client's connection pool for shared use by many threads."""
+    S3Storage(s3_config_iam, max_pool_connections=64)
     
-    # Assertions
-    assert s3_key == "backups/test_db/test_backup.sql.gz"
-    mock_s3.upload_file.assert_called_once_with(
-        file_path,
-        "test-bucket",
-        "backups/test_db/test_backup.sql.gz"
-    )
+    client_config = mock_boto3_client.call_args.kwargs['config']
+    assert client_config.max_pool_connections == 64
+    assert client_config.retries is None
 
-@patch('dbsavr.storage.boto3.client')
-def test_upload_backup_with_schedule_prefix(mock_boto3_client, s3_config):
-    """Test uploading a backup file to S3 with a schedule prefix."""
-    # Mock S3 client
-    mock_s3 = MagicMock()
-    mock_boto3_client.return_value = mock_s3
-    
-    # Create S3Storage instance
+def test_delete_client_retries_adaptively(mock_boto3_client, s3_config):
+    """Test that only the client used for deletes gets the adaptive retry policy."""
+    mock_boto3_client.side_effect = lambda *args, **kwargs: _mock_s3_client()
     storage = S3Storage(s3_config)
+    storage.delete_backup("backups/test_db/old.sql.gz")
     
-    # Call upload_backup method with custom prefix
-    file_path = "/tmp/test_backup.sql.gz"
-    db_name = "test_db"
-    filename = "test_backup.sql.gz"
-    schedule_prefix = "daily"
-    
-    s3_key = storage.upload_backup(file_path, db_name, filename, custom_prefix=schedule_prefix)
-    
-    # Assertions
-    assert s3_key == "backups/test_db/daily/test_backup.sql.gz"
-    mock_s3.upload_file.assert_called_once_with(
-        file_path,
-        "test-bucket",
-        "backups/test_db/daily/test_backup.sql.gz"
+    upload_config, delete_config = [c.kwargs['config'] for c in mock_boto3_client.call_args_list]
+    assert upload_config.retries is None
+    assert delete_config.retries == DELETE_RETRY_CONFIG
+    storage.delete_client.delete_object.assert_called_once_with(
+        Bucket="test-bucket", Key="backups/test_db/old.sql.gz"
     )
+    storage.s3_client.delete_object.assert_not_called()
+
+def test_s3_client_cached(mock_boto3_client, s3_config, s3_config_iam):
+    """Test that storages with the same settings share one client, e.g. across BackupService instances."""
+    first = S3Storage(s3_config)
+    second = S3Storage(s3_config)
+    
+    assert first.s3_client is second.s3_client
+    mock_boto3_client.assert_called_once()
+    
+    # Other credentials or pool sizes get their own client
+    S3Storage(s3_config_iam)
+    S3Storage(s3_config, max_pool_connections=64)
+    assert mock_boto3_client.call_count == 3
 
-@patch('dbsavr.storage.boto3.client')
-def test_upload_backup_with_custom_bucket(mock_boto3_client, s3_config):
-    """Test uploading a backup file to S3 with a custom bucket."""
+@pytest.mark.parametrize("kwargs,expected_key,expected_bucket", [
+    ({}, "backups/test_db/test_backup.sql.gz", "test-bucket"),
+    ({"custom_prefix": "daily"}, "backups/test_db/daily/test_backup.sql.gz", "test-bucket"),
+    ({"custom_bucket": "custom-bucket"}, "backups/test_db/test_backup.sql.gz", "custom-bucket"),
+])
+def test_upload_backup(storage, kwargs, expected_key, expected_bucket):
+    """Test uploading a backup file to S3, with and without a schedule prefix or custom bucket."""
     # Mock S3 client
-    mock_s3 = MagicMock()
-    mock_boto3_client.return_value = mock_s3
-    
-    # Create S3Storage instance
-    storage = S3Storage(s3_config)
+    mock_s3 = storage.s3_client
     
-    # Call upload_backup method with custom bucket
+    # Call upload_backup method
     file_path = "/tmp/test_backup.sql.gz"
     db_name = "test_db"
     filename = "test_backup.sql.gz"
-    custom_bucket = "custom-bucket"
     
-    s3_key = storage.upload_backup(file_path, db_name, filename, custom_bucket=custom_bucket)
+    s3_key = storage.upload_backup(file_path, db_name, filename, **kwargs)
     
     # Assertions
-    assert s3_key == "backups/test_db/test_backup.sql.gz"
+    assert s3_key == expected_key
     mock_s3.upload_file.assert_called_once_with(
         file_path,
-        "custom-bucket",
-        "backups/test_db/test_backup.sql.gz"
+        expected_bucket,
+        expected_key,
+        ExtraArgs=storage.upload_extra_args,
+        Config=FILE_TRANSFER_CONFIG
     )
 
-@patch('dbsavr.storage.boto3.client')
-def test_cleanup_old_backups_without_schedule_prefix(mock_boto3_client, s3_config):
-    """Test cleaning up old backups without schedule prefix."""
-    # Setup current time for testing
-    now = datetime.utcnow()
-    
-    # Mock S3 client
-    mock_s3 = MagicMock()
-    mock_boto3_client.return_value = mock_s3
-    
-    # Mock paginator
-    mock_paginator = MagicMock()
-    mock_s3.get_paginator.return_value = mock_paginator
+@pytest.mark.parametrize("custom_prefix,expected_prefix", [
+    (None, "backups/test_db/"),
+    ("daily", "backups/test_db/daily/"),
+])
+def test_cleanup_old_backups(storage, now, custom_prefix, expected_prefix):
+    """Test cleaning up old backups with and without a schedule prefix."""
+    # Mock S3 client and its paginator
+    mock_s3 = storage.s3_client
+    mock_paginator = mock_s3.get_paginator.return_value
     
     # Setup mock response for list_objects_v2
-    old_backup = {
-        'Key': 'backups/test_db/old_backup.sql.gz',
-        'LastModified': now - timedelta(days=40)
-    }
-    recent_backup = {
-        'Key': 'backups/test_db/recent_backup.sql.gz',
-        'LastModified': now - timedelta(days=5)
-    }
-    
+    old_key = f"{expected_prefix}old_backup.sql.gz"
     mock_paginator.paginate.return_value = [{
-        'Contents': [old_backup, recent_backup]
+        'Contents': [
+            {'Key': old_key, 'LastModified': now - timedelta(days=40)},
+            {'Key': f"{expected_prefix}recent_backup.sql.gz", 'LastModified': now - timedelta(days=5)}
+        ]
     }]
     
-    # Create S3Storage instance
-    storage = S3Storage(s3_config)
-    
     # Call cleanup_old_backups method with 30 day retention
-    deleted_keys = storage.cleanup_old_backups("test_db", 30)
-    
-    # Assertions
-    assert len(deleted_keys) == 1
-    assert deleted_keys[0] == 'backups/test_db/old_backup.sql.gz'
-    mock_s3.delete_object.assert_called_once_with(
-        Bucket="test-bucket",
-        Key='backups/test_db/old_backup.sql.gz'
-    )
-    
-    # Verify that the paginator was called with the correct prefix
-    mock_paginator.paginate.assert_called_once_with(
-        Bucket="test-bucket", 
-        Prefix="backups/test_db"
-    )
-
-@patch('dbsavr.storage.boto3.client')
-def test_cleanup_old_backups_with_schedule_prefix(mock_boto3_client, s3_config):
-    """Test cleaning up old backups with schedule prefix."""
-    # Setup current time for testing
-    now = datetime.utcnow()
-    
-    # Mock S3 client
-    mock_s3 = MagicMock()
-    mock_boto3_client.return_value = mock_s3
-    
-    # Mock paginator
-    mock_paginator = MagicMock()
-    mock_s3.get_paginator.return_value = mock_paginator
-    
-    # Setup mock response for list_objects_v2
-    old_backup = {
-        'Key': 'backups/test_db/daily/old_backup.sql.gz',
-        'LastModified': now - timedelta(days=40)
-    }
-    recent_backup = {
-        'Key': 'backups/test_db/daily/recent_backup.sql.gz',
-        'LastModified': now - timedelta(days=5)
-    }
-    
-    mock_paginator.paginate.return_value = [{
-        'Contents': [old_backup, recent_backup]
-    }]
-    
-    # Create S3Storage instance
-    storage = S3Storage(s3_config)
-    
-    # Call cleanup_old_backups method with 30 day retention and schedule prefix
-    deleted_keys = storage.cleanup_old_backups("test_db", 30, custom_prefix="daily")
+    deleted_keys = storage.cleanup_old_backups("test_db", 30, custom_prefix=custom_prefix)
     
     # Assertions
-    assert len(deleted_keys) == 1
-    assert deleted_keys[0] == 'backups/test_db/daily/old_backup.sql.gz'
-    mock_s3.delete_object.assert_called_once_with(
+    assert deleted_keys == [old_key]
+    mock_s3.delete_objects.assert_called_once_with(
         Bucket="test-bucket",
-        Key='backups/test_db/daily/old_backup.sql.gz'
+        Delete={'Objects': [{'Key': old_key}], 'Quiet': True}
     )
     
     # Verify that the paginator was called with the correct prefix
     mock_paginator.paginate.assert_called_once_with(
         Bucket="test-bucket", 
-        Prefix="backups/test_db/daily"
+        Prefix=expected_prefix,
+        PaginationConfig={'PageSize': 1000}
     )
 
-@patch('dbsavr.storage.boto3.client')
-def test_cleanup_old_backups_path_structure(mock_boto3_client, s3_config):
+def test_cleanup_old_backups_path_structure(storage, now):
     """Test that cleanup_old_backups only deletes files in the specific path structure."""
-    # Setup current time for testing
-    now = datetime.utcnow()
-    
     # Mock S3 client
-    mock_s3 = MagicMock()
-    mock_boto3_client.return_value = mock_s3
+    mock_s3 = storage.s3_client
     
     # Mock paginator
-    mock_paginator = MagicMock()
+    mock_paginator = Mock(spec=['paginate'])
     mock_s3.get_paginator.return_value = mock_paginator
     
     # Setup mock response with files from multiple paths
@@ -255,24 +234,13 @@ def test_cleanup_old_backups_path_structure(mock_boto3_client, s3_config):
     }
     
     # Set up paginator to return different responses based on prefix
-    def mock_paginate(Bucket, Prefix):
-        if Prefix == 'backups/test_db':
-            return [{
-                'Contents': [old_backup_testdb]
-            }]
-        elif Prefix == 'backups/test_db/daily':
-            return [{
-                'Contents': [old_backup_testdb_daily]
-            }]
-        else:
-            return [{
-                'Contents': [old_backup_otherdb]
-            }]
-    
-    mock_paginator.paginate.side_effect = mock_paginate
-    
-    # Create S3Storage instance
-    storage = S3Storage(s3_config)
+    responses = {
+        'backups/test_db/': [{'Contents': [old_backup_testdb]}],
+        'backups/test_db/daily/': [{'Contents': [old_backup_testdb_daily]}]
+    }
+    mock_paginator.paginate.side_effect = lambda Bucket, Prefix, PaginationConfig: responses.get(
+        Prefix, [{'Contents': [old_backup_otherdb]}]
+    )
     
     # Call cleanup_old_backups method for test_db without schedule prefix
     deleted_keys = storage.cleanup_old_backups("test_db", 30)
@@ -284,11 +252,12 @@ def test_cleanup_old_backups_path_structure(mock_boto3_client, s3_config):
     # Verify that the paginator was called with the correct prefix
     mock_paginator.paginate.assert_called_with(
         Bucket="test-bucket", 
-        Prefix="backups/test_db"
+        Prefix="backups/test_db/",
+        PaginationConfig={'PageSize': 1000}
     )
     
     # Reset mock and call with schedule prefix
-    mock_s3.delete_object.reset_mock()
+    mock_s3.delete_objects.reset_mock()
     mock_paginator.paginate.reset_mock()
     
     deleted_keys = storage.cleanup_old_backups("test_db", 30, custom_prefix="daily")
@@ -300,17 +269,16 @@ def test_cleanup_old_backups_path_structure(mock_boto3_client, s3_config):
     # Verify that the paginator was called with the correct prefix
     mock_paginator.paginate.assert_called_with(
         Bucket="test-bucket", 
-        Prefix="backups/test_db/daily"
+        Prefix="backups/test_db/daily/",
+        PaginationConfig={'PageSize': 1000}
     )
 
-@patch('dbsavr.storage.boto3.client')
-def test_upload_backup_error(mock_boto3_client, s3_config):
+def test_upload_backup_error(storage):
     """Test error handling during backup upload."""
     from botocore.exceptions import ClientError
     
     # Mock S3 client
-    mock_s3 = MagicMock()
-    mock_boto3_client.return_value = mock_s3
+    mock_s3 = storage.s3_client
     
     # Set up the mock to raise a ClientError when upload_file is called
     mock_s3.upload_file.side_effect = ClientError(
@@ -318,9 +286,6 @@ def test_upload_backup_error(mock_boto3_client, s3_config):
         'upload_file'
     )
     
-    # Create S3Storage instance
-    storage = S3Storage(s3_config)
-    
     # Call upload_backup method
     file_path = "/tmp/test_backup.sql.gz"
     db_name = "test_db"
@@ -330,56 +295,224 @@ def test_upload_backup_error(mock_boto3_client, s3_config):
     with pytest.raises(ClientError):
         storage.upload_backup(file_path, db_name, filename)
 
-@patch('dbsavr.storage.boto3.client')
-def test_multiple_pages_cleanup(mock_boto3_client, s3_config):
+def test_multiple_pages_cleanup(storage, now):
     """Test cleanup with multiple pages of results."""
-    # Setup current time for testing
-    now = datetime.utcnow()
-    
     # Mock S3 client
-    mock_s3 = MagicMock()
-    mock_boto3_client.return_value = mock_s3
+    mock_s3 = storage.s3_client
     
     # Mock paginator
-    mock_paginator = MagicMock()
+    mock_paginator = Mock(spec=['paginate'])
     mock_s3.get_paginator.return_value = mock_paginator
     
     # Create a large set of old backups across multiple pages
-    old_backups_page1 = [{
-        'Key': f'backups/test_db/old_backup_1_{i}.sql.gz',
-        'LastModified': now - timedelta(days=40)
-    } for i in range(5)]
+    old = now - timedelta(days=40)
+    mock_paginator.paginate.return_value = [{
+        'Contents': [{'Key': key, 'LastModified': old} for key in page]
+    } for page in _OLD_BACKUP_PAGES]
     
-    old_backups_page2 = [{
-        'Key': f'backups/test_db/old_backup_2_{i}.sql.gz',
-        'LastModified': now - timedelta(days=40)
-    } for i in range(5)]
+    # Call cleanup_old_backups method with 30 day retention
+    deleted_keys = storage.cleanup_old_backups("test_db", 30)
+    
+    # Assertions
+    assert len(deleted_keys) == 10  # 5 from page 1 + 5 from page 2
+    
+    # Verify one batched delete was sent per page, with all expected keys
+    assert mock_s3.delete_objects.call_count == 2
+    assert mock_s3.delete_objects.call_args_list == _EXPECTED_PAGE_DELETES
+
+def test_upload_backup_stream(storage):
+    """Test streaming a backup to S3 as a multipart upload."""
+    
+    mock_s3 = storage.s3_client
+    
+    stream = MagicMock()
     
-    # Setup mock response for list_objects_v2 with multiple pages
+    s3_key = storage.upload_backup_stream(stream, "test_db", "backup.sql.gz", custom_prefix="daily")
+    
+    assert s3_key == "backups/test_db/daily/backup.sql.gz"
+    mock_s3.upload_fileobj.assert_called_once_with(
+        stream,
+        "test-bucket",
+        "backups/test_db/daily/backup.sql.gz",
+        ExtraArgs=storage.upload_extra_args,
+        Config=storage.stream_transfer_config
+    )
+    assert TRANSFER_CONFIG.multipart_chunksize == 16 * 1024 * 1024
+    assert TRANSFER_CONFIG.multipart_threshold == 64 * 1024 * 1024
+    
+    # Streams can't size their parts, so the default parts fit 625 GiB in 10,000 of them
+    assert storage.stream_transfer_config.multipart_chunksize == 64 * 1024 * 1024
+    assert storage.stream_transfer_config.max_concurrency == 4
+
+def test_stream_part_size(s3_config):
+    """Test that the part size of streamed uploads is configurable, down to S3's 5 MiB minimum."""
+    storage = S3Storage(dataclasses.replace(s3_config, stream_part_size_mb=256))
+    assert storage.stream_transfer_config.multipart_chunksize == 256 * 1024 * 1024
+    
+    with pytest.raises(ValueError, match="stream_part_size_mb"):
+        S3Storage(dataclasses.replace(s3_config, stream_part_size_mb=4))
+
+@pytest.mark.skipif(not CHECKSUM_ALGORITHM_SUPPORTED, reason="Requires a boto3 release with flexible checksums")
+def test_upload_checksum_sent(s3_config, tmp_path):
+    """Test that a configured checksum algorithm sends the backup's checksum with the upload."""
+    import base64
+    import hashlib
+    import io
+    import boto3
+    from botocore.awsrequest import AWSResponse
+    
+    class EmptyBody:
+        def stream(self):
+            yield b''
+    
+    # A real client, answering every request itself instead of sending it
+    bodies = []
+    def before_send(request, **kwargs):
+        body = request.body
+        bodies.append(body.read() if hasattr(body, 'read') else body)
+        return AWSResponse(request.url, 200, {'ETag': '"etag"'}, EmptyBody())
+    
+    client = boto3.session.Session().client(
+        's3', region_name="us-east-1", aws_access_key_id="key", aws_secret_access_key="secret"
+    )
+    client.meta.events.register('before-send.s3', before_send)
+    
+    assert S3Storage(s3_config).upload_extra_args == {}
+    storage = S3Storage(dataclasses.replace(s3_config, checksum_algorithm="SHA256"))
+    storage.s3_client = client
+    
+    data = b"dump data"
+    backup_file = tmp_path / "backup.sql.gz"
+    backup_file.write_bytes(data)
+    storage.upload_backup(str(backup_file), "test_db", "backup.sql.gz")
+    storage.upload_backup_stream(io.BytesIO(data), "test_db", "backup.sql.gz")
+    
+    expected = b"x-amz-checksum-sha256:" + base64.b64encode(hashlib.sha256(data).digest())
+    assert len(bodies) == 2
+    assert all(expected in body for body in bodies)
+
+def test_file_transfer_config_uses_crt_when_available():
+    """Test that staged files are uploaded by the CRT client only when boto3[crt] is installed."""
+    if CRT_AVAILABLE:
+        assert FILE_TRANSFER_CONFIG.preferred_transfer_client == 'crt'
+        assert FILE_TRANSFER_CONFIG.multipart_chunksize == TRANSFER_CONFIG.multipart_chunksize
+    else:
+        # Forcing the CRT client without awscrt would make every upload fail
+        assert FILE_TRANSFER_CONFIG is TRANSFER_CONFIG
+
+
+def test_cleanup_old_backups_batches_and_errors(storage, now):
+    """Test that deletes are split into batches of 1000 and failed keys are not reported."""
+    mock_s3 = storage.s3_client
+    mock_paginator = Mock(spec=['paginate'])
+    mock_s3.get_paginator.return_value = mock_paginator
+    
+    old = now - timedelta(days=40)
+    old_backups = [{
+        'Key': f'backups/test_db/old_backup_{i}.sql.gz',
+        'LastModified': old
+    } for i in range(1500)]
     mock_paginator.paginate.return_value = [
-        {'Contents': old_backups_page1},
-        {'Contents': old_backups_page2}
+        {'Contents': old_backups[:1000]},
+        {'Contents': old_backups[1000:]}
     ]
     
-    # Create S3Storage instance
-    storage = S3Storage(s3_config)
+    # The second batch reports one key that could not be deleted
+    mock_s3.delete_objects.side_effect = [
+        {},
+        {'Errors': [{'Key': 'backups/test_db/old_backup_1499.sql.gz', 'Message': 'Access Denied'}]}
+    ]
     
-    # Call cleanup_old_backups method with 30 day retention
     deleted_keys = storage.cleanup_old_backups("test_db", 30)
     
-    # Assertions
-    assert len(deleted_keys) == 10  # 5 from page 1 + 5 from page 2
+    assert mock_s3.delete_objects.call_count == 2
+    first_batch = mock_s3.delete_objects.call_args_list[0].kwargs['Delete']['Objects']
+    second_batch = mock_s3.delete_objects.call_args_list[1].kwargs['Delete']['Objects']
+    assert len(first_batch) == 1000
+    assert len(second_batch) == 500
+    assert len(deleted_keys) == 1499
+    assert 'backups/test_db/old_backup_1499.sql.gz' not in deleted_keys
+
+
+def test_delete_backups_sends_batches_concurrently(storage):
+    """Test that a long list of keys is deleted in concurrent batches of 1000."""
+    import threading
+    
+    mock_s3 = storage.s3_client
+    
+    # Each request waits until all three are in flight, so this only
+    # completes if the batches are sent concurrently
+    in_flight = threading.Barrier(3, timeout=5)
+    def delete_objects(Bucket, Delete):
+        in_flight.wait()
+        return {}
+    mock_s3.delete_objects.side_effect = delete_objects
+    
+    keys = [f'backups/test_db/old_backup_{i}.sql.gz' for i in range(2500)]
+    deleted_keys = list(storage.delete_backups(keys))
+    
+    assert mock_s3.delete_objects.call_count == 3
+    batch_sizes = sorted(len(c.kwargs['Delete']['Objects']) for c in mock_s3.delete_objects.call_args_list)
+    assert batch_sizes == [500, 1000, 1000]
+    assert sorted(deleted_keys) == sorted(keys)
+
+
+def test_iter_cleanup_old_backups_deletes_per_page(storage, now):
+    """Test that expired backups are deleted page by page as the listing is consumed."""
+    mock_s3 = storage.s3_client
+    mock_paginator = Mock(spec=['paginate'])
+    mock_s3.get_paginator.return_value = mock_paginator
+    
+    mock_paginator.paginate.return_value = iter([
+        {'Contents': [{'Key': 'backups/test_db/a.sql.gz', 'LastModified': now - timedelta(days=40)}]},
+        {'Contents': [{'Key': 'backups/test_db/b.sql.gz', 'LastModified': now - timedelta(days=40)}]}
+    ])
     
-    # Verify all deletes were called
-    assert mock_s3.delete_object.call_count == 10
+    deleted = storage.iter_cleanup_old_backups("test_db", 30)
     
-    # Check that all expected keys were deleted
-    expected_deletes = []
-    for page in [old_backups_page1, old_backups_page2]:
-        for obj in page:
-            expected_deletes.append(call(
-                Bucket="test-bucket",
-                Key=obj['Key']
-            ))
+    # The first page is deleted before the second one is requested
+    assert next(deleted) == 'backups/test_db/a.sql.gz'
+    assert mock_s3.delete_objects.call_count == 1
+    
+    assert list(deleted) == ['backups/test_db/b.sql.gz']
+    assert mock_s3.delete_objects.call_count == 2
+
+@pytest.mark.parametrize("prefix, expected", [
+    ("backups", "backups/test_db/daily/backup.sql.gz"),
+    ("backups/", "backups/test_db/daily/backup.sql.gz"),
+    ("", "test_db/daily/backup.sql.gz"),
+])
+def test_build_key_uses_forward_slashes(mock_boto3_client, prefix, expected):
+    """Test that S3 keys are joined with '/' regardless of the configured prefix's form."""
+    storage = S3Storage(S3Config(bucket_name="test-bucket", prefix=prefix, region="us-east-1"))
+    
+    assert storage._build_key("test_db", "backup.sql.gz", "daily") == expected
+
+def test_cleanup_skips_listing_recent_backups(storage, now):
+    """Test that listing jumps past a long run of backups too new to expire."""
+    mock_s3 = storage.s3_client
+    mock_paginator = Mock(spec=['paginate'])
+    mock_s3.get_paginator.return_value = mock_paginator
+    
+    def backup(days_old, folder=""):
+        modified = now - timedelta(days=days_old)
+        return {
+            'Key': f"backups/test_db/{folder}test_db_{modified:%Y%m%d_%H%M%S}.sql.gz",
+            'LastModified': modified
+        }
+    
+    # The first page ends well inside the run of recent backups
+    first_page = {'Contents': [backup(40), backup(10), backup(5)], 'IsTruncated': True}
+    after_run = {'Contents': [backup(40, folder="weekly/")]}
+    
+    def paginate(Bucket, Prefix, PaginationConfig, StartAfter=None):
+        if StartAfter is None:
+            return iter([first_page, {'Contents': [backup(4), backup(3)]}])
+        assert StartAfter == "backups/test_db/test_db_99999999_999999~"
+        return iter([after_run])
+    mock_paginator.paginate.side_effect = paginate
+    
+    deleted_keys = storage.cleanup_old_backups("test_db", 30)
     
-    mock_s3.delete_object.assert_has_calls(expected_deletes, any_order=True)
\ No newline at end of file
+    assert deleted_keys == [first_page['Contents'][0]['Key'], after_run['Contents'][0]['Key']]
+    assert mock_paginator.paginate.call_count == 2
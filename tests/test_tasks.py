@@ -0,0 +1,61 @@
+# /tests/test_tasks.py
+import sys
+import types
+import pytest
+from unittest.mock import patch, MagicMock
+
+from dbsavr.backup_service import BackupService
+from dbsavr.config import Config, DatabaseConfig, S3Config
+
+@pytest.fixture
+def tasks(monkeypatch):
+    """Import the tasks module with an empty Celery config."""
+    # Importing it makes its app Celery's current app, which reads celeryconfig
+    # on first use; load an empty one now so the app stays usable by later tests
+    from dbsavr import tasks
+    monkeypatch.setitem(sys.modules, "celeryconfig", types.ModuleType("celeryconfig"))
+    tasks.app.conf.timezone
+    return tasks
+
+@pytest.fixture
+def backup_service(tasks, monkeypatch):
+    """Install a BackupService with notifications enabled and a mocked notifier as the task's service."""
+    config = Config(
+        databases={
+            "test_db": DatabaseConfig(
+                type="postgresql",
+                host="localhost",
+                port=5432,
+                username="test_user",
+                password="test_password",
+                database="test_database"
+            )
+        },
+        s3=S3Config(bucket_name="test-bucket", prefix="backups", region="us-east-1"),
+        schedules=[],
+        notifications_email="test@example.com"
+    )
+    service = BackupService(config)
+    service._s3_storage = MagicMock()
+    service._notifier = MagicMock()
+    monkeypatch.setattr(tasks, "_backup_service", service)
+    return service
+
+def test_backup_task_sends_notification_before_returning(tasks, backup_service):
+    """Test that the task's notification is delivered before it returns, not at process exit."""
+    with patch.object(BackupService, '_create_and_upload_backup',
+                      return_value=('backups/test_db/new.sql.gz', 2048)):
+        result = tasks.backup_database.run("test_db")
+    
+    assert result['status'] == 'success'
+    backup_service._notifier.send_success_notification.assert_called_once()
+    assert backup_service._notify_thread is None
+
+def test_failed_backup_task_sends_notification_before_raising(tasks, backup_service):
+    """Test that a failed task's notification is delivered before the error propagates."""
+    with patch.object(BackupService, '_create_and_upload_backup', side_effect=Exception("pg_dump failed")):
+        with pytest.raises(Exception, match="pg_dump failed"):
+            tasks.backup_database.run("test_db")
+    
+    backup_service._notifier.send_failure_notification.assert_called_once()
+    assert backup_service._notify_thread is None